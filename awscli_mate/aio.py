@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncio version of the url and MFA operations.
+
+boto3 is a blocking library, so the functions in this module run the sync
+version in a bounded thread pool and await the result, the event loop is
+never blocked. They take the same arguments and return the same values as
+the sync version.
+
+Usage example::
+
+    import asyncio
+    import awscli_mate.aio as aio
+
+    async def main():
+        urls = await asyncio.gather(
+            aio.get_sign_in_url("p1"),
+            aio.get_switch_role_url("p2"),
+        )
+
+    asyncio.run(main())
+
+By default, at most :data:`DEFAULT_MAX_WORKERS` calls run at the same time,
+use :func:`set_max_workers` to change it, or pass your own ``executor``.
+"""
+
+import typing as T
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from commentedconfigparser import CommentedConfigParser
+
+from .awscli import DEFAULT_SESSION_MARGIN, AWSCliConfig
+from .identity import DEFAULT_TTL, DEFAULT_TIMEOUT
+from . import awscli
+from . import url
+
+DEFAULT_MAX_WORKERS = 8
+
+_executor: T.Optional[ThreadPoolExecutor] = None
+_max_workers = DEFAULT_MAX_WORKERS
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Get the shared bounded thread pool, it is created on first use.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_max_workers,
+                thread_name_prefix="awscli_mate_aio",
+            )
+        return _executor
+
+
+def set_max_workers(max_workers: int):
+    """
+    Change the size of the shared thread pool, the running calls in the old
+    pool are not interrupted.
+    """
+    global _max_workers
+    _max_workers = max_workers
+    shutdown_executor(wait=False)
+
+
+def shutdown_executor(wait: bool = True):
+    """
+    Shutdown the shared thread pool, a new one is created on next use.
+    """
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def _run(
+    func: T.Callable[..., T.Any],
+    *args,
+    executor: T.Optional[Executor] = None,
+    **kwargs,
+):
+    if executor is None:
+        executor = get_executor()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor,
+        functools.partial(func, *args, **kwargs),
+    )
+
+
+async def get_account_alias(
+    iam_client,
+    executor: T.Optional[Executor] = None,
+) -> T.Optional[str]:
+    """
+    See :func:`awscli_mate.url.get_account_alias`.
+    """
+    return await _run(url.get_account_alias, iam_client, executor=executor)
+
+
+async def get_sign_in_url(
+    profile: str,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    ttl: float = DEFAULT_TTL,
+    timeout: T.Optional[float] = DEFAULT_TIMEOUT,
+    race: bool = False,
+    executor: T.Optional[Executor] = None,
+) -> str:
+    """
+    See :func:`awscli_mate.url.get_sign_in_url`.
+    """
+    return await _run(
+        url.get_sign_in_url,
+        profile,
+        awscli_config=awscli_config,
+        ttl=ttl,
+        timeout=timeout,
+        race=race,
+        executor=executor,
+    )
+
+
+async def get_switch_role_url(
+    profile: str,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    ttl: float = DEFAULT_TTL,
+    timeout: T.Optional[float] = DEFAULT_TIMEOUT,
+    offline: bool = False,
+    color: T.Optional[str] = None,
+    executor: T.Optional[Executor] = None,
+) -> str:
+    """
+    See :func:`awscli_mate.url.get_switch_role_url`.
+    """
+    return await _run(
+        url.get_switch_role_url,
+        profile,
+        awscli_config=awscli_config,
+        ttl=ttl,
+        timeout=timeout,
+        offline=offline,
+        color=color,
+        executor=executor,
+    )
+
+
+async def get_mfa_session_token(
+    profile: str,
+    mfa_code: str,
+    hours: int = 12,
+    mfa_arn: T.Optional[str] = None,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    executor: T.Optional[Executor] = None,
+) -> T.Dict[str, T.Any]:
+    """
+    See :func:`awscli_mate.awscli.get_mfa_session_token`.
+    """
+    return await _run(
+        awscli.get_mfa_session_token,
+        profile=profile,
+        mfa_code=mfa_code,
+        hours=hours,
+        mfa_arn=mfa_arn,
+        awscli_config=awscli_config,
+        executor=executor,
+    )
+
+
+async def mfa_auth(
+    profile: str,
+    mfa_code: str,
+    hours: int = 12,
+    overwrite_default: bool = False,
+    mfa_arn: T.Optional[str] = None,
+    margin: T.Optional[int] = DEFAULT_SESSION_MARGIN,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    executor: T.Optional[Executor] = None,
+) -> T.Tuple[CommentedConfigParser, CommentedConfigParser]:
+    """
+    See :meth:`awscli_mate.awscli.AWSCliConfig.mfa_auth`, both the STS call
+    and the file update run in the thread pool.
+    """
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    return await _run(
+        awscli_config.mfa_auth,
+        profile=profile,
+        mfa_code=mfa_code,
+        hours=hours,
+        overwrite_default=overwrite_default,
+        mfa_arn=mfa_arn,
+        margin=margin,
+        executor=executor,
+    )
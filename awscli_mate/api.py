@@ -17,9 +17,33 @@ from .constants import ConfigKeyEnum
 from .constants import CredentialKeyEnum
 from .awscli import T_PROFILE_REGION_PAIR
 from .awscli import AWSCliConfig
+from .graph import ProfileGraph
+from .fleet import FleetReport
+from .fleet import fleet_set_profile_as_default
+from .fleet import fleet_upsert_profile
+from .fanout import assume_roles_from_mfa_session
+from .role_cache import new_boto_session
+from .role_cache import warm_role_cache
+from .pool import SessionPool
+from .pool import session_pool
+from .pool import get_client
+from .identity import Identity
+from .identity import get_identity
+from .identity import get_sign_in_account
+from .identity import invalidate_identity
+from .directory import AccountDirectory
+from .directory import load_account_directory
+from .directory import build_account_directory
+from .scorer import set_default_scorer
 from .search import ProfileRegionPairFuzzyMatcher
 from .search import sort_profile_region_pairs
 from .search import get_sorted_profile_region_pairs
+from .search import SearchSession
+from .search import SearchCache
+from .search import search_cache
 from .url import get_account_alias
 from .url import get_sign_in_url
 from .url import get_switch_role_url
+from .export import ExportFormatEnum
+from .export import iter_url_records
+from .export import export_urls
@@ -5,39 +5,217 @@ This module provides a set of functions to interact with AWS CLI.
 """
 
 import typing as T
+import contextlib
 import dataclasses
+from datetime import datetime, timezone, timedelta
 from pathlib import Path
 import configparser
 
-from pathlib_mate import Path as PathlibMatePath
 from commentedconfigparser import CommentedConfigParser
 
-from .paths import path_config, path_credentials
+from .paths import path_config, path_credentials, get_dir_aws
+from .cache import StatSignature, ParsedFile, parsed_config_cache, share_parser
+from .splice import build_section_index, write_sections
+from .scanner import (
+    strip_comment,
+    iter_file_sections,
+)
+from .constants import CredentialKeyEnum
+from .lock import file_lock, file_locks
+from .catalog import (
+    CATALOG_FILENAME,
+    CatalogEntry,
+    ProfileCatalog,
+    iter_entries,
+    load_or_build_catalog,
+)
+from .graph import ProfileGraph, profile_graph_cache, stream_profile_and_region_pairs
+from .table import ProfileTable
 from . import exc
 
 
-def strip_comment(s: str) -> str:
-    return s.split("#")[0]
+def _parse_file(path: Path, signature: StatSignature) -> ParsedFile:
+    """
+    Read the file once, build the section offset index and the parser object
+    from the same raw content.
+    """
+    data = path.read_bytes()
+    try:
+        parser = CommentedConfigParser()
+        parser.read_string(data.decode("utf-8"), source=str(path))
+    except configparser.ParsingError as e:
+        raise exc.MalformedConfigFileError(str(e))
+    return ParsedFile(
+        signature=signature,
+        data=data,
+        index=build_section_index(data),
+        parser=parser,
+    )
+
+
+def _get_section_data(
+    parser: CommentedConfigParser,
+    section_name: str,
+) -> T.Optional[T.Dict[str, str]]:
+    """
+    Get the section data without the values inherited from the ``DEFAULT``
+    section, return None if the section doesn't exist.
+    """
+    try:
+        return dict(parser._sections[section_name])
+    except KeyError:
+        return None
+
+
+def format_expiration(expiration: datetime) -> str:
+    """
+    Format the session expiration time as an ISO 8601 string in UTC.
+    """
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return expiration.astimezone(timezone.utc).isoformat()
+
+
+def parse_expiration(value: str) -> T.Optional[datetime]:
+    """
+    Parse the ISO 8601 session expiration time, return None if it is malformed.
+    """
+    value = strip_comment(value).strip()
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    try:
+        expiration = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return expiration
+
+
+def get_mfa_session_token(
+    profile: str,
+    mfa_code: str,
+    hours: int = 12,
+    mfa_arn: T.Optional[str] = None,
+    awscli_config: T.Optional["AWSCliConfig"] = None,
+) -> T.Dict[str, T.Any]:  # pragma: no cover
+    """
+    Call the STS ``GetSessionToken`` API with the MFA code, return the
+    ``Credentials`` dict of the response, it has the ``AccessKeyId``,
+    ``SecretAccessKey``, ``SessionToken`` and ``Expiration`` key.
+
+    :param mfa_arn: MFA arn, if not provided, it will assume the MFA arn
+        is arn:aws:iam::{account_id}:mfa/{user_name}
+    :param awscli_config: the STS client is taken from the session pool of
+        this config, see :mod:`awscli_mate.pool`.
+    """
+    from .pool import get_client
+
+    sts = get_client("sts", profile, awscli_config=awscli_config)
+
+    if mfa_arn is None:
+        response = sts.get_caller_identity()
+        account_id = response["Account"]
+        user_arn = response["Arn"]
+        user_name = user_arn.split("/")[-1]
+        mfa_arn = f"arn:aws:iam::{account_id}:mfa/{user_name}"
+
+    # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/sts.html#STS.Client.get_session_token
+    response = sts.get_session_token(
+        SerialNumber=mfa_arn,
+        TokenCode=mfa_code,
+        DurationSeconds=hours * 3600,
+    )
+    return response["Credentials"]
 
 
 T_PROFILE_REGION_PAIR = T.Tuple[str, str]
 
+# by default, ``mfa_auth`` re-uses the existing session token if it is still
+# valid for at least this long
+DEFAULT_SESSION_MARGIN = 300
+
 
 @dataclasses.dataclass
 class AWSCliConfig:
     """
     Abstraction of the AWS CLI config files.
+
+    :param path_config: the path of the ``~/.aws/config`` file.
+    :param path_credentials: the path of the ``~/.aws/credentials`` file.
+    :param lock_timeout: max seconds to wait for the file lock,
+        see :mod:`awscli_mate.lock`.
+    :param use_catalog: if True, read-only listing methods load the profile
+        list from the persistent catalog file when it is fresh,
+        see :mod:`awscli_mate.catalog`.
     """
 
     path_config: Path = dataclasses.field(default=path_config)
     path_credentials: Path = dataclasses.field(default=path_credentials)
+    lock_timeout: float = dataclasses.field(default=10.0)
+    use_catalog: bool = dataclasses.field(default=False)
+
+    @classmethod
+    def from_home(cls, dir_home: T.Union[str, Path], **kwargs) -> "AWSCliConfig":
+        """
+        Create an :class:`AWSCliConfig` for the ``.aws`` directory under the
+        given home directory, instead of the home directory of current user.
+        """
+        dir_aws = get_dir_aws(Path(dir_home))
+        return cls(
+            path_config=dir_aws / "config",
+            path_credentials=dir_aws / "credentials",
+            **kwargs,
+        )
+
+    @property
+    def path_catalog(self) -> Path:
+        """
+        The catalog file lives next to the config file.
+        """
+        return self.path_config.parent / CATALOG_FILENAME
+
+    @property
+    def dir_cli_cache(self) -> Path:
+        """
+        The AWS CLI assumed role credentials cache folder, see
+        :mod:`awscli_mate.role_cache`.
+        """
+        return self.path_config.parent / "cli" / "cache"
+
+    def get_catalog(self) -> ProfileCatalog:
+        """
+        Load the profile catalog, rebuild it if it is stale.
+        """
+        if not self.path_config.exists():
+            raise exc.AWSConfigFileNotExistError(f"{self.path_config} not exist!")
+        with file_lock(self.path_config, timeout=self.lock_timeout):
+            return load_or_build_catalog(
+                path_catalog=self.path_catalog,
+                path_config=self.path_config,
+                path_credentials=self.path_credentials,
+            )
 
     def read_config(
         self,
+        readonly: bool = False,
     ) -> T.Tuple[CommentedConfigParser, CommentedConfigParser]:
         """
         parse ~/.aws/config and ~/.aws/credentials file, return two config objects.
+
+        The parsed objects are cached per process, the file is only re-parsed
+        when its stat signature changed. See :mod:`awscli_mate.cache`.
+
+        :param readonly: if True, return the shared cached objects, you should
+            not mutate them. Otherwise, return copy-on-write objects that are
+            safe to mutate, the data is only copied on the first mutation.
         """
+        config, credentials = self._read_parsed_files()
+        if readonly:
+            return config.parser, credentials.parser
+        return share_parser(config.parser), share_parser(credentials.parser)
+
+    def _ensure_files_exist(self):
         if not self.path_config.exists():
             raise exc.AWSConfigFileNotExistError(f"{self.path_config} not exist!")
         if not self.path_credentials.exists():
@@ -45,19 +223,80 @@ class AWSCliConfig:
                 f"{self.path_credentials} not exist!"
             )
 
-        try:
-            config = CommentedConfigParser()
-            config.read(self.path_config)
-        except configparser.ParsingError as e:
-            raise exc.MalformedConfigFileError(str(e))
+    def _read_parsed_files(self) -> T.Tuple[ParsedFile, ParsedFile]:
+        """
+        Read the cached :class:`~awscli_mate.cache.ParsedFile` of the
+        ~/.aws/config and ~/.aws/credentials file.
+        """
+        self._ensure_files_exist()
+        with file_locks(
+            [self.path_config, self.path_credentials],
+            exclusive=False,
+            timeout=self.lock_timeout,
+        ):
+            config = parsed_config_cache.get(self.path_config, _parse_file)
+            credentials = parsed_config_cache.get(self.path_credentials, _parse_file)
+        return config, credentials
 
-        try:
-            credentials = CommentedConfigParser()
-            credentials.read(self.path_credentials)
-        except configparser.ParsingError as e:
-            raise exc.MalformedConfigFileError(str(e))
+    def _write_sections(
+        self,
+        parsed_file: ParsedFile,
+        parser: CommentedConfigParser,
+        section_names: T.Iterable[str],
+    ):
+        """
+        Write the given sections of the parser object back to the file,
+        other sections are copied byte for byte. See :mod:`awscli_mate.splice`.
+        """
+        write_sections(
+            path=Path(parsed_file.signature.path),
+            data=parsed_file.data,
+            index=parsed_file.index,
+            changes={
+                section_name: _get_section_data(parser, section_name)
+                for section_name in section_names
+            },
+        )
 
-        return config, credentials
+    def get_profile_graph(self) -> ProfileGraph:
+        """
+        Get the :class:`~awscli_mate.graph.ProfileGraph` that resolves the
+        ``source_profile`` and ``sso_session`` references. The graph is built
+        once per config file version.
+        """
+        if not self.path_config.exists():
+            raise exc.AWSConfigFileNotExistError(f"{self.path_config} not exist!")
+
+        def get_entries() -> T.List[CatalogEntry]:
+            if self.use_catalog:
+                return self.get_catalog().entries
+            with file_lock(self.path_config, timeout=self.lock_timeout):
+                return ProfileCatalog.build(
+                    self.path_config, self.path_credentials
+                ).entries
+
+        return profile_graph_cache.get(self.path_config, get_entries)
+
+    def get_profile_table(self) -> ProfileTable:
+        """
+        Get the compact, columnar :class:`~awscli_mate.table.ProfileTable`
+        of the named profiles, except the default profile. If a profile
+        doesn't have a region, the region column is the effective region
+        resolved by :meth:`AWSCliConfig.get_profile_graph`.
+        """
+        graph = self.get_profile_graph()
+
+        def resolve_region(profile: str) -> T.Optional[str]:
+            try:
+                return graph.effective_region(profile)
+            except exc.ProfileNotFoundError:  # pragma: no cover
+                return None
+
+        with file_lock(self.path_config, timeout=self.lock_timeout):
+            return ProfileTable.from_sections(
+                iter_file_sections(self.path_config),
+                resolve_region=resolve_region,
+            )
 
     def extract_profile_and_region_pairs(self) -> T.List[T_PROFILE_REGION_PAIR]:
         """
@@ -69,21 +308,44 @@ class AWSCliConfig:
             note that the credentials file is not used here, config file
             should be your top priority.
 
+        This is a read-only fast path, it streams the config file in one pass
+        without building the full parser. See :mod:`awscli_mate.scanner`.
+        If :attr:`AWSCliConfig.use_catalog` is True, it loads from the
+        catalog file when it is fresh.
+
+        If a profile doesn't have a region, the region is inherited from
+        the ``source_profile`` chain, see :mod:`awscli_mate.graph`.
+
         :return: a list of (profile, region) pairs
         """
-        config, _ = self.read_config()
-        pairs = list()
-        for section_name, section in config.items():
-            # extract the profile name
-            # we don't want the configparser's DEFAULT section
-            # and also we don't want to use the default profile as the base profile
-            if not section_name.startswith("profile "):
-                continue
-            profile = section_name[8:]
-            # extract the region name
-            region = section.get("region", "unknown-region")
-            pairs.append((profile, region))
-        return pairs
+        return list(self.get_profile_graph().iter_profile_and_region_pairs())
+
+    def iter_profiles(self) -> T.Iterator[T_PROFILE_REGION_PAIR]:
+        """
+        Stream ``(profile, region)`` pairs from the config file, except the
+        default profile. Each pair is yielded as soon as its section is
+        parsed, so the time to the first pair doesn't depend on the number
+        of profiles.
+
+        The pairs are always the same as
+        :meth:`AWSCliConfig.extract_profile_and_region_pairs`, the region is
+        inherited from the ``source_profile`` chain. If the profile graph of
+        the current config version is already built, the pairs come from the
+        graph. Otherwise, they are resolved while streaming, see
+        :func:`~awscli_mate.graph.stream_profile_and_region_pairs`.
+
+        .. note::
+
+            No file lock is held while streaming. The file is always replaced
+            atomically, the opened file keeps reading the old version.
+        """
+        graph = profile_graph_cache.peek(self.path_config)
+        if graph is not None:
+            yield from graph.iter_profile_and_region_pairs()
+            return
+        if not self.path_config.exists():
+            raise exc.AWSConfigFileNotExistError(f"{self.path_config} not exist!")
+        yield from stream_profile_and_region_pairs(iter_entries(self.path_config))
 
     def ensure_profile_exists(
         self,
@@ -173,31 +435,78 @@ class AWSCliConfig:
         if profile == "default":
             return None, None
 
-        config, credentials = self.read_config()
+        with self.transaction() as tx:
+            tx.set_profile_as_default(profile)
+        return tx.config, tx.credentials
 
-        self.ensure_profile_exists("default", config, credentials)
-        self.ensure_profile_exists(profile, config, credentials)
+    @contextlib.contextmanager
+    def transaction(self) -> T.Iterator["Transaction"]:
+        """
+        Batch many changes in memory, then write each changed file only once
+        at the end. Both files are read once at the beginning.
 
-        flag_is_config_changed = self.replace_section_data(
-            config,
-            from_section_name=f"profile {profile}",
-            to_section_name="default",
-        )
-        flag_is_credentials_changed = self.replace_section_data(
-            credentials,
-            from_section_name=profile,
-            to_section_name="default",
-        )
+        Usage example::
 
-        if flag_is_config_changed:
-            with self.path_config.open("w") as f:
-                config.write(f)
+            with AWSCliConfig().transaction() as tx:
+                tx.set_profile_as_default("my_profile")
+                tx.upsert_credentials("my_profile_mfa", "AAA", "BBB", "CCC")
 
-        if flag_is_credentials_changed:
-            with self.path_credentials.open("w") as f:
-                credentials.write(f)
+        If any error is raised in the ``with`` block, nothing is written.
 
-        return config, credentials
+        An exclusive lock is held on both files during the whole transaction,
+        so concurrent writers in other processes won't lose updates.
+        """
+        # check the file existence before creating the lock file
+        self._ensure_files_exist()
+        with file_locks(
+            [self.path_config, self.path_credentials],
+            exclusive=True,
+            timeout=self.lock_timeout,
+        ):
+            parsed_config, parsed_credentials = self._read_parsed_files()
+            tx = Transaction(
+                awscli_config=self,
+                parsed_config=parsed_config,
+                parsed_credentials=parsed_credentials,
+            )
+            yield tx
+            tx.commit()
+
+    def get_session_expiration(self, profile: str) -> T.Optional[datetime]:
+        """
+        Get the expiration time of the session credentials of the profile,
+        return None if the profile doesn't exist, or the expiration time
+        is not recorded. See :meth:`Transaction.upsert_credentials`.
+        """
+        _, credentials = self._read_parsed_files()
+        data = _get_section_data(credentials.parser, profile)
+        if data is None:
+            return None
+        value = data.get(CredentialKeyEnum.aws_session_expiration.value)
+        if value is None:
+            return None
+        return parse_expiration(value)
+
+    def is_session_valid(
+        self,
+        profile: str,
+        margin: int = DEFAULT_SESSION_MARGIN,
+    ) -> bool:
+        """
+        Check if the session credentials of the profile is still valid for at
+        least ``margin`` seconds, without calling any AWS API. It is a
+        stat call when the credentials file is not changed.
+        """
+        try:
+            expiration = self.get_session_expiration(profile)
+        except (
+            exc.AWSConfigFileNotExistError,
+            exc.AWSCredentialsFileNotExistError,
+        ):
+            return False
+        if expiration is None:
+            return False
+        return expiration - timedelta(seconds=margin) > datetime.now(timezone.utc)
 
     def mfa_auth(
         self,
@@ -206,12 +515,14 @@ class AWSCliConfig:
         hours: int = 12,
         overwrite_default: bool = False,
         mfa_arn: T.Optional[str] = None,
-    ) -> T.Tuple[CommentedConfigParser, CommentedConfigParser]:  # pragma: no cover
+        margin: T.Optional[int] = DEFAULT_SESSION_MARGIN,
+    ) -> T.Tuple[CommentedConfigParser, CommentedConfigParser]:
         """
         Given a base ``${profile}``, do MFA authentication with ``mfa_code``,
         create / update the new aws profile ``${profile}_mfa`` using the returned
         temp token. This function will update the ``~/.aws/credential`` and
-        ``~/.aws/config`` file inplace.
+        ``~/.aws/config`` file inplace. The expiration time of the token is
+        recorded in the credentials section.
 
         :param aws_profile: The source AWS profile which has MFA enabled
         :param mfa_code: six digit MFA code
@@ -219,6 +530,9 @@ class AWSCliConfig:
         :param overwrite_default: whether to overwrite the default awscli profile
         :param mfa_arn: MFA arn, if not provided, it will assume the MFA arn
             is arn:aws:iam::{account_id}:mfa/{user_name}
+        :param margin: if the existing ``${profile}_mfa`` session is still
+            valid for more than ``margin`` seconds, don't call STS, re-use it.
+            Use None to always get a new token.
         """
         # validate input
         if profile == "default":
@@ -229,72 +543,288 @@ class AWSCliConfig:
             msg = "mfa_code must be a six digit number"
             raise ValueError(msg)
 
+        new_profile = "{}_mfa".format(profile)
+        if margin is not None and self.is_session_valid(new_profile, margin=margin):
+            if not overwrite_default:
+                return self.read_config()
+            with self.transaction() as tx:
+                tx.copy_section_data_if_changed(
+                    tx.config, f"profile {new_profile}", "default"
+                )
+                tx.copy_section_data_if_changed(tx.credentials, new_profile, "default")
+            return tx.config, tx.credentials
+
         # get MFA authentication session token
-        import boto3
-
-        boto_ses = boto3.session.Session(profile_name=profile)
-        sts = boto_ses.client("sts")
-
-        if mfa_arn is None:
-            response = sts.get_caller_identity()
-            account_id = response["Account"]
-            user_arn = response["Arn"]
-            user_name = user_arn.split("/")[-1]
-            mfa_arn = f"arn:aws:iam::{account_id}:mfa/{user_name}"
-
-        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/sts.html#STS.Client.get_session_token
-        response = sts.get_session_token(
-            SerialNumber=mfa_arn,
-            TokenCode=mfa_code,
-            DurationSeconds=hours * 3600,
+        credentials = get_mfa_session_token(
+            profile=profile,
+            mfa_code=mfa_code,
+            hours=hours,
+            mfa_arn=mfa_arn,
+            awscli_config=self,
         )
 
-        aws_access_key_id = response["Credentials"]["AccessKeyId"]
-        aws_secret_access_key = response["Credentials"]["SecretAccessKey"]
-        aws_session_token = response["Credentials"]["SessionToken"]
+        # update ~/.aws/config and ~/.aws/credentials file
+        # only the changed sections are re-written
+        with self.transaction() as tx:
+            # update config data
+            # set initial value if section not exists
+            #
+            # because mfa_auth is for the credentials
+            # we respect the ``..._mfa`` profile if it already exists,
+            # and it is different from te base profile
+            # we don't do ``replace_section_data`` here
+            if f"profile {new_profile}" not in tx.config:
+                tx.copy_section_data(
+                    tx.config,
+                    from_section_name=f"profile {profile}",
+                    to_section_name=f"profile {new_profile}",
+                    create_if_not_exist=True,
+                )
+
+            # update credential data
+            tx.upsert_credentials(
+                profile=new_profile,
+                aws_access_key_id=credentials["AccessKeyId"],
+                aws_secret_access_key=credentials["SecretAccessKey"],
+                aws_session_token=credentials["SessionToken"],
+                expiration=credentials.get("Expiration"),
+            )
 
-        # read existing config / credentials data
-        config, credentials = self.read_config()
+            if overwrite_default:
+                tx.copy_section_data(tx.config, f"profile {new_profile}", "default")
+                tx.copy_section_data(tx.credentials, new_profile, "default")
 
-        # update config / credentials data in memory
-        new_profile = "{}_mfa".format(profile)
+        return tx.config, tx.credentials
 
-        # update config data
-        # set initial value if section not exists
-        if f"profile {new_profile}" not in config:
-            flag_is_config_changed = True
-            self.copy_section_data(
-                config,
-                from_section_name=f"profile {profile}",
-                to_section_name=f"profile {new_profile}",
-            )
+
+@dataclasses.dataclass
+class Transaction:
+    """
+    A batch of in-memory changes to the ~/.aws/config and ~/.aws/credentials
+    file. Don't create it directly, use :meth:`AWSCliConfig.transaction`.
+
+    All the mutation methods take the parser object to change as the first
+    argument, it has to be either :attr:`Transaction.config` or
+    :attr:`Transaction.credentials`. The changed section names are tracked,
+    and only those sections are written back on :meth:`Transaction.commit`.
+    """
+
+    awscli_config: AWSCliConfig
+    parsed_config: ParsedFile
+    parsed_credentials: ParsedFile
+    config: CommentedConfigParser = dataclasses.field(init=False)
+    credentials: CommentedConfigParser = dataclasses.field(init=False)
+    # use dict as an ordered set, new sections are appended in this order
+    _changed_config_sections: T.Dict[str, None] = dataclasses.field(
+        init=False, default_factory=dict
+    )
+    _changed_credentials_sections: T.Dict[str, None] = dataclasses.field(
+        init=False, default_factory=dict
+    )
+
+    def __post_init__(self):
+        self.config = share_parser(self.parsed_config.parser)
+        self.credentials = share_parser(self.parsed_credentials.parser)
+
+    def _mark_changed(self, parser: CommentedConfigParser, section_name: str):
+        if parser is self.config:
+            self._changed_config_sections[section_name] = None
+        elif parser is self.credentials:
+            self._changed_credentials_sections[section_name] = None
+        else:  # pragma: no cover
+            raise ValueError("parser has to be either tx.config or tx.credentials")
+
+    @property
+    def is_changed(self) -> bool:
+        return bool(self._changed_config_sections or self._changed_credentials_sections)
+
+    def copy_section_data(
+        self,
+        parser: CommentedConfigParser,
+        from_section_name: str,
+        to_section_name: str,
+        create_if_not_exist: bool = False,
+    ):
+        """
+        See :meth:`AWSCliConfig.copy_section_data`.
+        """
+        self.awscli_config.copy_section_data(
+            parser,
+            from_section_name=from_section_name,
+            to_section_name=to_section_name,
+            create_if_not_exist=create_if_not_exist,
+        )
+        self._mark_changed(parser, to_section_name)
+
+    def replace_section_data(
+        self,
+        parser: CommentedConfigParser,
+        from_section_name: str,
+        to_section_name: str,
+        create_if_not_exist: bool = False,
+    ) -> bool:
+        """
+        See :meth:`AWSCliConfig.replace_section_data`.
+        """
+        flag = self.awscli_config.replace_section_data(
+            parser,
+            from_section_name=from_section_name,
+            to_section_name=to_section_name,
+            create_if_not_exist=create_if_not_exist,
+        )
+        if flag:
+            self._mark_changed(parser, to_section_name)
+        return flag
+
+    def copy_section_data_if_changed(
+        self,
+        parser: CommentedConfigParser,
+        from_section_name: str,
+        to_section_name: str,
+    ) -> bool:
+        """
+        Same as :meth:`Transaction.copy_section_data` with
+        ``create_if_not_exist=True``, but the section is not marked as
+        changed if it already has all the data. Return a boolean flag to
+        indicate that whether there is any data change.
+        """
+        data = _get_section_data(parser, from_section_name)
+        if data is None:
+            raise exc.ProfileNotFoundError(f"Section [{from_section_name}] not found")
+        existing = _get_section_data(parser, to_section_name)
+        if existing is not None and all(
+            existing.get(k) == v for k, v in data.items()
+        ):
+            return False
+        self.copy_section_data(
+            parser,
+            from_section_name=from_section_name,
+            to_section_name=to_section_name,
+            create_if_not_exist=True,
+        )
+        return True
+
+    def upsert_section(
+        self,
+        parser: CommentedConfigParser,
+        section_name: str,
+        data: T.Mapping[str, str],
+    ):
+        """
+        Create or replace a section with the given data.
+        """
+        if section_name in parser:
+            self.awscli_config.clear_section_data(parser, section_name)
         else:
-            flag_is_config_changed = False
-
-        # because mfa_auth is for the credentials
-        # we respect the ``..._mfa`` profile if it already exists,
-        # and it is different from te base profile
-        # we don't do ``replace_section_data`` here
-
-        # update credential data
-        # set initial value if section not exists
-        if new_profile not in credentials:
-            credentials[new_profile] = {}
-        self.clear_section_data(credentials, new_profile)
-        credentials[new_profile]["aws_access_key_id"] = aws_access_key_id
-        credentials[new_profile]["aws_secret_access_key"] = aws_secret_access_key
-        credentials[new_profile]["aws_session_token"] = aws_session_token
-
-        if overwrite_default:
-            self.copy_section_data(config, f"profile {new_profile}", "default")
-            self.copy_section_data(credentials, new_profile, "default")
+            parser[section_name] = {}
+        for k, v in data.items():
+            parser[section_name][k] = v
+        self._mark_changed(parser, section_name)
 
-        # update ~/.aws/config and ~/.aws/credentials file
-        if flag_is_config_changed:
-            with PathlibMatePath(self.path_config).atomic_open("w", overwrite=True) as f:
-                config.write(f)
+    def merge_section(
+        self,
+        parser: CommentedConfigParser,
+        section_name: str,
+        data: T.Mapping[str, str],
+    ) -> bool:
+        """
+        Create the section if not exists, and set the keys that are not in
+        the section yet, the existing keys are kept as it is. Return a
+        boolean flag to indicate that whether there is any data change.
+        """
+        changed = False
+        if section_name not in parser:
+            parser[section_name] = {}
+            changed = True
+        section = parser[section_name]
+        for k, v in data.items():
+            if k not in section:
+                section[k] = v
+                changed = True
+        if changed:
+            self._mark_changed(parser, section_name)
+        return changed
+
+    def remove_section(
+        self,
+        parser: CommentedConfigParser,
+        section_name: str,
+    ) -> bool:
+        """
+        Remove a section, return a boolean flag to indicate that whether
+        the section existed.
+        """
+        flag = parser.remove_section(section_name)
+        if flag:
+            self._mark_changed(parser, section_name)
+        return flag
+
+    def set_profile_as_default(self, profile: str) -> bool:
+        """
+        See :meth:`AWSCliConfig.set_profile_as_default`, return a boolean flag
+        to indicate that whether there is any data change.
+        """
+        if profile == "default":
+            return False
+        awscli_config = self.awscli_config
+        awscli_config.ensure_profile_exists("default", self.config, self.credentials)
+        awscli_config.ensure_profile_exists(profile, self.config, self.credentials)
+        flag_is_config_changed = self.replace_section_data(
+            self.config,
+            from_section_name=f"profile {profile}",
+            to_section_name="default",
+        )
+        flag_is_credentials_changed = self.replace_section_data(
+            self.credentials,
+            from_section_name=profile,
+            to_section_name="default",
+        )
+        return flag_is_config_changed or flag_is_credentials_changed
 
-        with PathlibMatePath(self.path_credentials).atomic_open("w", overwrite=True) as f:
-            credentials.write(f)
+    def upsert_credentials(
+        self,
+        profile: str,
+        aws_access_key_id: str,
+        aws_secret_access_key: str,
+        aws_session_token: T.Optional[str] = None,
+        expiration: T.Optional[datetime] = None,
+    ):
+        """
+        Create or replace the credentials section of the given profile.
 
-        return config, credentials
+        :param expiration: the expiration time of the session credentials,
+            it is recorded as ``aws_session_expiration`` in ISO 8601 format,
+            see :meth:`AWSCliConfig.is_session_valid`.
+        """
+        data = {
+            CredentialKeyEnum.aws_access_key_id.value: aws_access_key_id,
+            CredentialKeyEnum.aws_secret_access_key.value: aws_secret_access_key,
+        }
+        if aws_session_token is not None:
+            data[CredentialKeyEnum.aws_session_token.value] = aws_session_token
+        if expiration is not None:
+            data[
+                CredentialKeyEnum.aws_session_expiration.value
+            ] = format_expiration(expiration)
+        self.upsert_section(self.credentials, profile, data)
+
+    def commit(self):
+        """
+        Write the changed sections back to the files, each changed file
+        is written only once.
+
+        The changes are always applied to the content read at the beginning
+        of the transaction, so it is safe to commit multiple times.
+        """
+        if self._changed_config_sections:
+            self.awscli_config._write_sections(
+                self.parsed_config,
+                self.config,
+                list(self._changed_config_sections),
+            )
+        if self._changed_credentials_sections:
+            self.awscli_config._write_sections(
+                self.parsed_credentials,
+                self.credentials,
+                list(self._changed_credentials_sections),
+            )
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+"""
+Process level cache for the parsed ``~/.aws/config`` and ``~/.aws/credentials``
+files.
+
+Parsing a big config file with :class:`~commentedconfigparser.CommentedConfigParser`
+is expensive, and most of the time the file is not changed between two reads.
+This module caches the parsed object per file, and uses the file stat
+signature ``(path, st_mtime_ns, st_size, st_ino)`` to detect changes.
+
+The cached parser object is shared, so it should be treated as read-only.
+Use :func:`clone_parser` to get a private copy before mutating it, or
+:func:`share_parser` to get a copy-on-write view that only pays the copy
+when it is actually mutated.
+
+Besides the parser object, the raw bytes and the section offset index
+(see :mod:`awscli_mate.splice`) are also cached, so that we can write back
+only the changed sections.
+"""
+
+import typing as T
+import os
+import threading
+import dataclasses
+import configparser
+from pathlib import Path
+
+from commentedconfigparser import CommentedConfigParser
+
+from .splice import T_SECTION_INDEX
+
+
+@dataclasses.dataclass(frozen=True)
+class StatSignature:
+    """
+    The identity of a specific version of a file on disk.
+
+    If any of the attributes changed, the file content is considered changed.
+    """
+
+    path: str
+    mtime_ns: int
+    size: int
+    ino: int
+
+    @classmethod
+    def from_path(cls, path: T.Union[str, Path]) -> "StatSignature":
+        st = os.stat(path)
+        return cls(
+            path=str(path),
+            mtime_ns=st.st_mtime_ns,
+            size=st.st_size,
+            ino=st.st_ino,
+        )
+
+
+@dataclasses.dataclass
+class ParsedFile:
+    """
+    The parsed result of a config file.
+
+    :param signature: the stat signature of the file when it is read.
+    :param data: the raw content of the file.
+    :param index: the section offset index of the raw content.
+    :param parser: the parsed config object.
+    """
+
+    signature: StatSignature
+    data: bytes
+    index: T_SECTION_INDEX
+    parser: CommentedConfigParser
+
+
+def clone_parser(parser: CommentedConfigParser) -> CommentedConfigParser:
+    """
+    Create a private copy of a parsed config object.
+
+    It is way faster than :func:`copy.deepcopy` or re-parse the file, because
+    section data are plain ``str -> str`` dict, a shallow copy of each section
+    is enough.
+    """
+    new_parser = CommentedConfigParser()
+    new_parser._defaults = dict(parser._defaults)
+    new_parser._sections = {
+        name: dict(section) for name, section in parser._sections.items()
+    }
+    new_parser._proxies.update(
+        {name: configparser.SectionProxy(new_parser, name) for name in parser._sections}
+    )
+    if parser._comment_map is not None:
+        new_parser._comment_map = {
+            section: {key: list(lines) for key, lines in mapper.items()}
+            for section, mapper in parser._comment_map.items()
+        }
+    return new_parser
+
+
+class _LazyProxies(dict):
+    """
+    The section proxy mapping of :class:`CopyOnWriteParser`, the
+    :class:`~configparser.SectionProxy` objects are created on first access
+    instead of one per section up front.
+    """
+
+    def __init__(self, parser: CommentedConfigParser):
+        super().__init__()
+        self._parser = parser
+
+    def __missing__(self, key: str) -> configparser.SectionProxy:
+        if key not in self._parser._sections:
+            raise KeyError(key)
+        proxy = configparser.SectionProxy(self._parser, key)
+        self[key] = proxy
+        return proxy
+
+    def __delitem__(self, key: str):
+        self.pop(key, None)
+
+
+class CopyOnWriteParser(CommentedConfigParser):
+    """
+    A parsed config object that shares the data of a cached parser object,
+    and makes a private copy of it right before the first mutation. Don't
+    create it directly, use :func:`share_parser`.
+
+    The mutation has to go through the parser or section proxy methods,
+    which is what :class:`~configparser.ConfigParser` exposes.
+    """
+
+    def __init__(self, source: CommentedConfigParser):
+        self._shared = False
+        super().__init__()
+        self._defaults = source._defaults
+        self._sections = source._sections
+        self._comment_map = source._comment_map
+        proxies = _LazyProxies(self)
+        proxies.update(self._proxies)
+        self._proxies = proxies
+        self._shared = True
+
+    @property
+    def is_shared(self) -> bool:
+        """
+        Whether the data is still shared with the cached parser object.
+        """
+        return self._shared
+
+    def _materialize(self):
+        if not self._shared:
+            return
+        self._shared = False
+        self._defaults = dict(self._defaults)
+        self._sections = {
+            name: dict(section) for name, section in self._sections.items()
+        }
+        if self._comment_map is not None:
+            self._comment_map = {
+                section: {key: list(lines) for key, lines in mapper.items()}
+                for section, mapper in self._comment_map.items()
+            }
+
+    def defaults(self):
+        # the returned mapping is mutable
+        self._materialize()
+        return super().defaults()
+
+    def add_section(self, section):
+        self._materialize()
+        return super().add_section(section)
+
+    def remove_section(self, section):
+        self._materialize()
+        return super().remove_section(section)
+
+    def set(self, section, option, value=None):
+        self._materialize()
+        return super().set(section, option, value)
+
+    def remove_option(self, section, option):
+        self._materialize()
+        return super().remove_option(section, option)
+
+    def read_dict(self, dictionary, source="<dict>"):
+        self._materialize()
+        return super().read_dict(dictionary, source)
+
+    def _read(self, fp, fpname):
+        self._materialize()
+        return super()._read(fp, fpname)
+
+    def _map_comments(self, content):
+        self._materialize()
+        return super()._map_comments(content)
+
+    def __setitem__(self, key, value):
+        self._materialize()
+        return super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._materialize()
+        return super().__delitem__(key)
+
+    def write(self, fp, space_around_delimiters: bool = True):
+        # writing out merges the comments of the deleted keys in place
+        self._materialize()
+        return super().write(fp, space_around_delimiters)
+
+
+def share_parser(parser: CommentedConfigParser) -> CopyOnWriteParser:
+    """
+    Create a copy-on-write view of a parsed config object, it is O(1) until
+    the first mutation, then the data is copied like :func:`clone_parser`.
+    """
+    return CopyOnWriteParser(parser)
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """
+    Hit / miss counters of a cache.
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_ratio(self) -> float:
+        if self.total == 0:
+            return 0.0
+        return self.hits / self.total
+
+
+@dataclasses.dataclass
+class ParsedConfigCache:
+    """
+    Cache the parsed config file per file path. Only the latest version
+    of each file is kept.
+
+    :param _entries: the key is the path of the file, the value is the
+        :class:`ParsedFile` object.
+    :param stats: the hit / miss counters.
+    """
+
+    _entries: T.Dict[str, ParsedFile] = dataclasses.field(default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    stats: CacheStats = dataclasses.field(default_factory=CacheStats)
+
+    def get(
+        self,
+        path: Path,
+        parse: T.Callable[[Path, StatSignature], ParsedFile],
+    ) -> ParsedFile:
+        """
+        Get the parsed result of the given file, call ``parse`` to parse
+        the file if it is not in the cache or the file is changed.
+
+        The returned object is shared, don't mutate it.
+        """
+        signature = StatSignature.from_path(path)
+        key = signature.path
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self.stats.hits += 1
+                return entry
+            self.stats.misses += 1
+        entry = parse(path, signature)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, path: Path):
+        """
+        Remove the cached object of the given file.
+        """
+        with self._lock:
+            self._entries.pop(str(path), None)
+
+    def clear(self):
+        """
+        Remove all cached objects and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.stats = CacheStats()
+
+
+parsed_config_cache = ParsedConfigCache()
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent on-disk profile catalog.
+
+The catalog file (``~/.aws/.awscli_mate_catalog`` by default) stores the
+parsed profile list as JSON, tagged with the stat signature of the
+``~/.aws/config`` and ``~/.aws/credentials`` file. When both files are not
+changed, loading the catalog skips the config file parsing entirely. When
+either file changed, the catalog is rebuilt automatically.
+"""
+
+import typing as T
+import json
+import hashlib
+import dataclasses
+from pathlib import Path
+
+from pathlib_mate import Path as PathlibMatePath
+
+from .constants import SectionTypeEnum, ConfigKeyEnum
+from .cache import StatSignature
+from .scanner import DEFAULT_SECTION, iter_file_sections
+
+CATALOG_FILENAME = ".awscli_mate_catalog"
+CATALOG_VERSION = 1
+
+
+def get_content_hash(data: T.Mapping[str, str]) -> str:
+    """
+    Get the hash of a section data, it changes when any key or value changed.
+    """
+    content = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclasses.dataclass
+class CatalogEntry:
+    """
+    A section in the ``~/.aws/config`` file.
+
+    :param section: the raw section header, e.g. ``profile my_profile``.
+    :param name: the profile or sso session name, e.g. ``my_profile``.
+    :param section_type: the value of :class:`~awscli_mate.constants.SectionTypeEnum`.
+    :param region: the ``region`` key of the section.
+    :param role_arn: the ``role_arn`` key of the section.
+    :param source_profile: the ``source_profile`` key of the section.
+    :param sso_session: the ``sso_session`` key of the section.
+    :param hash: the content hash of the section data.
+    """
+
+    section: str
+    name: str
+    section_type: str
+    region: T.Optional[str] = None
+    role_arn: T.Optional[str] = None
+    source_profile: T.Optional[str] = None
+    sso_session: T.Optional[str] = None
+    hash: T.Optional[str] = None
+
+    @classmethod
+    def from_section(
+        cls,
+        section: str,
+        data: T.Mapping[str, str],
+    ) -> T.Optional["CatalogEntry"]:
+        """
+        Create an entry from the section data, return None if it is not a
+        profile or sso session section.
+        """
+        if section == "default":
+            name, section_type = section, SectionTypeEnum.profile.value
+        else:
+            parts = section.split(" ", 1)
+            if len(parts) != 2:
+                return None
+            section_type, name = parts
+            if section_type not in (
+                SectionTypeEnum.profile.value,
+                SectionTypeEnum.sso_session.value,
+            ):
+                return None
+        return cls(
+            section=section,
+            name=name.strip(),
+            section_type=section_type,
+            region=data.get(ConfigKeyEnum.region.value),
+            role_arn=data.get(ConfigKeyEnum.role_arn.value),
+            source_profile=data.get(ConfigKeyEnum.source_profile.value),
+            sso_session=data.get(ConfigKeyEnum.sso_session.value),
+            hash=get_content_hash(data),
+        )
+
+
+def _dump_signature(signature: T.Optional[StatSignature]) -> T.Optional[dict]:
+    if signature is None:
+        return None
+    return dataclasses.asdict(signature)
+
+
+def _load_signature(data: T.Optional[dict]) -> T.Optional[StatSignature]:
+    if data is None:
+        return None
+    return StatSignature(**data)
+
+
+def _count_default_sections(path_config: Path) -> int:
+    """
+    Count the ``[DEFAULT]`` section header lines without parsing the
+    sections. An indented header may be a continuation line, it is counted
+    anyway, so the count is never less than the actual number.
+    """
+    n = 0
+    with open(path_config, "r", encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if (
+                stripped.startswith("[")
+                and "]" in stripped
+                and stripped[1 : stripped.rindex("]")] == DEFAULT_SECTION
+            ):
+                n += 1
+    return n
+
+
+def iter_entries(path_config: Path) -> T.Iterable[CatalogEntry]:
+    """
+    Stream the profile and sso session sections of the config file.
+
+    Same as ``ConfigParser``, the ``[DEFAULT]`` region is applied to all
+    sections without a region, no matter where ``[DEFAULT]`` is in the file.
+    If a section without a region comes before ``[DEFAULT]``, the entries
+    from it on are held back until the last ``[DEFAULT]`` is read.
+    """
+    n_default = _count_default_sections(path_config)
+    default_region = None
+    held: T.List[CatalogEntry] = list()
+
+    def flush() -> T.List[CatalogEntry]:
+        entries = list(held)
+        held.clear()
+        for entry in entries:
+            if entry.region is None:
+                entry.region = default_region
+        return entries
+
+    for section, data in iter_file_sections(path_config):
+        if section == DEFAULT_SECTION:
+            default_region = data.get(ConfigKeyEnum.region.value, default_region)
+            n_default -= 1
+            if n_default == 0:
+                yield from flush()
+            continue
+        entry = CatalogEntry.from_section(section, data)
+        if entry is None:
+            continue
+        if n_default == 0:
+            if entry.region is None:
+                entry.region = default_region
+            yield entry
+        elif held or entry.region is None:
+            held.append(entry)
+        else:
+            yield entry
+    yield from flush()
+
+
+def _get_signature(path: Path) -> T.Optional[StatSignature]:
+    try:
+        return StatSignature.from_path(path)
+    except FileNotFoundError:
+        return None
+
+
+@dataclasses.dataclass
+class ProfileCatalog:
+    """
+    The parsed profile list of the ``~/.aws/config`` file.
+
+    :param config_signature: the stat signature of the config file when
+        the catalog is built.
+    :param credentials_signature: the stat signature of the credentials file
+        when the catalog is built, None if the file doesn't exist.
+    :param entries: profile and sso session sections, in the order they
+        appear in the config file.
+    """
+
+    config_signature: StatSignature
+    credentials_signature: T.Optional[StatSignature]
+    entries: T.List[CatalogEntry] = dataclasses.field(default_factory=list)
+
+    @classmethod
+    def build(
+        cls,
+        path_config: Path,
+        path_credentials: Path,
+    ) -> "ProfileCatalog":
+        """
+        Build the catalog by scanning the config file.
+        """
+        # take the signature before reading the file, if the file is changed
+        # while reading, the catalog will be considered stale next time
+        config_signature = StatSignature.from_path(path_config)
+        credentials_signature = _get_signature(path_credentials)
+        return cls(
+            config_signature=config_signature,
+            credentials_signature=credentials_signature,
+            entries=list(iter_entries(path_config)),
+        )
+
+    def is_fresh(
+        self,
+        path_config: Path,
+        path_credentials: Path,
+    ) -> bool:
+        """
+        Check if both config and credentials file are not changed since
+        the catalog is built.
+        """
+        return (self.config_signature == _get_signature(path_config)) and (
+            self.credentials_signature == _get_signature(path_credentials)
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "version": CATALOG_VERSION,
+            "config_signature": _dump_signature(self.config_signature),
+            "credentials_signature": _dump_signature(self.credentials_signature),
+            "entries": [
+                [getattr(entry, field.name) for field in _entry_fields]
+                for entry in self.entries
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProfileCatalog":
+        return cls(
+            config_signature=_load_signature(data["config_signature"]),
+            credentials_signature=_load_signature(data["credentials_signature"]),
+            entries=[CatalogEntry(*row) for row in data["entries"]],
+        )
+
+    def dump(self, path: Path):
+        """
+        Write the catalog to the given path atomically.
+        """
+        with PathlibMatePath(path).atomic_open("w", overwrite=True) as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: Path) -> T.Optional["ProfileCatalog"]:
+        """
+        Load the catalog from the given path, return None if the file doesn't
+        exist or is not a valid catalog.
+        """
+        try:
+            data = json.loads(Path(path).read_text())
+            if data.get("version") != CATALOG_VERSION:
+                return None
+            return cls.from_dict(data)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @property
+    def profile_entries(self) -> T.List[CatalogEntry]:
+        """
+        Named profile entries, except the default profile.
+        """
+        return [
+            entry
+            for entry in self.entries
+            if entry.section_type == SectionTypeEnum.profile.value
+            and entry.section != "default"
+        ]
+
+
+_entry_fields = dataclasses.fields(CatalogEntry)
+
+
+def load_or_build_catalog(
+    path_catalog: Path,
+    path_config: Path,
+    path_credentials: Path,
+) -> ProfileCatalog:
+    """
+    Load the catalog if it is fresh, otherwise rebuild and dump it.
+    """
+    catalog = ProfileCatalog.load(path_catalog)
+    if catalog is not None and catalog.is_fresh(path_config, path_credentials):
+        return catalog
+    catalog = ProfileCatalog.build(path_config, path_credentials)
+    try:
+        catalog.dump(path_catalog)
+    except OSError:  # pragma: no cover
+        # the catalog is an optimization, don't fail if we cannot write it
+        pass
+    return catalog
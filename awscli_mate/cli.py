@@ -1,7 +1,17 @@
 # -*- coding: utf-8 -*-
 
+import typing as T
+import sys
+import json
+
 import fire
-from .awscli import AWSCliConfig
+from .awscli import DEFAULT_SESSION_MARGIN, AWSCliConfig
+from .fleet import fleet_set_profile_as_default, fleet_upsert_profile
+from .role_cache import DEFAULT_REFRESH_MARGIN, warm_role_cache
+from .fanout import assume_roles_from_mfa_session
+from .identity import invalidate_identity
+from .export import DEFAULT_MAX_WORKERS, ExportFormatEnum, export_urls
+from .directory import build_account_directory
 
 
 class Cli:
@@ -19,16 +29,162 @@ class Cli:
         mfa_code: str,
         hours: int = 12,
         overwrite_default: bool = False,
+        margin: int = DEFAULT_SESSION_MARGIN,
+        force: bool = False,
     ):
         """
-        Do MFA authentication.
+        Do MFA authentication. If the existing MFA session is still valid for
+        more than ``margin`` seconds, it is re-used, unless ``force`` is True.
         """
         AWSCliConfig().mfa_auth(
             profile=profile,
             mfa_code=str(mfa_code),
             hours=hours,
             overwrite_default=overwrite_default,
+            margin=None if force else margin,
+        )
+
+    def fleet_set_profile_as_default(
+        self,
+        profile: str,
+        *homes: str,
+        max_workers: T.Optional[int] = None,
+    ):
+        """
+        Set an named profile as default in many home directories in parallel.
+
+        Example::
+
+            awscli_mate fleet_set_profile_as_default my_profile "/runners/*"
+        """
+        report = fleet_set_profile_as_default(
+            homes=homes,
+            profile=profile,
+            max_workers=max_workers,
+        )
+        print(json.dumps(report.to_dict(), indent=4))
+
+    def fleet_upsert_profile(
+        self,
+        profile: str,
+        *homes: str,
+        region: T.Optional[str] = None,
+        aws_access_key_id: T.Optional[str] = None,
+        aws_secret_access_key: T.Optional[str] = None,
+        aws_session_token: T.Optional[str] = None,
+        max_workers: T.Optional[int] = None,
+    ):
+        """
+        Create or replace a named profile in many home directories in parallel.
+        """
+        config = None
+        if region is not None:
+            config = {"region": region}
+        credentials = None
+        if aws_access_key_id is not None:
+            credentials = {
+                "aws_access_key_id": aws_access_key_id,
+                "aws_secret_access_key": aws_secret_access_key,
+            }
+            if aws_session_token is not None:
+                credentials["aws_session_token"] = aws_session_token
+        report = fleet_upsert_profile(
+            homes=homes,
+            profile=profile,
+            config=config,
+            credentials=credentials,
+            max_workers=max_workers,
+        )
+        print(json.dumps(report.to_dict(), indent=4))
+
+    def warm_role_cache(
+        self,
+        *profiles: str,
+        refresh_margin: int = DEFAULT_REFRESH_MARGIN,
+    ):
+        """
+        Assume the roles ahead of time and cache the credentials in
+        ``~/.aws/cli/cache``, by default, all profiles that have a ``role_arn``.
+        """
+        results = warm_role_cache(
+            profiles=profiles or None,
+            refresh_margin=refresh_margin,
+        )
+        for result in results:
+            line = f"{result.profile}: {result.status}"
+            if result.expiration is not None:
+                line += f", expires at {result.expiration.isoformat()}"
+            if result.error is not None:
+                line += f", {result.error}"
+            print(line)
+
+    def assume_roles(
+        self,
+        profile: str,
+        *profiles: str,
+        max_workers: int = 8,
+    ):
+        """
+        Assume the roles with the ``${profile}_mfa`` session created by
+        ``mfa_auth`` concurrently, write the credentials to the
+        ``${role_profile}_mfa`` profiles in one update. By default, all role
+        profiles whose ``source_profile`` chain leads back to ``profile``.
+        """
+        results = assume_roles_from_mfa_session(
+            profile=profile,
+            profiles=profiles or None,
+            max_workers=max_workers,
+        )
+        for result in results:
+            if result.ok:
+                print(f"{result.target.new_profile}: ok")
+            else:
+                print(f"{result.target.new_profile}: failed, {result.error}")
+
+    def invalidate_identity(self, profile: T.Optional[str] = None):
+        """
+        Forget the cached account id and alias of the profile, or all profiles.
+        """
+        invalidate_identity(profile=profile)
+
+    def build_account_directory(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        Resolve the account id and alias of all profiles concurrently, and
+        store them in the local account directory, so the search, the
+        console urls and the profile info don't call the AWS API again.
+        """
+        report = build_account_directory(max_workers=max_workers)
+        print(json.dumps(report.to_dict(), indent=4))
+
+    def export_urls(
+        self,
+        *profiles: str,
+        fmt: str = ExportFormatEnum.jsonl,
+        output: T.Optional[str] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        offline: bool = True,
+    ):
+        """
+        Export the console sign in and switch role urls of all profiles, or
+        the profiles that match the glob patterns, as ``jsonl``, ``csv`` or
+        ``html`` bookmarks. Write to stdout if ``output`` is not given.
+
+        Example::
+
+            awscli_mate export_urls "prod_*" --fmt html --output bookmarks.html
+        """
+        kwargs = dict(
+            fmt=fmt,
+            profiles=profiles or None,
+            max_workers=max_workers,
+            offline=offline,
         )
+        if output is None:
+            export_urls(sys.stdout, **kwargs)
+        else:
+            newline = "" if fmt == ExportFormatEnum.csv else None
+            with open(output, "w", encoding="utf-8", newline=newline) as f:
+                export_urls(f, **kwargs)
 
 
 def main():
@@ -24,3 +24,5 @@ class CredentialKeyEnum(str, enum.Enum):
     aws_access_key_id = "aws_access_key_id"
     aws_secret_access_key = "aws_secret_access_key"
     aws_session_token = "aws_session_token"
+    # not used by the AWS CLI, written by ``awscli_mate`` for session credentials
+    aws_session_expiration = "aws_session_expiration"
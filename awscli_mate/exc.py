@@ -15,3 +15,19 @@ class MalformedConfigFileError(Exception):
 
 class ProfileNotFoundError(Exception):
     pass
+
+
+class LockTimeoutError(Exception):
+    pass
+
+
+class ProfileChainCycleError(Exception):
+    pass
+
+
+class IdentityLookupTimeoutError(Exception):
+    pass
+
+
+class SessionExpiredError(Exception):
+    pass
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+"""
+Export the console sign in and switch role urls of many profiles.
+
+The urls are generated concurrently on a bounded thread pool, the calls
+that are throttled by the AWS API are retried with exponential backoff.
+The records are streamed in the order of the profiles, and can be written
+as JSON lines, CSV or a HTML bookmarks file that can be imported to the
+browser.
+
+Usage example::
+
+    with open("bookmarks.html", "w") as f:
+        export_urls(f, fmt=ExportFormatEnum.html)
+
+    # only the profiles that match the glob patterns
+    for record in iter_url_records(profiles=["prod_*", "dev_*"]):
+        print(record.profile, record.sign_in_url)
+"""
+
+import typing as T
+import csv
+import html
+import json
+import time
+import fnmatch
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+
+from .awscli import AWSCliConfig
+from .identity import DEFAULT_TTL, DEFAULT_TIMEOUT
+from .retry import (
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_BASE_DELAY,
+    call_with_backoff,
+)
+from .url import (
+    get_role_arn,
+    get_sign_in_url,
+    get_switch_role_url,
+)
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class ExportFormatEnum:
+    jsonl = "jsonl"
+    csv = "csv"
+    html = "html"
+
+
+@dataclasses.dataclass
+class UrlRecord:
+    """
+    The urls of one profile.
+
+    :param profile: the profile name.
+    :param region: the effective region of the profile.
+    :param sign_in_url: the console sign in url.
+    :param switch_role_url: the switch role url, None if the profile doesn't
+        have a ``role_arn``.
+    :param error: the error message if it failed.
+    """
+
+    profile: str
+    region: T.Optional[str] = None
+    sign_in_url: T.Optional[str] = None
+    switch_role_url: T.Optional[str] = None
+    error: T.Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+def select_profiles(
+    awscli_config: AWSCliConfig,
+    profiles: T.Optional[T.Iterable[str]] = None,
+) -> T.List[T.Tuple[str, T.Optional[str]]]:
+    """
+    Select the ``(profile, region)`` pairs to export, in the order of the
+    config file.
+
+    :param profiles: profile names or glob patterns like ``prod_*``, by
+        default, all profiles except the default profile.
+    """
+    graph = awscli_config.get_profile_graph()
+    pairs = list(graph.iter_profile_and_region_pairs())
+    if profiles is None:
+        return pairs
+    patterns = list(profiles)
+    return [
+        (profile, region)
+        for profile, region in pairs
+        if any(fnmatch.fnmatchcase(profile, pattern) for pattern in patterns)
+    ]
+
+
+def get_url_record(
+    profile: str,
+    region: T.Optional[str] = None,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    ttl: float = DEFAULT_TTL,
+    timeout: T.Optional[float] = DEFAULT_TIMEOUT,
+    offline: bool = True,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    sleep: T.Callable[[float], None] = time.sleep,
+) -> UrlRecord:
+    """
+    Get the urls of one profile, never raise, the error is reported in the
+    record.
+
+    :param offline: see :func:`~awscli_mate.url.get_switch_role_url`.
+    """
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    record = UrlRecord(profile=profile, region=region)
+    try:
+        record.sign_in_url = call_with_backoff(
+            lambda: get_sign_in_url(
+                profile,
+                awscli_config=awscli_config,
+                ttl=ttl,
+                timeout=timeout,
+            ),
+            max_attempts=max_attempts,
+            base_delay=base_delay,
+            sleep=sleep,
+        )
+        if get_role_arn(profile, awscli_config) is not None:
+            record.switch_role_url = call_with_backoff(
+                lambda: get_switch_role_url(
+                    profile,
+                    awscli_config=awscli_config,
+                    ttl=ttl,
+                    timeout=timeout,
+                    offline=offline,
+                ),
+                max_attempts=max_attempts,
+                base_delay=base_delay,
+                sleep=sleep,
+            )
+    except Exception as e:
+        record.error = f"{e.__class__.__name__}: {e}"
+    return record
+
+
+def iter_url_records(
+    profiles: T.Optional[T.Iterable[str]] = None,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    ttl: float = DEFAULT_TTL,
+    timeout: T.Optional[float] = DEFAULT_TIMEOUT,
+    offline: bool = True,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    base_delay: float = DEFAULT_BASE_DELAY,
+) -> T.Iterator[UrlRecord]:
+    """
+    Generate the urls of the profiles concurrently, yield the records in the
+    order of the profiles as soon as they are ready.
+
+    :param profiles: see :func:`select_profiles`.
+    :param max_workers: the max number of profiles processed concurrently.
+    :param max_attempts: the max number of attempts of a throttled call.
+    :param base_delay: the max backoff delay of the first retry, it doubles
+        on every retry.
+    """
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    pairs = select_profiles(awscli_config, profiles)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                get_url_record,
+                profile,
+                region,
+                awscli_config=awscli_config,
+                ttl=ttl,
+                timeout=timeout,
+                offline=offline,
+                max_attempts=max_attempts,
+                base_delay=base_delay,
+            )
+            for profile, region in pairs
+        ]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            # the consumer stopped early
+            for future in futures:
+                future.cancel()
+
+
+CSV_FIELDS = [field.name for field in dataclasses.fields(UrlRecord)]
+
+
+def write_jsonl(records: T.Iterable[UrlRecord], f: T.TextIO) -> int:
+    """
+    Write one JSON object per line, return the number of records.
+    """
+    n = 0
+    for record in records:
+        f.write(json.dumps(record.to_dict()) + "\n")
+        n += 1
+    return n
+
+
+def write_csv(records: T.Iterable[UrlRecord], f: T.TextIO) -> int:
+    """
+    Write a CSV file with header, return the number of records.
+    """
+    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    n = 0
+    for record in records:
+        writer.writerow(record.to_dict())
+        n += 1
+    return n
+
+
+def write_html_bookmarks(
+    records: T.Iterable[UrlRecord],
+    f: T.TextIO,
+    title: str = "AWS Console",
+) -> int:
+    """
+    Write a Netscape bookmark file, it can be imported to all major browsers.
+    The failed records are skipped. Return the number of written records.
+    """
+    f.write(
+        "<!DOCTYPE NETSCAPE-Bookmark-file-1>\n"
+        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+        "<TITLE>Bookmarks</TITLE>\n"
+        "<H1>Bookmarks</H1>\n"
+        "<DL><p>\n"
+        f"    <DT><H3>{html.escape(title)}</H3>\n"
+        "    <DL><p>\n"
+    )
+    n = 0
+    for record in records:
+        if not record.ok:
+            continue
+        links = [("sign in", record.sign_in_url)]
+        if record.switch_role_url is not None:
+            links.append(("switch role", record.switch_role_url))
+        for action, url in links:
+            name = f"{record.profile} | {record.region} | {action}"
+            f.write(
+                f'        <DT><A HREF="{html.escape(url)}">{html.escape(name)}</A>\n'
+            )
+        n += 1
+    f.write("    </DL><p>\n</DL><p>\n")
+    return n
+
+
+_writers = {
+    ExportFormatEnum.jsonl: write_jsonl,
+    ExportFormatEnum.csv: write_csv,
+    ExportFormatEnum.html: write_html_bookmarks,
+}
+
+
+def export_urls(
+    f: T.TextIO,
+    fmt: str = ExportFormatEnum.jsonl,
+    profiles: T.Optional[T.Iterable[str]] = None,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    offline: bool = True,
+    **kwargs,
+) -> int:
+    """
+    Generate the urls of the profiles and stream them to the file object in
+    the given format, return the number of written records.
+
+    :param fmt: one of :class:`ExportFormatEnum`.
+    :param kwargs: additional arguments for :func:`iter_url_records`.
+    """
+    try:
+        writer = _writers[fmt]
+    except KeyError:
+        raise ValueError(
+            f"invalid format {fmt!r}, must be one of {list(_writers)}"
+        )
+    records = iter_url_records(
+        profiles=profiles,
+        awscli_config=awscli_config,
+        max_workers=max_workers,
+        offline=offline,
+        **kwargs,
+    )
+    return writer(records, f)
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+
+"""
+Assume many roles from a single MFA session concurrently.
+
+After :meth:`~awscli_mate.awscli.AWSCliConfig.mfa_auth` creates the
+``${profile}_mfa`` session, the roles that trust this principal can be
+assumed with its credentials. For example::
+
+    [profile dev]
+    role_arn = arn:aws:iam::111122223333:role/admin
+    source_profile = my_user
+
+    [profile prod]
+    role_arn = arn:aws:iam::444455556666:role/admin
+    source_profile = my_user
+
+``assume_roles_from_mfa_session(profile="my_user")`` assumes both roles with
+the ``my_user_mfa`` credentials on a bounded thread pool, then writes the
+``dev_mfa`` and ``prod_mfa`` profiles in one transaction, so the
+credentials file is rewritten only once.
+
+Chained roles (a role whose ``source_profile`` is another role) are assumed
+level by level, with the credentials of the previous level.
+"""
+
+import typing as T
+import dataclasses
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from .constants import ConfigKeyEnum, CredentialKeyEnum
+from .awscli import DEFAULT_SESSION_MARGIN, AWSCliConfig, _get_section_data
+from .role_cache import get_assume_role_kwargs
+from . import exc
+
+# AWS limits the role chaining session to one hour
+MAX_CHAINED_DURATION = 3600
+
+T_CREDENTIALS = T.Dict[str, T.Optional[str]]
+T_GET_STS_CLIENT = T.Callable[[T_CREDENTIALS], T.Any]
+
+
+def get_sts_client(credentials: T_CREDENTIALS):  # pragma: no cover
+    """
+    Create a STS client with the given credentials. A new boto3 session is
+    created per call, because boto3 session is not thread safe.
+    """
+    import boto3
+
+    boto_ses = boto3.session.Session(
+        aws_access_key_id=credentials[CredentialKeyEnum.aws_access_key_id.value],
+        aws_secret_access_key=credentials[
+            CredentialKeyEnum.aws_secret_access_key.value
+        ],
+        aws_session_token=credentials.get(CredentialKeyEnum.aws_session_token.value),
+    )
+    return boto_ses.client("sts")
+
+
+@dataclasses.dataclass
+class AssumeRoleTarget:
+    """
+    A role to assume.
+
+    :param new_profile: the profile to write the assumed role credentials to.
+    :param assume_role_kwargs: the arguments of the ``AssumeRole`` API.
+    :param depth: 1 if the role is assumed with the MFA session, 2 if it is
+        assumed with the credentials of a depth 1 target, and so on.
+    :param source: the ``new_profile`` of the parent target in the chain,
+        None if it is assumed with the MFA session.
+    :param region: the region of the new profile.
+    """
+
+    new_profile: str
+    assume_role_kwargs: T.Dict[str, T.Any]
+    depth: int = 1
+    source: T.Optional[str] = None
+    region: T.Optional[str] = None
+
+
+@dataclasses.dataclass
+class AssumeRoleResult:
+    """
+    The result of assuming one role.
+
+    :param error: the error message if it failed, the new profile is not
+        written in this case.
+    """
+
+    target: AssumeRoleTarget
+    expiration: T.Optional[datetime] = None
+    error: T.Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def find_role_targets(
+    awscli_config: AWSCliConfig,
+    profile: str,
+    profiles: T.Optional[T.Iterable[str]] = None,
+    role_arns: T.Optional[T.Mapping[str, str]] = None,
+    suffix: str = "_mfa",
+) -> T.List[AssumeRoleTarget]:
+    """
+    Find the roles to assume from the ``${profile}_mfa`` session, sorted by
+    the chain depth.
+
+    :param profile: the base profile used in ``mfa_auth``.
+    :param profiles: the role profiles to assume, by default, every role
+        profile whose ``source_profile`` chain leads back to ``profile`` or
+        ``${profile}_mfa``. The parent roles in the chain are also assumed.
+    :param role_arns: the roles that are not in the config file, the key is
+        the new profile name, the value is the role arn.
+    :param suffix: the new profile name is the role profile name + suffix.
+    """
+    roots = {profile, f"{profile}_mfa"}
+    graph = awscli_config.get_profile_graph()
+    config, _ = awscli_config.read_config(readonly=True)
+
+    def get_role_data(name: str) -> T.Optional[T.Dict[str, str]]:
+        data = _get_section_data(config, f"profile {name}")
+        if data is None or ConfigKeyEnum.role_arn.value not in data:
+            return None
+        source_profile = graph.source_profile(name)
+        if name in roots or source_profile is None:
+            return None
+        # the ``${profile}_mfa`` profile may only exist in the credentials file
+        if source_profile in roots:
+            return data
+        try:
+            if graph.root_profile(name) not in roots:
+                return None
+        except exc.ProfileChainCycleError:
+            return None
+        return data
+
+    if profiles is None:
+        profiles = [name for name in graph.profiles if get_role_data(name)]
+
+    targets: T.Dict[str, AssumeRoleTarget] = dict()
+
+    def add_target(name: str) -> AssumeRoleTarget:
+        if name in targets:
+            return targets[name]
+        try:
+            data = get_role_data(name)
+        except exc.ProfileNotFoundError:
+            data = None
+        if data is None:
+            raise exc.ProfileNotFoundError(
+                f"Profile [{name}] is not a role profile that can be assumed "
+                f"from the [{profile}_mfa] session"
+            )
+        assume_role_kwargs = get_assume_role_kwargs(data)
+        # the MFA is already done
+        assume_role_kwargs.pop("SerialNumber", None)
+        target = AssumeRoleTarget(
+            new_profile=f"{name}{suffix}",
+            assume_role_kwargs=assume_role_kwargs,
+            region=graph.effective_region(name),
+        )
+        source_profile = graph.source_profile(name)
+        if source_profile not in roots:
+            parent = add_target(source_profile)
+            target.depth = parent.depth + 1
+            target.source = parent.new_profile
+            duration = assume_role_kwargs.get("DurationSeconds", 0)
+            if duration > MAX_CHAINED_DURATION:
+                assume_role_kwargs["DurationSeconds"] = MAX_CHAINED_DURATION
+        targets[name] = target
+        return target
+
+    for name in profiles:
+        add_target(name)
+    new_targets = list(targets.values())
+    try:
+        region = graph.effective_region(profile)
+    except exc.ProfileNotFoundError:
+        region = None
+    for new_profile, role_arn in (role_arns or {}).items():
+        new_targets.append(
+            AssumeRoleTarget(
+                new_profile=new_profile,
+                assume_role_kwargs={"RoleArn": role_arn},
+                region=region,
+            )
+        )
+    return sorted(new_targets, key=lambda target: target.depth)
+
+
+def _assume_role(
+    target: AssumeRoleTarget,
+    source_credentials: T_CREDENTIALS,
+    get_sts_client: T_GET_STS_CLIENT,
+) -> T.Tuple[AssumeRoleResult, T.Optional[T_CREDENTIALS]]:
+    kwargs = dict(target.assume_role_kwargs)
+    kwargs.setdefault("RoleSessionName", f"awscli-mate-{target.new_profile}"[:64])
+    try:
+        response = get_sts_client(source_credentials).assume_role(**kwargs)
+    except Exception as e:
+        return AssumeRoleResult(target, error=f"{e.__class__.__name__}: {e}"), None
+    credentials = response["Credentials"]
+    return (
+        AssumeRoleResult(target, expiration=credentials.get("Expiration")),
+        {
+            CredentialKeyEnum.aws_access_key_id.value: credentials["AccessKeyId"],
+            CredentialKeyEnum.aws_secret_access_key.value: credentials[
+                "SecretAccessKey"
+            ],
+            CredentialKeyEnum.aws_session_token.value: credentials["SessionToken"],
+        },
+    )
+
+
+def assume_roles_from_mfa_session(
+    profile: str,
+    profiles: T.Optional[T.Iterable[str]] = None,
+    role_arns: T.Optional[T.Mapping[str, str]] = None,
+    suffix: str = "_mfa",
+    max_workers: int = 8,
+    margin: T.Optional[int] = DEFAULT_SESSION_MARGIN,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    get_sts_client: T_GET_STS_CLIENT = get_sts_client,
+) -> T.List[AssumeRoleResult]:
+    """
+    Assume the roles with the ``${profile}_mfa`` session concurrently, and
+    write the credentials of all the succeeded roles to the
+    ``${role_profile}${suffix}`` profiles in one transaction.
+
+    The roles that failed (for example, the role doesn't trust the
+    principal) don't stop the others, see :attr:`AssumeRoleResult.error`.
+
+    The existing ``[profile ${role_profile}${suffix}]`` config sections are
+    kept, only the ``region`` is added if it is missing.
+
+    :param profile: the base profile used in ``mfa_auth``.
+    :param profiles: see :func:`find_role_targets`.
+    :param role_arns: see :func:`find_role_targets`.
+    :param suffix: see :func:`find_role_targets`.
+    :param max_workers: the max number of concurrent ``AssumeRole`` calls.
+    :param margin: raise :class:`~awscli_mate.exc.SessionExpiredError` if the
+        MFA session is not valid for at least this many seconds, see
+        :meth:`~awscli_mate.awscli.AWSCliConfig.is_session_valid`. None
+        means don't check.
+    :param get_sts_client: a function that takes the credentials dict,
+        and returns a STS client.
+    """
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    mfa_profile = f"{profile}_mfa"
+    _, credentials = awscli_config.read_config(readonly=True)
+    mfa_credentials = _get_section_data(credentials, mfa_profile)
+    if (
+        mfa_credentials is None
+        or CredentialKeyEnum.aws_access_key_id.value not in mfa_credentials
+    ):
+        raise exc.ProfileNotFoundError(
+            f"Profile [{mfa_profile}] not found in {awscli_config.path_credentials}, "
+            f"run mfa_auth first"
+        )
+    if margin is not None and not awscli_config.is_session_valid(
+        mfa_profile, margin=margin
+    ):
+        raise exc.SessionExpiredError(
+            f"The session of profile [{mfa_profile}] is expired, "
+            f"run mfa_auth again"
+        )
+
+    targets = find_role_targets(
+        awscli_config,
+        profile=profile,
+        profiles=profiles,
+        role_arns=role_arns,
+        suffix=suffix,
+    )
+    results: T.List[AssumeRoleResult] = list()
+    # the new profile name to the assumed role credentials
+    assumed: T.Dict[str, T_CREDENTIALS] = dict()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        depths = sorted({target.depth for target in targets})
+        for depth in depths:
+            futures = list()
+            for target in targets:
+                if target.depth != depth:
+                    continue
+                if target.source is None:
+                    source_credentials = mfa_credentials
+                elif target.source in assumed:
+                    source_credentials = assumed[target.source]
+                else:
+                    results.append(
+                        AssumeRoleResult(
+                            target,
+                            error=f"failed to assume the source role {target.source!r}",
+                        )
+                    )
+                    continue
+                futures.append(
+                    executor.submit(
+                        _assume_role, target, source_credentials, get_sts_client
+                    )
+                )
+            for future in futures:
+                result, new_credentials = future.result()
+                results.append(result)
+                if new_credentials is not None:
+                    assumed[result.target.new_profile] = new_credentials
+
+    succeeded = [result for result in results if result.ok]
+    if succeeded:
+        with awscli_config.transaction() as tx:
+            for result in succeeded:
+                target = result.target
+                new_credentials = assumed[target.new_profile]
+                config_data = dict()
+                if target.region is not None:
+                    config_data[ConfigKeyEnum.region.value] = target.region
+                tx.merge_section(
+                    tx.config,
+                    f"profile {target.new_profile}",
+                    config_data,
+                )
+                tx.upsert_credentials(
+                    profile=target.new_profile,
+                    aws_access_key_id=new_credentials[
+                        CredentialKeyEnum.aws_access_key_id.value
+                    ],
+                    aws_secret_access_key=new_credentials[
+                        CredentialKeyEnum.aws_secret_access_key.value
+                    ],
+                    aws_session_token=new_credentials[
+                        CredentialKeyEnum.aws_session_token.value
+                    ],
+                    expiration=result.expiration,
+                )
+    return results
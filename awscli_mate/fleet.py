@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+"""
+Apply profile operations to many AWS home directories in parallel.
+
+For example, each CI runner keeps its own ``.aws`` directory under a shared
+root::
+
+    /runners/runner-1/.aws/config
+    /runners/runner-1/.aws/credentials
+    /runners/runner-2/.aws/config
+    /runners/runner-2/.aws/credentials
+
+Usage example::
+
+    report = fleet_set_profile_as_default(
+        homes="/runners/runner-*",
+        profile="my_profile",
+    )
+    for result in report.failed:
+        print(result.dir_home, result.error)
+
+The home directories are processed by a process pool, each worker process
+pays the import cost only once for all the directories it processes, and
+each directory is read once and written once in a single transaction.
+One failed directory doesn't stop the others, the error is reported in its
+:class:`FleetResult`.
+"""
+
+import typing as T
+import glob
+import time
+import dataclasses
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from .awscli import AWSCliConfig
+
+T_HOMES = T.Union[str, Path, T.Iterable[T.Union[str, Path]]]
+
+
+def resolve_homes(homes: T_HOMES) -> T.List[Path]:
+    """
+    Resolve a home directory, a glob pattern, or a list of them to a sorted
+    list of unique existing directories.
+    """
+    if isinstance(homes, (str, Path)):
+        homes = [homes]
+    dir_homes: T.Dict[Path, None] = dict()
+    for home in homes:
+        home = str(home)
+        if glob.has_magic(home):
+            candidates = glob.glob(home)
+        else:
+            candidates = [home]
+        for candidate in candidates:
+            path = Path(candidate).expanduser().absolute()
+            if path.is_dir():
+                dir_homes[path] = None
+    return sorted(dir_homes)
+
+
+@dataclasses.dataclass
+class FleetResult:
+    """
+    The result of the operation on one home directory.
+
+    :param dir_home: the home directory.
+    :param changed: whether any file is changed.
+    :param elapsed: seconds spent on this directory in the worker.
+    :param error: the error message if the operation failed.
+    """
+
+    dir_home: str
+    changed: bool = False
+    elapsed: float = 0.0
+    error: T.Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        return dict(
+            dir_home=self.dir_home,
+            ok=self.ok,
+            changed=self.changed,
+            elapsed=self.elapsed,
+            error=self.error,
+        )
+
+
+@dataclasses.dataclass
+class FleetReport:
+    """
+    The per directory results and timing of a fleet operation.
+
+    :param results: one result per home directory, in the order of
+        :func:`resolve_homes`.
+    :param elapsed: the total wall clock seconds.
+    """
+
+    results: T.List[FleetResult] = dataclasses.field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> T.List[FleetResult]:
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self) -> T.List[FleetResult]:
+        return [result for result in self.results if not result.ok]
+
+    def to_dict(self) -> dict:
+        return dict(
+            total=len(self.results),
+            succeeded=len(self.succeeded),
+            failed=len(self.failed),
+            elapsed=self.elapsed,
+            results=[result.to_dict() for result in self.results],
+        )
+
+
+def set_profile_as_default_in_home(dir_home: Path, profile: str) -> bool:
+    """
+    Set the profile as default in one home directory.
+    """
+    awscli_config = AWSCliConfig.from_home(dir_home)
+    with awscli_config.transaction() as tx:
+        return tx.set_profile_as_default(profile)
+
+
+def upsert_profile_in_home(
+    dir_home: Path,
+    profile: str,
+    config: T.Optional[T.Mapping[str, str]] = None,
+    credentials: T.Optional[T.Mapping[str, str]] = None,
+) -> bool:
+    """
+    Create or replace the config and / or credentials section of a profile
+    in one home directory.
+    """
+    awscli_config = AWSCliConfig.from_home(dir_home)
+    with awscli_config.transaction() as tx:
+        if config is not None:
+            if profile == "default":
+                section_name = profile
+            else:
+                section_name = f"profile {profile}"
+            tx.upsert_section(tx.config, section_name, config)
+        if credentials is not None:
+            tx.upsert_section(tx.credentials, profile, credentials)
+        return tx.is_changed
+
+
+def _run_one(
+    func: T.Callable[..., bool],
+    dir_home: Path,
+    kwargs: T.Dict[str, T.Any],
+) -> FleetResult:
+    # it runs in the worker process, never raise, the error is reported
+    start = time.perf_counter()
+    result = FleetResult(dir_home=str(dir_home))
+    try:
+        result.changed = bool(func(dir_home, **kwargs))
+    except Exception as e:
+        result.error = f"{e.__class__.__name__}: {e}"
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def run_fleet(
+    homes: T_HOMES,
+    func: T.Callable[..., bool],
+    kwargs: T.Optional[T.Dict[str, T.Any]] = None,
+    max_workers: T.Optional[int] = None,
+) -> FleetReport:
+    """
+    Run ``func(dir_home, **kwargs)`` on every home directory in a process pool.
+
+    :param homes: see :func:`resolve_homes`.
+    :param func: a module level function (it has to be picklable), takes
+        the home directory as the first argument, return whether any file
+        is changed.
+    :param kwargs: additional keyword arguments for ``func``.
+    :param max_workers: the size of the process pool, by default it is the
+        number of CPUs. If it is 1, run in the current process.
+    """
+    if kwargs is None:
+        kwargs = {}
+    start = time.perf_counter()
+    dir_homes = resolve_homes(homes)
+    if max_workers == 1 or len(dir_homes) <= 1:
+        results = [_run_one(func, dir_home, kwargs) for dir_home in dir_homes]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_run_one, func, dir_home, kwargs)
+                for dir_home in dir_homes
+            ]
+            results = [future.result() for future in futures]
+    return FleetReport(results=results, elapsed=time.perf_counter() - start)
+
+
+def fleet_set_profile_as_default(
+    homes: T_HOMES,
+    profile: str,
+    max_workers: T.Optional[int] = None,
+) -> FleetReport:
+    """
+    Set the profile as default in many home directories in parallel.
+    """
+    return run_fleet(
+        homes,
+        set_profile_as_default_in_home,
+        kwargs=dict(profile=profile),
+        max_workers=max_workers,
+    )
+
+
+def fleet_upsert_profile(
+    homes: T_HOMES,
+    profile: str,
+    config: T.Optional[T.Mapping[str, str]] = None,
+    credentials: T.Optional[T.Mapping[str, str]] = None,
+    max_workers: T.Optional[int] = None,
+) -> FleetReport:
+    """
+    Create or replace a profile in many home directories in parallel.
+    """
+    return run_fleet(
+        homes,
+        upsert_profile_in_home,
+        kwargs=dict(
+            profile=profile,
+            config=None if config is None else dict(config),
+            credentials=None if credentials is None else dict(credentials),
+        ),
+        max_workers=max_workers,
+    )
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+
+"""
+Profile graph that resolves the ``source_profile`` role chains and the
+``sso_session`` references in the ``~/.aws/config`` file.
+
+Example::
+
+    [profile base]
+    region = us-east-1
+
+    [profile role_1]
+    role_arn = arn:aws:iam::111122223333:role/role-1
+    source_profile = base
+
+    [profile role_2]
+    role_arn = arn:aws:iam::444455556666:role/role-2
+    source_profile = role_1
+
+The graph resolves every profile once with memoization when it is built,
+after that, the "effective region", "root credential profile" and
+"chain depth" of any profile are O(1) dict lookups.
+
+- effective region: the ``region`` of the profile, or inherited from the
+  ``source_profile`` chain if not set. ``role_2`` -> ``us-east-1``.
+- root credential profile: the profile at the end of the chain that
+  provides the credentials. ``role_2`` -> ``base``.
+- chain depth: the number of ``AssumeRole`` hops. ``base`` -> 0,
+  ``role_2`` -> 2.
+"""
+
+import typing as T
+import threading
+import dataclasses
+from pathlib import Path
+
+from .constants import SectionTypeEnum
+from .cache import StatSignature, CacheStats
+from .catalog import CatalogEntry
+from .scanner import strip_comment
+from . import exc
+
+UNKNOWN_REGION = "unknown-region"
+
+
+def _normalize_reference(value: T.Optional[str]) -> T.Optional[str]:
+    """
+    ``source_profile = p1 # comment`` references ``p1``.
+    """
+    if value is None:
+        return None
+    value = strip_comment(value).strip()
+    return value or None
+
+
+@dataclasses.dataclass
+class ProfileGraph:
+    """
+    The resolved profile graph, don't use the constructor, use
+    :meth:`ProfileGraph.from_entries` instead.
+
+    :param profiles: profile names in the order they appear in the config file.
+    """
+
+    profiles: T.List[str] = dataclasses.field(default_factory=list)
+    _region: T.Dict[str, T.Optional[str]] = dataclasses.field(default_factory=dict)
+    _root: T.Dict[str, T.Optional[str]] = dataclasses.field(default_factory=dict)
+    _depth: T.Dict[str, T.Optional[int]] = dataclasses.field(default_factory=dict)
+    _sso_session: T.Dict[str, T.Optional[str]] = dataclasses.field(
+        default_factory=dict
+    )
+    _source_profile: T.Dict[str, T.Optional[str]] = dataclasses.field(
+        default_factory=dict
+    )
+    _cyclic: T.Set[str] = dataclasses.field(default_factory=set)
+    _broken: T.Set[str] = dataclasses.field(default_factory=set)
+
+    @classmethod
+    def from_entries(cls, entries: T.Iterable[CatalogEntry]) -> "ProfileGraph":
+        """
+        Build the graph from the catalog entries, every profile is resolved
+        exactly once, the total cost is O(number of profiles).
+        """
+        graph = cls()
+        own_region: T.Dict[str, T.Optional[str]] = dict()
+        parent: T.Dict[str, T.Optional[str]] = dict()
+        sso_sessions: T.Set[str] = set()
+        sso_session_ref: T.Dict[str, T.Optional[str]] = dict()
+        for entry in entries:
+            if entry.section_type == SectionTypeEnum.sso_session.value:
+                sso_sessions.add(entry.name)
+                continue
+            if entry.name in own_region:  # pragma: no cover
+                continue
+            graph.profiles.append(entry.name)
+            own_region[entry.name] = entry.region
+            source_profile = _normalize_reference(entry.source_profile)
+            # a role profile can use the credentials in its own section
+            if source_profile == entry.name:
+                source_profile = None
+            parent[entry.name] = source_profile
+            graph._source_profile[entry.name] = source_profile
+            sso_session_ref[entry.name] = _normalize_reference(entry.sso_session)
+            # a role profile that has no source profile or uses its own
+            # credentials (credential_source) is one hop
+            if entry.role_arn and source_profile is None:
+                graph._depth[entry.name] = 1
+
+        for name, session in sso_session_ref.items():
+            graph._sso_session[name] = session if session in sso_sessions else None
+
+        # iterative DFS with memoization, never recurse because a role
+        # chain can be very long. Every profile is walked only once.
+        for name in graph.profiles:
+            if name in graph._region:
+                continue
+            path: T.List[str] = []
+            position: T.Dict[str, int] = {}
+            node: T.Optional[str] = name
+            while (
+                node is not None
+                and node in own_region
+                and node not in graph._region
+                and node not in position
+            ):
+                position[node] = len(path)
+                path.append(node)
+                node = parent[node]
+
+            if node is not None and node in position:
+                # the chain runs into a cycle, every profile on the cycle
+                # only has its own region
+                for cyclic_node in path[position[node] :]:
+                    graph._cyclic.add(cyclic_node)
+                    graph._region[cyclic_node] = own_region[cyclic_node]
+                path = path[: position[node]]
+
+            # resolve the path backward, ``node`` is where the chain stops
+            for current in reversed(path):
+                if node is None:
+                    graph._root[current] = current
+                    graph._depth.setdefault(current, 0)
+                    inherited_region = None
+                elif node in graph._cyclic:
+                    graph._cyclic.add(current)
+                    inherited_region = graph._region[node]
+                elif node in graph._root:
+                    graph._root[current] = graph._root[node]
+                    graph._depth[current] = graph._depth[node] + 1
+                    inherited_region = graph._region[node]
+                else:
+                    # the chain references a profile that doesn't exist
+                    graph._broken.add(current)
+                    inherited_region = graph._region.get(node)
+                region = own_region[current]
+                if region is None:
+                    region = inherited_region
+                graph._region[current] = region
+                node = current
+        return graph
+
+    def _ensure_profile(self, profile: str):
+        if profile not in self._region:
+            raise exc.ProfileNotFoundError(f"Profile [{profile}] not found")
+
+    def _ensure_not_cyclic(self, profile: str):
+        self._ensure_profile(profile)
+        if profile in self._cyclic:
+            raise exc.ProfileChainCycleError(
+                f"Profile [{profile}] has a cycle in the source_profile chain"
+            )
+
+    def is_cyclic(self, profile: str) -> bool:
+        """
+        Whether the ``source_profile`` chain of the profile runs into a cycle.
+        """
+        self._ensure_profile(profile)
+        return profile in self._cyclic
+
+    def is_broken(self, profile: str) -> bool:
+        """
+        Whether the ``source_profile`` chain of the profile references a
+        profile that doesn't exist.
+        """
+        self._ensure_profile(profile)
+        return profile in self._broken
+
+    def effective_region(self, profile: str) -> T.Optional[str]:
+        """
+        The region of the profile, or inherited from the ``source_profile``
+        chain. Return None if no profile in the chain has a region.
+        """
+        self._ensure_profile(profile)
+        return self._region[profile]
+
+    def root_profile(self, profile: str) -> T.Optional[str]:
+        """
+        The profile at the end of the ``source_profile`` chain that provides
+        the credentials. Return None if the chain is broken.
+        """
+        self._ensure_not_cyclic(profile)
+        return self._root.get(profile)
+
+    def chain_depth(self, profile: str) -> T.Optional[int]:
+        """
+        The number of ``AssumeRole`` hops to get the credentials of the profile.
+        Return None if the chain is broken.
+        """
+        self._ensure_not_cyclic(profile)
+        return self._depth.get(profile)
+
+    def source_profile(self, profile: str) -> T.Optional[str]:
+        """
+        The ``source_profile`` of the profile, without the inline comment.
+        Return None if the profile doesn't have one, or it references itself.
+        """
+        self._ensure_profile(profile)
+        return self._source_profile[profile]
+
+    def sso_session(self, profile: str) -> T.Optional[str]:
+        """
+        The ``sso-session`` section name referenced by the profile, return None
+        if the profile doesn't reference a sso session, or the session
+        doesn't exist.
+        """
+        self._ensure_profile(profile)
+        return self._sso_session[profile]
+
+    def iter_profile_and_region_pairs(self) -> T.Iterable[T.Tuple[str, str]]:
+        """
+        Yield ``(profile, effective_region)`` pairs, except the default profile.
+        """
+        for profile in self.profiles:
+            if profile == "default":
+                continue
+            region = self._region[profile]
+            if region is None:
+                region = UNKNOWN_REGION
+            yield profile, region
+
+
+def stream_profile_and_region_pairs(
+    entries: T.Iterable[CatalogEntry],
+) -> T.Iterable[T.Tuple[str, str]]:
+    """
+    The streaming version of :meth:`ProfileGraph.iter_profile_and_region_pairs`,
+    it yields the same pairs in the same order, without building the graph
+    first.
+
+    A pair is yielded as soon as its effective region is known from the
+    parsed sections. The region of a profile that inherits from a
+    ``source_profile`` defined later in the file, or that is in a cycle, is
+    not known until the whole file is parsed, the pair and the pairs after
+    it are held back and resolved by the full graph at the end.
+    """
+    entries_list: T.List[CatalogEntry] = list()
+    own_region: T.Dict[str, T.Optional[str]] = dict()
+    parent: T.Dict[str, T.Optional[str]] = dict()
+    # the effective region of the profiles whose chain ends at a root profile
+    resolved: T.Dict[str, T.Optional[str]] = dict()
+    pending: T.List[str] = list()
+
+    def resolve(name: str) -> T.Tuple[bool, T.Optional[str]]:
+        # the own region always wins, even if the profile is in a cycle
+        if own_region[name] is not None:
+            return True, own_region[name]
+        path: T.List[str] = list()
+        visited: T.Set[str] = set()
+        node: T.Optional[str] = name
+        while node is not None and node not in resolved:
+            # the source profile is not parsed yet, or the chain is a cycle
+            if node not in own_region or node in visited:
+                return False, None
+            path.append(node)
+            visited.add(node)
+            node = parent[node]
+        region = None if node is None else resolved[node]
+        for current in reversed(path):
+            if own_region[current] is not None:
+                region = own_region[current]
+            resolved[current] = region
+        return True, region
+
+    n_yielded = 0
+    for entry in entries:
+        entries_list.append(entry)
+        if entry.section_type == SectionTypeEnum.sso_session.value:
+            continue
+        if entry.name in own_region:  # pragma: no cover
+            continue
+        own_region[entry.name] = entry.region
+        source_profile = _normalize_reference(entry.source_profile)
+        if source_profile == entry.name:
+            source_profile = None
+        parent[entry.name] = source_profile
+        pending.append(entry.name)
+        while n_yielded < len(pending):
+            name = pending[n_yielded]
+            ok, region = resolve(name)
+            if not ok:
+                break
+            n_yielded += 1
+            if name != "default":
+                yield name, UNKNOWN_REGION if region is None else region
+
+    if n_yielded < len(pending):
+        graph = ProfileGraph.from_entries(entries_list)
+        for name in pending[n_yielded:]:
+            if name == "default":
+                continue
+            region = graph._region[name]
+            yield name, UNKNOWN_REGION if region is None else region
+
+
+@dataclasses.dataclass
+class ProfileGraphCache:
+    """
+    Cache the profile graph per config file, the graph is only rebuilt when
+    the stat signature of the config file changed.
+    """
+
+    _entries: T.Dict[str, T.Tuple[StatSignature, ProfileGraph]] = dataclasses.field(
+        default_factory=dict
+    )
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    stats: CacheStats = dataclasses.field(default_factory=CacheStats)
+
+    def get(
+        self,
+        path_config: Path,
+        get_entries: T.Callable[[], T.Iterable[CatalogEntry]],
+    ) -> ProfileGraph:
+        signature = StatSignature.from_path(path_config)
+        with self._lock:
+            entry = self._entries.get(signature.path)
+            if entry is not None and entry[0] == signature:
+                self.stats.hits += 1
+                return entry[1]
+            self.stats.misses += 1
+        graph = ProfileGraph.from_entries(get_entries())
+        with self._lock:
+            self._entries[signature.path] = (signature, graph)
+        return graph
+
+    def peek(self, path_config: Path) -> T.Optional[ProfileGraph]:
+        """
+        Return the cached graph if it is fresh, never build it.
+        """
+        try:
+            signature = StatSignature.from_path(path_config)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            entry = self._entries.get(signature.path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats = CacheStats()
+
+
+profile_graph_cache = ProfileGraphCache()
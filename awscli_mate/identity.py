@@ -0,0 +1,487 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent TTL cache of the AWS account identity of the profiles.
+
+The account id, account alias and principal ARN of a profile almost never
+change, but getting them costs a ``sts.get_caller_identity`` and an
+``iam.list_account_aliases`` call. The identity cache file
+(``~/.aws/.awscli_mate_identity`` by default) stores them as JSON, keyed by:
+
+- the ``role_arn`` of the profile, for the assumed role profile.
+- the ``aws_access_key_id`` in the credentials file, for the other profiles.
+
+So the cache key is known without any network call, and a new access key
+(e.g. after ``mfa_auth``) or a new role automatically misses the cache.
+
+Usage example::
+
+    identity = get_identity("my_profile")
+    print(identity.account_id, identity.alias, identity.arn)
+
+    # forget the identity of a profile, or everything
+    invalidate_identity("my_profile")
+    invalidate_identity()
+"""
+
+import typing as T
+import json
+import time
+import threading
+import contextlib
+import dataclasses
+from pathlib import Path
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+)
+
+from pathlib_mate import Path as PathlibMatePath
+
+from .constants import ConfigKeyEnum, CredentialKeyEnum
+from .scanner import strip_comment
+from .lock import file_lock
+from .awscli import AWSCliConfig, _get_section_data
+from .pool import get_client
+from . import exc
+
+IDENTITY_CACHE_FILENAME = ".awscli_mate_identity"
+IDENTITY_CACHE_VERSION = 1
+DEFAULT_TTL = 24 * 3600
+DEFAULT_TIMEOUT = 10.0
+
+
+@dataclasses.dataclass
+class Identity:
+    """
+    The identity of a profile.
+
+    :param account_id: the 12 digits AWS account id.
+    :param arn: the ARN of the principal, e.g. ``arn:aws:iam::111122223333:user/alice``
+        or ``arn:aws:sts::111122223333:assumed-role/admin-role/session``.
+    :param alias: the account alias, None if the account doesn't have an
+        alias or the principal cannot list it.
+    :param created_at: the unix timestamp when it is fetched.
+    """
+
+    account_id: str
+    arn: str
+    alias: T.Optional[str] = None
+    created_at: float = dataclasses.field(default_factory=time.time)
+
+    @property
+    def principal_name(self) -> str:
+        """
+        The user name or the role name of the principal, the IAM path is not
+        included. ``"root"`` for the root user.
+
+        - ``arn:aws:iam::111122223333:user/team/alice`` -> ``alice``
+        - ``arn:aws:sts::111122223333:assumed-role/admin-role/session`` -> ``admin-role``
+        - ``arn:aws:iam::111122223333:root`` -> ``root``
+        """
+        resource = self.arn.split(":", 5)[-1]
+        parts = resource.split("/")
+        # the assumed role arn ends with the session name, not the role name
+        if parts[0] == "assumed-role" and len(parts) >= 3:
+            return parts[1]
+        return parts[-1]
+
+    def is_expired(self, ttl: float) -> bool:
+        return time.time() - self.created_at >= ttl
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Identity":
+        return cls(**data)
+
+
+def get_identity_cache_key(
+    profile: str,
+    awscli_config: AWSCliConfig,
+) -> T.Optional[str]:
+    """
+    Get the identity cache key of the profile from the config files,
+    return None if there is no role arn or access key to use.
+    """
+    config, credentials = awscli_config.read_config(readonly=True)
+    section_name = profile if profile == "default" else f"profile {profile}"
+    data = _get_section_data(config, section_name) or {}
+    role_arn = data.get(ConfigKeyEnum.role_arn.value)
+    if role_arn:
+        return strip_comment(role_arn).strip()
+    data = _get_section_data(credentials, profile) or {}
+    access_key = data.get(CredentialKeyEnum.aws_access_key_id.value)
+    if access_key:
+        return strip_comment(access_key).strip()
+    return None
+
+
+@dataclasses.dataclass
+class IdentityCache:
+    """
+    The on-disk identity cache.
+
+    :param path: the path of the cache file.
+    :param ttl: entries older than this many seconds are ignored.
+    """
+
+    path: Path
+    ttl: float = DEFAULT_TTL
+    # the entries loaded once and the buffered writes, see IdentityCache.batch
+    _snapshot: T.Optional[T.Dict[str, dict]] = dataclasses.field(
+        default=None, init=False, repr=False
+    )
+    _pending: T.Dict[str, dict] = dataclasses.field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    @classmethod
+    def from_awscli_config(
+        cls,
+        awscli_config: AWSCliConfig,
+        ttl: float = DEFAULT_TTL,
+    ) -> "IdentityCache":
+        """
+        The identity cache file lives next to the config file.
+        """
+        return cls(
+            path=awscli_config.path_config.parent / IDENTITY_CACHE_FILENAME,
+            ttl=ttl,
+        )
+
+    def _load(self) -> T.Dict[str, dict]:
+        try:
+            data = json.loads(Path(self.path).read_text())
+            if data.get("version") != IDENTITY_CACHE_VERSION:
+                return {}
+            return dict(data["entries"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return {}
+
+    def _dump(self, entries: T.Dict[str, dict]):
+        data = {"version": IDENTITY_CACHE_VERSION, "entries": entries}
+        with PathlibMatePath(self.path).atomic_open("w", overwrite=True) as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    def get(self, key: str) -> T.Optional[Identity]:
+        """
+        Get the identity of the cache key, return None if it is not cached
+        or expired.
+        """
+        entries = self._load() if self._snapshot is None else self._snapshot
+        data = entries.get(key)
+        if data is None:
+            return None
+        try:
+            identity = Identity.from_dict(data)
+        except TypeError:
+            return None
+        if identity.is_expired(self.ttl):
+            return None
+        return identity
+
+    def set(self, key: str, identity: Identity):
+        """
+        Cache the identity, the expired entries are dropped on write.
+        """
+        self.set_many({key: identity})
+
+    def set_many(self, identities: T.Mapping[str, Identity]):
+        """
+        Cache many identities with one read and one write of the cache file,
+        the expired entries are dropped on write.
+        """
+        if not identities:
+            return
+        new_entries = {key: identity.to_dict() for key, identity in identities.items()}
+        if self._snapshot is not None:
+            self._snapshot.update(new_entries)
+            self._pending.update(new_entries)
+            return
+        self._write(new_entries)
+
+    def _write(self, new_entries: T.Dict[str, dict]):
+        with file_lock(self.path, exclusive=True):
+            now = time.time()
+            entries = {
+                k: v
+                for k, v in self._load().items()
+                if now - v.get("created_at", 0) < self.ttl
+            }
+            entries.update(new_entries)
+            self._dump(entries)
+
+    @contextlib.contextmanager
+    def batch(self) -> T.Iterator["IdentityCache"]:
+        """
+        Load the cache file once, serve :meth:`IdentityCache.get` from
+        memory and buffer :meth:`IdentityCache.set`, then write all the new
+        entries at once on exit. Use it when filling the cache for many
+        profiles, otherwise every write rewrites the whole file.
+
+        Usage example::
+
+            cache = IdentityCache.from_awscli_config(awscli_config)
+            with cache.batch():
+                for profile in profiles:
+                    get_identity(profile, awscli_config, cache=cache)
+        """
+        self._snapshot = self._load()
+        self._pending = {}
+        try:
+            yield self
+        finally:
+            pending = self._pending
+            self._snapshot = None
+            self._pending = {}
+            if pending:
+                self._write(pending)
+
+    def invalidate(self, key: T.Optional[str] = None) -> bool:
+        """
+        Remove the cache key, or all entries if key is None. Return a
+        boolean flag to indicate that whether anything is removed.
+        """
+        with file_lock(self.path, exclusive=True):
+            entries = self._load()
+            if key is None:
+                flag = bool(entries)
+                entries = {}
+            else:
+                flag = entries.pop(key, None) is not None
+            if flag:
+                self._dump(entries)
+        return flag
+
+
+@dataclasses.dataclass
+class IdentityFetch:
+    """
+    The ``sts.get_caller_identity`` and ``iam.list_account_aliases`` calls of
+    a profile, they are independent, so they run concurrently. Don't use the
+    constructor, use :meth:`IdentityFetch.start` instead.
+    """
+
+    caller_future: Future
+    alias_future: Future
+    _executor: ThreadPoolExecutor
+
+    @classmethod
+    def start(cls, profile: str, awscli_config: AWSCliConfig) -> "IdentityFetch":
+        from .url import get_account_alias
+
+        # the clients are pooled and thread safe
+        sts = get_client("sts", profile, awscli_config=awscli_config)
+        iam = get_client("iam", profile, awscli_config=awscli_config)
+        executor = ThreadPoolExecutor(max_workers=2)
+        return cls(
+            caller_future=executor.submit(sts.get_caller_identity),
+            alias_future=executor.submit(get_account_alias, iam),
+            _executor=executor,
+        )
+
+    @property
+    def futures(self) -> T.List[Future]:
+        return [self.caller_future, self.alias_future]
+
+    def cancel(self):
+        """
+        Cancel the calls that are not started yet, and don't wait for the
+        running calls.
+        """
+        for future in self.futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+
+    def join(self):
+        """
+        Wait for the running calls and their done callbacks (e.g. the
+        background cache write of :func:`get_sign_in_account`) to finish.
+        """
+        self._executor.shutdown(wait=True)
+
+    def _raise_timeout(self, timeout: float):
+        self.cancel()
+        raise exc.IdentityLookupTimeoutError(
+            f"failed to get the account identity in {timeout} seconds"
+        )
+
+    def result(self, timeout: T.Optional[float] = None) -> Identity:
+        """
+        Wait for both calls, at most ``timeout`` seconds in total.
+        """
+        _, not_done = wait(self.futures, timeout=timeout)
+        if not_done:
+            self._raise_timeout(timeout)
+        self._executor.shutdown(wait=False)
+        response = self.caller_future.result()
+        return Identity(
+            account_id=response["Account"],
+            arn=response["Arn"],
+            alias=self.alias_future.result(),
+        )
+
+    def first_account(self, timeout: T.Optional[float] = None) -> str:
+        """
+        Return the account alias or the account id, whichever is available
+        first. The alias is preferred if both are available. Wait at most
+        ``timeout`` seconds in total.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = set(self.futures)
+        while pending:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            done, pending = wait(
+                pending,
+                timeout=remaining,
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                self._raise_timeout(timeout)
+            alias_future = self.alias_future
+            if (
+                alias_future.done()
+                and alias_future.exception() is None
+                and alias_future.result()
+            ):
+                self._executor.shutdown(wait=False)
+                return alias_future.result()
+            if self.caller_future.done():
+                self._executor.shutdown(wait=False)
+                return self.caller_future.result()["Account"]
+        # the caller future is always done here
+        return self.caller_future.result()["Account"]  # pragma: no cover
+
+
+def fetch_identity(
+    profile: str,
+    awscli_config: AWSCliConfig,
+    timeout: T.Optional[float] = DEFAULT_TIMEOUT,
+) -> Identity:
+    """
+    Get the identity of the profile with the STS and IAM API, the two calls
+    run concurrently and share the ``timeout``.
+    """
+    return IdentityFetch.start(profile, awscli_config).result(timeout=timeout)
+
+
+def _get_cache_and_key(
+    profile: str,
+    awscli_config: T.Optional[AWSCliConfig],
+    ttl: float,
+    cache: T.Optional[IdentityCache] = None,
+) -> T.Tuple[AWSCliConfig, IdentityCache, T.Optional[str]]:
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    if cache is None:
+        cache = IdentityCache.from_awscli_config(awscli_config, ttl=ttl)
+    try:
+        key = get_identity_cache_key(profile, awscli_config)
+    except (
+        exc.AWSConfigFileNotExistError,
+        exc.AWSCredentialsFileNotExistError,
+    ):  # pragma: no cover
+        key = None
+    return awscli_config, cache, key
+
+
+def get_identity(
+    profile: str,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    ttl: float = DEFAULT_TTL,
+    timeout: T.Optional[float] = DEFAULT_TIMEOUT,
+    cache: T.Optional[IdentityCache] = None,
+) -> Identity:
+    """
+    Get the identity of the profile, from the cache if possible.
+
+    :param ttl: see :class:`IdentityCache`.
+    :param timeout: see :func:`fetch_identity`.
+    :param cache: the cache to use, e.g. one in :meth:`IdentityCache.batch`,
+        by default it is the cache file next to the config file, and
+        ``ttl`` is ignored if it is given.
+    """
+    awscli_config, cache, key = _get_cache_and_key(
+        profile, awscli_config, ttl, cache=cache
+    )
+    if key is not None:
+        identity = cache.get(key)
+        if identity is not None:
+            return identity
+    identity = fetch_identity(profile, awscli_config, timeout=timeout)
+    if key is not None:
+        cache.set(key, identity)
+    return identity
+
+
+def get_sign_in_account(
+    profile: str,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    ttl: float = DEFAULT_TTL,
+    timeout: T.Optional[float] = DEFAULT_TIMEOUT,
+    race: bool = False,
+) -> str:
+    """
+    Get the account alias, or the account id if the account doesn't have an
+    alias, from the cache if possible.
+
+    :param race: if True, return whichever of the alias and the account id
+        is available first, so it may return the account id even if the
+        account has an alias. The identity is still cached in background
+        when both calls finish, so the next call returns the alias.
+    """
+    if not race:
+        identity = get_identity(profile, awscli_config, ttl=ttl, timeout=timeout)
+        return identity.alias or identity.account_id
+
+    awscli_config, cache, key = _get_cache_and_key(profile, awscli_config, ttl)
+    if key is not None:
+        identity = cache.get(key)
+        if identity is not None:
+            return identity.alias or identity.account_id
+    fetch = IdentityFetch.start(profile, awscli_config)
+    if key is not None:
+        # both callbacks may see both futures done, write the cache only once
+        cached = []
+        lock = threading.Lock()
+
+        def cache_when_done(_):
+            if all(
+                future.done() and not future.cancelled() and future.exception() is None
+                for future in fetch.futures
+            ):
+                with lock:
+                    if cached:
+                        return
+                    cached.append(True)
+                cache.set(key, fetch.result())
+
+        for future in fetch.futures:
+            future.add_done_callback(cache_when_done)
+    return fetch.first_account(timeout=timeout)
+
+
+def invalidate_identity(
+    profile: T.Optional[str] = None,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+) -> bool:
+    """
+    Remove the cached identity of the profile, or all cached identities if
+    profile is None. Return a boolean flag to indicate that whether
+    anything is removed.
+    """
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    cache = IdentityCache.from_awscli_config(awscli_config)
+    if profile is None:
+        return cache.invalidate()
+    key = get_identity_cache_key(profile, awscli_config)
+    if key is None:
+        return False
+    return cache.invalidate(key)
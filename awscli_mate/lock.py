@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cross-process advisory file lock for the ``~/.aws/config`` and
+``~/.aws/credentials`` file.
+
+Readers acquire a shared lock, so they never block each other. Writers
+acquire an exclusive lock for the whole read-modify-write cycle, so
+concurrent writers won't lose each other's update.
+
+The lock is acquired on a sidecar ``.${filename}.lock`` file in the same
+directory, because the data file is replaced atomically on write, locking
+the data file itself would lock the old inode.
+
+On the platform that doesn't support ``fcntl`` (Windows), locking is a no-op,
+there is NO cross-process protection, concurrent writers from different
+processes may lose each other's update. The writes are still atomic, so the
+file is never half written.
+"""
+
+import typing as T
+import os
+import time
+import threading
+import contextlib
+import dataclasses
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from . import exc
+
+
+@dataclasses.dataclass
+class LockStats:
+    """
+    Lock wait time statistics, use it to measure lock contention.
+
+    :param acquired: number of acquired locks.
+    :param timeouts: number of lock waits that timed out.
+    :param total_wait: total seconds spent on waiting for locks.
+    :param max_wait: the longest seconds spent on waiting for a lock.
+    """
+
+    acquired: int = 0
+    timeouts: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def avg_wait(self) -> float:
+        if self.acquired == 0:
+            return 0.0
+        return self.total_wait / self.acquired
+
+    def record(self, wait: float):
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def reset(self):
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+lock_stats = LockStats()
+
+# lock paths held by the current thread, the value is True if it is exclusive.
+# flock locks belong to the open file description, so acquire the same lock
+# file again in the same thread would dead lock itself. It is safe to re-enter
+# because the outer lock is at least as strong as a shared lock.
+_local = threading.local()
+
+
+def _get_held_locks() -> T.Dict[str, bool]:
+    try:
+        return _local.held
+    except AttributeError:
+        _local.held = {}
+        return _local.held
+
+
+def get_lock_path(path: Path) -> Path:
+    """
+    Get the sidecar lock file path of a data file.
+    """
+    path = Path(path)
+    return path.parent / f".{path.name}.lock"
+
+
+@contextlib.contextmanager
+def file_lock(
+    path: Path,
+    exclusive: bool = False,
+    timeout: float = 10.0,
+    interval: float = 0.01,
+) -> T.Iterator[float]:
+    """
+    Acquire an advisory lock on the given data file, yield the seconds spent
+    on waiting for the lock.
+
+    :param path: the path of the data file, NOT the lock file.
+    :param exclusive: acquire exclusive lock if True, otherwise shared lock.
+    :param timeout: raise :class:`~awscli_mate.exc.LockTimeoutError` if the
+        lock is not acquired in this many seconds.
+    :param interval: the polling interval in seconds.
+    """
+    if fcntl is None:  # pragma: no cover
+        yield 0.0
+        return
+
+    lock_path = get_lock_path(path)
+    key = str(lock_path)
+    held_locks = _get_held_locks()
+    if key in held_locks:
+        if exclusive and not held_locks[key]:
+            raise RuntimeError(f"cannot upgrade shared lock on {path} to exclusive")
+        yield 0.0
+        return
+
+    fd = os.open(key, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        start = time.perf_counter()
+        while True:
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.perf_counter() - start >= timeout:
+                    lock_stats.timeouts += 1
+                    raise exc.LockTimeoutError(
+                        f"failed to acquire lock on {path} in {timeout} seconds"
+                    )
+                time.sleep(interval)
+        wait = time.perf_counter() - start
+        lock_stats.record(wait)
+        held_locks[key] = exclusive
+        try:
+            yield wait
+        finally:
+            del held_locks[key]
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def file_locks(
+    paths: T.Iterable[Path],
+    exclusive: bool = False,
+    timeout: float = 10.0,
+) -> T.Iterator[None]:
+    """
+    Acquire locks on multiple data files. Locks are always acquired in sorted
+    path order to avoid dead lock.
+    """
+    with contextlib.ExitStack() as stack:
+        for path in sorted({str(path) for path in paths}):
+            stack.enter_context(file_lock(path, exclusive=exclusive, timeout=timeout))
+        yield
@@ -4,7 +4,15 @@ from pathlib import Path
 
 dir_home = Path.home()
 
+
+def get_dir_aws(dir_home: Path) -> Path:
+    """
+    Get the ``.aws`` directory of the given home directory.
+    """
+    return Path(dir_home) / ".aws"
+
+
 # See "Location of the shared config and credentials files": https://docs.aws.amazon.com/sdkref/latest/guide/file-location.html
-dir_aws = dir_home / ".aws"
+dir_aws = get_dir_aws(dir_home)
 path_config = dir_aws / "config"
 path_credentials = dir_aws / "credentials"
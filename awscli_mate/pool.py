@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+Process level pool of boto3 sessions and clients.
+
+Creating a boto3 session loads the service model data, and creating a
+client resolves the endpoint and opens new HTTP connections. This module
+keeps the sessions and the clients, so a long running UI session or a batch
+job re-uses them, and the HTTP keep-alive connections of the clients.
+
+- the sessions are keyed by ``(config file, credentials file, profile)``.
+- the clients are keyed by ``(config file, credentials file, profile,
+  service, region)``.
+
+Both are LRU bounded. A session and its clients are dropped when the stat
+signature of the config or the credentials file changed (for example, after
+``mfa_auth`` writes a new session token), so they never use stale
+credentials. See :mod:`awscli_mate.cache`.
+
+Usage example::
+
+    sts = get_client("sts", profile="my_profile")
+    sts.get_caller_identity()
+
+.. note::
+
+    boto3 session is not thread safe, but the client is. The pool creates
+    the clients of a session under a per session lock, then the clients can
+    be used in any thread.
+"""
+
+import typing as T
+import threading
+import dataclasses
+from collections import OrderedDict
+
+from .cache import StatSignature, CacheStats
+from .awscli import AWSCliConfig
+from .role_cache import new_boto_session
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    import boto3
+
+DEFAULT_MAX_SESSIONS = 16
+DEFAULT_MAX_CLIENTS = 64
+
+T_VERSION = T.Tuple[T.Optional[StatSignature], T.Optional[StatSignature]]
+T_SESSION_KEY = T.Tuple[str, str, T.Optional[str]]
+T_CLIENT_KEY = T.Tuple[str, str, T.Optional[str], str, T.Optional[str]]
+
+
+def _get_signature(path) -> T.Optional[StatSignature]:
+    try:
+        return StatSignature.from_path(path)
+    except FileNotFoundError:
+        return None
+
+
+def get_config_version(awscli_config: AWSCliConfig) -> T_VERSION:
+    """
+    The version of the config and the credentials file, None if the file
+    doesn't exist.
+    """
+    return (
+        _get_signature(awscli_config.path_config),
+        _get_signature(awscli_config.path_credentials),
+    )
+
+
+@dataclasses.dataclass
+class PooledSession:
+    """
+    A session in the pool.
+
+    :param version: the config version when the session is created.
+    :param session: the boto3 session.
+    :param lock: serialize the client creation of this session.
+    """
+
+    version: T_VERSION
+    session: "boto3.session.Session"
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+
+@dataclasses.dataclass
+class SessionPool:
+    """
+    LRU bounded pool of boto3 sessions and clients.
+
+    :param max_sessions: the max number of sessions to keep.
+    :param max_clients: the max number of clients to keep.
+    :param stats: the hit / miss counters of the client lookup.
+    """
+
+    max_sessions: int = DEFAULT_MAX_SESSIONS
+    max_clients: int = DEFAULT_MAX_CLIENTS
+    _sessions: T.Dict[T_SESSION_KEY, PooledSession] = dataclasses.field(
+        default_factory=OrderedDict
+    )
+    _clients: T.Dict[T_CLIENT_KEY, T.Tuple[T_VERSION, T.Any]] = dataclasses.field(
+        default_factory=OrderedDict
+    )
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    stats: CacheStats = dataclasses.field(default_factory=CacheStats)
+
+    def _get_pooled_session(
+        self,
+        profile: T.Optional[str],
+        awscli_config: AWSCliConfig,
+        version: T_VERSION,
+    ) -> PooledSession:
+        key = (
+            str(awscli_config.path_config),
+            str(awscli_config.path_credentials),
+            profile,
+        )
+        with self._lock:
+            pooled = self._sessions.get(key)
+            if pooled is not None and pooled.version == version:
+                self._sessions.move_to_end(key)
+                return pooled
+        session = new_boto_session(profile, awscli_config)
+        with self._lock:
+            # another thread may have created it
+            pooled = self._sessions.get(key)
+            if pooled is None or pooled.version != version:
+                pooled = PooledSession(version=version, session=session)
+                self._sessions[key] = pooled
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return pooled
+
+    def get_session(
+        self,
+        profile: T.Optional[str] = None,
+        awscli_config: T.Optional[AWSCliConfig] = None,
+    ) -> "boto3.session.Session":
+        """
+        Get the pooled boto3 session of the profile, see
+        :func:`~awscli_mate.role_cache.new_boto_session`.
+
+        Don't create clients from the returned session in multiple threads,
+        use :meth:`get_client` instead.
+        """
+        if awscli_config is None:
+            awscli_config = AWSCliConfig()
+        version = get_config_version(awscli_config)
+        return self._get_pooled_session(profile, awscli_config, version).session
+
+    def get_client(
+        self,
+        service_name: str,
+        profile: T.Optional[str] = None,
+        region: T.Optional[str] = None,
+        awscli_config: T.Optional[AWSCliConfig] = None,
+    ):
+        """
+        Get the pooled boto3 client of the profile, service and region.
+
+        :param region: by default, it is the region of the profile.
+        """
+        if awscli_config is None:
+            awscli_config = AWSCliConfig()
+        version = get_config_version(awscli_config)
+        key = (
+            str(awscli_config.path_config),
+            str(awscli_config.path_credentials),
+            profile,
+            service_name,
+            region,
+        )
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and entry[0] == version:
+                self._clients.move_to_end(key)
+                self.stats.hits += 1
+                return entry[1]
+            self.stats.misses += 1
+        pooled = self._get_pooled_session(profile, awscli_config, version)
+        with pooled.lock:
+            client = pooled.session.client(service_name, region_name=region)
+        with self._lock:
+            self._clients[key] = (version, client)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        return client
+
+    def clear(self):
+        """
+        Remove all sessions and clients, and reset the counters.
+        """
+        with self._lock:
+            self._sessions.clear()
+            self._clients.clear()
+            self.stats = CacheStats()
+
+
+session_pool = SessionPool()
+
+
+def get_session(
+    profile: T.Optional[str] = None,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+) -> "boto3.session.Session":
+    """
+    See :meth:`SessionPool.get_session`.
+    """
+    return session_pool.get_session(profile, awscli_config)
+
+
+def get_client(
+    service_name: str,
+    profile: T.Optional[str] = None,
+    region: T.Optional[str] = None,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+):
+    """
+    See :meth:`SessionPool.get_client`.
+    """
+    return session_pool.get_client(service_name, profile, region, awscli_config)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""
+Retry the AWS API calls that are throttled.
+"""
+
+import typing as T
+import time
+import random
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 20.0
+
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+}
+
+
+def is_throttling_error(e: Exception) -> bool:
+    """
+    Whether the exception is a throttling error of the AWS API.
+    """
+    import botocore.exceptions
+
+    if not isinstance(e, botocore.exceptions.ClientError):
+        return False
+    return e.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+def call_with_backoff(
+    func: T.Callable[[], T.Any],
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    max_delay: float = DEFAULT_MAX_DELAY,
+    sleep: T.Callable[[float], None] = time.sleep,
+):
+    """
+    Call the function, retry on the AWS API throttling error with exponential
+    backoff and full jitter. Other errors are raised immediately.
+    """
+    attempt = 1
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_attempts or not is_throttling_error(e):
+                raise
+        delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+        sleep(random.uniform(0, delay))
+        attempt += 1
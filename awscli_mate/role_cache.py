@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+"""
+Assume-role credential cache warmer, compatible with the botocore file cache.
+
+For a profile like this::
+
+    [profile my_role]
+    role_arn = arn:aws:iam::111122223333:role/my-role
+    source_profile = my_base
+
+botocore calls ``AssumeRole`` every time a new session uses the profile. The
+AWS CLI caches the response in ``~/.aws/cli/cache/${cache_key}.json``, but
+boto3 only caches in memory. This module:
+
+- computes the same cache key as botocore, and writes the ``AssumeRole``
+  response in the same JSON format, see :func:`warm_role_cache`.
+- creates boto3 sessions that read from and write to the same file cache,
+  see :func:`new_boto_session`.
+
+So both the AWS CLI and the boto3 sessions created by this tool skip the
+``AssumeRole`` round trip while the cached credentials are fresh.
+
+.. note::
+
+    botocore treats cached credentials that expire in less than 15 minutes
+    as expired, the warmer refreshes the entries earlier than that.
+"""
+
+import typing as T
+import json
+import hashlib
+import dataclasses
+from datetime import datetime, timezone
+
+from .constants import ConfigKeyEnum
+from .scanner import strip_comment
+from .awscli import AWSCliConfig, _get_section_data
+from . import exc
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    import boto3
+    import botocore.session
+
+# see ``botocore.credentials.CachedCredentialFetcher``
+BOTOCORE_EXPIRY_WINDOW = 15 * 60
+DEFAULT_REFRESH_MARGIN = 2 * BOTOCORE_EXPIRY_WINDOW
+
+
+def get_assume_role_kwargs(data: T.Mapping[str, str]) -> T.Dict[str, T.Any]:
+    """
+    Get the ``AssumeRole`` arguments of a role profile, the same way as
+    ``botocore.credentials.AssumeRoleProvider``. The ``RoleSessionName`` is
+    only included when it is configured.
+
+    :param data: the section data of the profile in the config file.
+    """
+    kwargs: T.Dict[str, T.Any] = {"RoleArn": data[ConfigKeyEnum.role_arn.value]}
+    if data.get("role_session_name") is not None:
+        kwargs["RoleSessionName"] = data["role_session_name"]
+    if data.get("external_id") is not None:
+        kwargs["ExternalId"] = data["external_id"]
+    if data.get("mfa_serial") is not None:
+        kwargs["SerialNumber"] = data["mfa_serial"]
+    if data.get("duration_seconds") is not None:
+        try:
+            kwargs["DurationSeconds"] = int(data["duration_seconds"])
+        except ValueError:
+            pass
+    return kwargs
+
+
+def get_cache_key(assume_role_kwargs: T.Mapping[str, T.Any]) -> str:
+    """
+    Get the cache key of the ``AssumeRole`` arguments, it is the same as
+    ``botocore.credentials.AssumeRoleCredentialFetcher._create_cache_key``.
+    """
+    args = dict(assume_role_kwargs)
+    if "Policy" in args:
+        args["Policy"] = json.loads(args["Policy"])
+    argument_hash = hashlib.sha1(
+        json.dumps(args, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return argument_hash.replace(":", "_").replace("/", "_")
+
+
+def get_response_expiration(response: T.Mapping[str, T.Any]) -> T.Optional[datetime]:
+    """
+    Get the expiration time of a cached ``AssumeRole`` response. botocore
+    writes it like ``2023-01-01T00:00:00UTC``.
+    """
+    from botocore.utils import parse_timestamp
+
+    try:
+        expiration = response["Credentials"]["Expiration"]
+    except (KeyError, TypeError):
+        return None
+    if not isinstance(expiration, datetime):
+        try:
+            expiration = parse_timestamp(expiration)
+        except (ValueError, TypeError):
+            return None
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return expiration
+
+
+def get_seconds_remaining(response: T.Mapping[str, T.Any]) -> float:
+    """
+    Seconds until the cached ``AssumeRole`` response expires, negative if it
+    is expired or the expiration time is unknown.
+    """
+    expiration = get_response_expiration(response)
+    if expiration is None:
+        return -1.0
+    return (expiration - datetime.now(timezone.utc)).total_seconds()
+
+
+def new_botocore_session(
+    profile: T.Optional[str] = None,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+) -> "botocore.session.Session":
+    """
+    Create a botocore session of the profile that reads the config files of
+    the given :class:`~awscli_mate.awscli.AWSCliConfig`, and caches the
+    assumed role credentials in its ``cli/cache`` folder, the same as the
+    AWS CLI does.
+    """
+    import botocore.session
+    from botocore.utils import JSONFileCache
+
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    session = botocore.session.Session()
+    session.set_config_variable("config_file", str(awscli_config.path_config))
+    session.set_config_variable(
+        "credentials_file", str(awscli_config.path_credentials)
+    )
+    # the credential provider chain is bound to the profile when it is created
+    if profile is not None:
+        session.set_config_variable("profile", profile)
+    provider = session.get_component("credential_provider").get_provider(
+        "assume-role"
+    )
+    provider.cache = JSONFileCache(str(awscli_config.dir_cli_cache))
+    return session
+
+
+def new_boto_session(
+    profile: T.Optional[str] = None,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+) -> "boto3.session.Session":
+    """
+    Create a boto3 session of the profile, the assumed role credentials are
+    cached on disk. See :func:`new_botocore_session`.
+    """
+    import boto3
+
+    return boto3.session.Session(
+        botocore_session=new_botocore_session(profile, awscli_config),
+    )
+
+
+class WarmStatusEnum:
+    fresh = "fresh"
+    refreshed = "refreshed"
+    skipped = "skipped"
+    failed = "failed"
+
+
+@dataclasses.dataclass
+class WarmResult:
+    """
+    The result of warming the cache of one role profile.
+
+    :param profile: the profile name.
+    :param status: one of :class:`WarmStatusEnum`.
+    :param cache_key: the botocore cache key, None if skipped.
+    :param expiration: the expiration time of the cached credentials.
+    :param error: the reason why it is skipped or failed.
+    """
+
+    profile: str
+    status: str
+    cache_key: T.Optional[str] = None
+    expiration: T.Optional[datetime] = None
+    error: T.Optional[str] = None
+
+
+T_GET_STS_CLIENT = T.Callable[[str], T.Any]
+
+
+def warm_role_cache(
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    profiles: T.Optional[T.Iterable[str]] = None,
+    refresh_margin: int = DEFAULT_REFRESH_MARGIN,
+    get_sts_client: T.Optional[T_GET_STS_CLIENT] = None,
+) -> T.List[WarmResult]:
+    """
+    Assume the roles ahead of time, write the responses to the botocore
+    compatible file cache. Entries that are valid for more than
+    ``refresh_margin`` seconds are not touched.
+
+    The profiles are processed in the order of their ``source_profile``
+    chain depth, so a chained role uses the just warmed credentials of its
+    source role.
+
+    Profiles that use ``credential_source`` or ``mfa_serial`` are skipped,
+    because they need the environment or a MFA code to assume the role.
+
+    :param profiles: the role profiles to warm, by default, all profiles
+        that have a ``role_arn``.
+    :param refresh_margin: refresh the entry if it expires within this
+        many seconds, it should be greater than 15 minutes, otherwise
+        botocore may already consider it expired.
+    :param get_sts_client: a function that takes the source profile name
+        and returns a STS client of that profile, by default it is taken
+        from the session pool, see :mod:`awscli_mate.pool`.
+    """
+    from botocore.utils import JSONFileCache
+
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    if get_sts_client is None:
+
+        from .pool import get_client
+
+        def get_sts_client(source_profile: str):  # pragma: no cover
+            return get_client("sts", source_profile, awscli_config=awscli_config)
+
+    graph = awscli_config.get_profile_graph()
+    config, _ = awscli_config.read_config(readonly=True)
+    cache = JSONFileCache(str(awscli_config.dir_cli_cache))
+
+    if profiles is None:
+        profiles = [
+            profile
+            for profile in graph.profiles
+            if ConfigKeyEnum.role_arn.value
+            in (_get_section_data(config, f"profile {profile}") or {})
+        ]
+    profiles = list(profiles)
+
+    def get_depth(profile: str) -> int:
+        try:
+            return graph.chain_depth(profile) or 0
+        except (exc.ProfileNotFoundError, exc.ProfileChainCycleError):
+            return 0
+
+    results: T.List[WarmResult] = list()
+    for profile in sorted(profiles, key=get_depth):
+        section_name = profile if profile == "default" else f"profile {profile}"
+        data = _get_section_data(config, section_name)
+        if data is None or ConfigKeyEnum.role_arn.value not in data:
+            results.append(
+                WarmResult(profile, WarmStatusEnum.skipped, error="not a role profile")
+            )
+            continue
+        source_profile = data.get(ConfigKeyEnum.source_profile.value)
+        if source_profile is not None:
+            source_profile = strip_comment(source_profile).strip()
+        if not source_profile:
+            results.append(
+                WarmResult(profile, WarmStatusEnum.skipped, error="no source_profile")
+            )
+            continue
+        if data.get("mfa_serial") is not None:
+            results.append(
+                WarmResult(profile, WarmStatusEnum.skipped, error="requires MFA")
+            )
+            continue
+
+        assume_role_kwargs = get_assume_role_kwargs(data)
+        cache_key = get_cache_key(assume_role_kwargs)
+        try:
+            response = cache[cache_key]
+        except KeyError:
+            response = None
+        if response is not None and get_seconds_remaining(response) > refresh_margin:
+            results.append(
+                WarmResult(
+                    profile,
+                    WarmStatusEnum.fresh,
+                    cache_key=cache_key,
+                    expiration=get_response_expiration(response),
+                )
+            )
+            continue
+
+        kwargs = dict(assume_role_kwargs)
+        kwargs.setdefault("RoleSessionName", f"awscli-mate-{profile}"[:64])
+        try:
+            sts = get_sts_client(source_profile)
+            response = sts.assume_role(**kwargs)
+        except Exception as e:
+            results.append(
+                WarmResult(
+                    profile,
+                    WarmStatusEnum.failed,
+                    cache_key=cache_key,
+                    error=f"{e.__class__.__name__}: {e}",
+                )
+            )
+            continue
+        # botocore adds the account id to the cached credentials
+        arn = response.get("AssumedRoleUser", {}).get("Arn", "")
+        if arn.count(":") >= 5:
+            response["Credentials"]["AccountId"] = arn.split(":")[4]
+        cache[cache_key] = response
+        results.append(
+            WarmResult(
+                profile,
+                WarmStatusEnum.refreshed,
+                cache_key=cache_key,
+                expiration=get_response_expiration(response),
+            )
+        )
+    return results
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+A light-weight, read-only scanner for the AWS CLI config file.
+
+:class:`~commentedconfigparser.CommentedConfigParser` builds a comment map and
+a full ``ConfigParser`` object, this is necessary when we want to write the
+file back, but it is overkill when we only need the section names and a few
+keys. This module streams the file line by line in one linear pass and
+yields the section data as soon as the section is finished.
+
+The parsing rule follows :class:`configparser.ConfigParser` default behavior:
+
+- ``#`` and ``;`` are full line comment prefix, inline comment is part of the value.
+- both ``=`` and ``:`` are valid delimiters, the first one wins.
+- keys are lower cased, keys and values are stripped.
+- indented lines are continuation of the previous value.
+
+Unlike ``ConfigParser``, the scanner doesn't validate the file, malformed
+lines are ignored.
+"""
+
+import typing as T
+from pathlib import Path
+
+T_SECTION = T.Tuple[str, T.Dict[str, str]]
+
+DEFAULT_SECTION = "DEFAULT"
+
+
+def strip_comment(s: str) -> str:
+    return s.split("#")[0]
+
+
+def _split_key_value(line: str) -> T.Optional[T.Tuple[str, str]]:
+    i_eq = line.find("=")
+    i_colon = line.find(":")
+    if i_eq == -1 and i_colon == -1:
+        return None
+    if i_eq == -1 or (i_colon != -1 and i_colon < i_eq):
+        i = i_colon
+    else:
+        i = i_eq
+    return line[:i].strip().lower(), line[i + 1 :].strip()
+
+
+def iter_sections(lines: T.Iterable[str]) -> T.Iterable[T_SECTION]:
+    """
+    Parse config file lines, yield ``(section_name, data)`` in the order
+    they appear in the file.
+    """
+    section_name: T.Optional[str] = None
+    data: T.Dict[str, str] = {}
+    key: T.Optional[str] = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        first_char = stripped[0]
+        if first_char == "#" or first_char == ";":
+            continue
+        # continuation line of the previous value
+        if line[0].isspace() and key is not None:
+            data[key] = f"{data[key]}\n{stripped}"
+            continue
+        if first_char == "[" and "]" in stripped:
+            if section_name is not None:
+                yield section_name, data
+            section_name = stripped[1 : stripped.rindex("]")]
+            data = {}
+            key = None
+            continue
+        if section_name is None:
+            continue
+        kv = _split_key_value(stripped)
+        if kv is None:
+            key = None
+            continue
+        key, value = kv
+        data[key] = value
+    if section_name is not None:
+        yield section_name, data
+
+
+def iter_file_sections(path: Path) -> T.Iterable[T_SECTION]:
+    """
+    Stream the sections of the given config file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_sections(f)
+
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pluggable fuzzy scorer backend of the profile search.
+
+A scorer scores a query against many names in one batch call, so the
+per keystroke work is one pass over all profile names:
+
+- :class:`FuzzywuzzyScorer`: the ``fuzzywuzzy`` ``WRatio`` score, exactly the
+  same as ``fuzzywuzzy.process.extractBests``. The processed names are
+  memoized, the query is processed once per batch, and duplicated names are
+  scored once. ``fuzzywuzzy`` uses ``python-Levenshtein`` automatically if
+  it is installed.
+- :class:`RapidfuzzScorer`: the ``rapidfuzz`` ``WRatio`` score, computed in
+  C for all names in one vectorized ``cdist`` call (``process.extract`` if
+  ``numpy`` is not installed). The names are processed the same way as
+  ``fuzzywuzzy``, so both scorers agree on the perfect matches and the best
+  match, but ``rapidfuzz`` uses the Levenshtein based similarity while
+  ``fuzzywuzzy`` uses ``difflib`` (unless ``python-Levenshtein`` is
+  installed), the other scores may differ by more than ten points, and so
+  does the order after the best match.
+
+By default, :func:`get_default_scorer` uses ``fuzzywuzzy``, so the ranking
+is the same as ``fuzzywuzzy.process.extractBests``. Use
+:func:`set_default_scorer` to opt in to ``rapidfuzz``.
+
+Usage example::
+
+    scorer = get_default_scorer()
+    scores = scorer.score_batch("prod", ["my_prod", "my_dev"])
+"""
+
+import typing as T
+import heapq
+import threading
+import dataclasses
+
+from .vendor.better_fuzzywuzzy import fuzz, utils
+
+T_NAMES = T.Sequence[str]
+
+
+class BaseScorer:
+    """
+    The scorer interface, the score is an int from 0 to 100.
+    """
+
+    name: T.ClassVar[str] = "base"
+
+    def score_batch(self, query: str, names: T_NAMES) -> T.List[int]:
+        """
+        Score the query against all names, the result is in the same order.
+        """
+        raise NotImplementedError
+
+    def score(self, query: str, name: str) -> int:
+        return self.score_batch(query, [name])[0]
+
+    @property
+    def cache_key(self) -> T.Hashable:
+        """
+        The key of the scorer in the query result caches, the scorers with
+        the same key must give the same scores. By default, it is the scorer
+        object itself, override it if the scorer is not hashable, or to share
+        the cached results between the scorers of the same config.
+        """
+        return self
+
+
+@dataclasses.dataclass
+class ProcessedScorer(BaseScorer):
+    """
+    The base class of the scorers that process the query and the names the
+    same way as ``fuzzywuzzy.process.extractBests``.
+
+    :param max_cache_size: the max number of memoized processed names, the
+        memo is reset when it is full.
+    """
+
+    max_cache_size: int = 100000
+    _processed: T.Dict[str, str] = dataclasses.field(default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    @staticmethod
+    def process_query(query: str) -> str:
+        # the same as fuzzywuzzy.process.extractWithoutOrder, the default
+        # processor runs before the ascii pre processor
+        return utils.full_process(utils.full_process(query), force_ascii=True)
+
+    def process_name(self, name: str) -> str:
+        processed = self._processed.get(name)
+        if processed is None:
+            processed = utils.full_process(name, force_ascii=True)
+            with self._lock:
+                if len(self._processed) >= self.max_cache_size:
+                    self._processed.clear()
+                self._processed[name] = processed
+        return processed
+
+
+@dataclasses.dataclass
+class FuzzywuzzyScorer(ProcessedScorer):
+    """
+    See module doc.
+    """
+
+    name: T.ClassVar[str] = "fuzzywuzzy"
+
+    @property
+    def cache_key(self) -> T.Hashable:
+        # max_cache_size doesn't change the scores
+        return self.name
+
+    def score_batch(self, query: str, names: T_NAMES) -> T.List[int]:
+        processed_query = self.process_query(query)
+        if not processed_query:
+            return [0] * len(names)
+        scores: T.Dict[str, int] = dict()
+        result = list()
+        for name in names:
+            processed = self.process_name(name)
+            score = scores.get(processed)
+            if score is None:
+                score = fuzz.WRatio(processed_query, processed, full_process=False)
+                scores[processed] = score
+            result.append(score)
+        return result
+
+
+@dataclasses.dataclass
+class RapidfuzzScorer(ProcessedScorer):
+    """
+    See module doc.
+
+    :param workers: the number of threads used by ``cdist``, -1 means all CPUs.
+    :param use_cdist: use the vectorized ``cdist``, it requires ``numpy``,
+        by default, True if ``numpy`` is installed.
+    """
+
+    name: T.ClassVar[str] = "rapidfuzz"
+
+    workers: int = 1
+    use_cdist: T.Optional[bool] = None
+
+    def __post_init__(self):
+        from rapidfuzz import process, fuzz as rfuzz
+
+        self._process = process
+        self._scorer = rfuzz.WRatio
+        if self.use_cdist is None:
+            self.use_cdist = is_numpy_installed()
+        if self.use_cdist:
+            import numpy as np
+
+            # the default float32 rounds some scores differently
+            self._dtype = np.float64
+
+    @property
+    def cache_key(self) -> T.Hashable:
+        # workers and use_cdist don't change the scores
+        return self.name
+
+    def score_batch(self, query: str, names: T_NAMES) -> T.List[int]:
+        processed_query = self.process_query(query)
+        if not processed_query:
+            return [0] * len(names)
+        if len(names) == 0:
+            return []
+        processed_names = [self.process_name(name) for name in names]
+        if self.use_cdist:
+            matrix = self._process.cdist(
+                [processed_query],
+                processed_names,
+                scorer=self._scorer,
+                processor=None,
+                dtype=self._dtype,
+                workers=self.workers,
+            )
+            return [int(round(score)) for score in matrix[0]]
+        scores = [0] * len(names)
+        for _, score, index in self._process.extract(
+            processed_query,
+            processed_names,
+            scorer=self._scorer,
+            processor=None,
+            limit=None,
+        ):
+            scores[index] = int(round(score))
+        return scores
+
+
+def is_rapidfuzz_installed() -> bool:
+    try:
+        import rapidfuzz  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+def is_numpy_installed() -> bool:
+    try:
+        import numpy  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+def new_scorer(name: T.Optional[str] = None) -> BaseScorer:
+    """
+    Create a scorer by name, by default, ``fuzzywuzzy``. ``rapidfuzz`` is
+    only used when it is asked for by name.
+    """
+    if name is None or name == FuzzywuzzyScorer.name:
+        return FuzzywuzzyScorer()
+    if name == RapidfuzzScorer.name:
+        return RapidfuzzScorer()
+    raise ValueError(f"unknown scorer {name!r}")
+
+
+_default_scorer: T.Optional[BaseScorer] = None
+
+
+def get_default_scorer() -> BaseScorer:
+    global _default_scorer
+    if _default_scorer is None:
+        _default_scorer = new_scorer()
+    return _default_scorer
+
+
+def set_default_scorer(scorer: T.Union[str, BaseScorer, None]):
+    """
+    Change the default scorer, it can be a scorer object, a scorer name, or
+    None to reset to ``fuzzywuzzy``.
+    """
+    global _default_scorer
+    if isinstance(scorer, BaseScorer):
+        _default_scorer = scorer
+    else:
+        _default_scorer = new_scorer(scorer)
+
+
+def rank(
+    query: str,
+    names: T_NAMES,
+    limit: T.Optional[int] = None,
+    scorer: T.Optional[BaseScorer] = None,
+) -> T.List[T.Tuple[int, int]]:
+    """
+    Rank the names by the score, return ``(index, score)`` pairs sorted by
+    score, the names with the same score keep the original order, the same
+    as ``fuzzywuzzy.process.extractBests``.
+
+    :param limit: the max number of pairs to return, None means all.
+    """
+    if scorer is None:
+        scorer = get_default_scorer()
+    return rank_scores(scorer.score_batch(query, names), limit=limit)
+
+
+def rank_scores(
+    scores: T.Sequence[int],
+    limit: T.Optional[int] = None,
+) -> T.List[T.Tuple[int, int]]:
+    """
+    Sort the scores, return ``(index, score)`` pairs, see :func:`rank`.
+    """
+    pairs = enumerate(scores)
+    if limit is None:
+        return sorted(pairs, key=lambda x: x[1], reverse=True)
+    return heapq.nlargest(limit, pairs, key=lambda x: x[1])
@@ -1,10 +1,22 @@
 # -*- coding: utf-8 -*-
 
 import typing as T
+import array
+import threading
+import dataclasses
+from collections import OrderedDict
 
 from .vendor.better_fuzzywuzzy import FuzzyMatcher
 
+from .cache import StatSignature, CacheStats
 from .awscli import T_PROFILE_REGION_PAIR, AWSCliConfig
+from .table import ProfileTable, ProfileRow
+from .directory import (
+    AccountDirectory,
+    get_path_directory,
+    load_account_directory,
+)
+from .scorer import BaseScorer, ProcessedScorer, get_default_scorer, rank_scores
 
 
 class ProfileRegionPairFuzzyMatcher(FuzzyMatcher[T_PROFILE_REGION_PAIR]):
@@ -12,35 +24,633 @@ class ProfileRegionPairFuzzyMatcher(FuzzyMatcher[T_PROFILE_REGION_PAIR]):
         return item[0]
 
 
+# the max number of results displayed by the UI for a non-empty query, the
+# search functions return all results by default
+SEARCH_RESULT_LIMIT = 99
+# the default max number of cached query results per config file
+DEFAULT_MAX_QUERIES = 256
+
+
+def get_profile_score(
+    query: str,
+    profile: str,
+    account_directory: T.Optional[AccountDirectory] = None,
+    scorer: T.Optional[BaseScorer] = None,
+) -> int:
+    """
+    The similarity score of the profile. If the profile is in the account
+    directory, it is the best score of the profile name, the account alias
+    and the account id, so the profiles can be found by the account.
+
+    :param scorer: see :mod:`awscli_mate.scorer`, by default, use
+        :func:`~awscli_mate.scorer.get_default_scorer`.
+    """
+    if scorer is None:
+        scorer = get_default_scorer()
+    score = scorer.score(query, profile)
+    if account_directory is not None:
+        account = account_directory.get_account_by_profile(profile)
+        if account is not None:
+            for name in (account.alias, account.account_id):
+                if name and score < 100:
+                    score = max(score, scorer.score(query, name))
+    return score
+
+
+def get_profile_scores(
+    query: str,
+    profiles: T.Sequence[str],
+    account_directory: T.Optional[AccountDirectory] = None,
+    scorer: T.Optional[BaseScorer] = None,
+) -> T.List[int]:
+    """
+    The batch version of :func:`get_profile_score`, all profile names are
+    scored in one batch, and each account is scored only once.
+    """
+    if scorer is None:
+        scorer = get_default_scorer()
+    scores = scorer.score_batch(query, profiles)
+    if account_directory is None:
+        return scores
+    names: T.List[str] = list()
+    owners: T.List[str] = list()
+    for account in account_directory.accounts.values():
+        for name in (account.alias, account.account_id):
+            if name:
+                names.append(name)
+                owners.append(account.account_id)
+    account_scores: T.Dict[str, int] = dict()
+    for account_id, score in zip(owners, scorer.score_batch(query, names)):
+        account_scores[account_id] = max(account_scores.get(account_id, 0), score)
+    for i, profile in enumerate(profiles):
+        account = account_directory.get_account_by_profile(profile)
+        if account is not None:
+            scores[i] = max(scores[i], account_scores.get(account.account_id, 0))
+    return scores
+
+
 def sort_profile_region_pairs(
     pairs: T.List[T_PROFILE_REGION_PAIR],
     query: str,
+    account_directory: T.Optional[AccountDirectory] = None,
+    limit: T.Optional[int] = None,
+    scorer: T.Optional[BaseScorer] = None,
+    matcher: T.Optional[ProfileRegionPairFuzzyMatcher] = None,
 ) -> T.List[T_PROFILE_REGION_PAIR]:
     """
     Sort the profile-region pairs by the query based on similarity
 
     :param pairs: a list of (profile, region) pairs
     :param query: the query used for similarity comparison
+    :param account_directory: also match the account alias and account id
+        of the profiles, see :func:`get_profile_score`.
+    :param limit: the max number of pairs to return when query is not empty,
+        None means no limit.
+    :param scorer: see :func:`get_profile_score`.
+    :param matcher: a pre-built matcher of the pairs, by default, a new one
+        is built, see :class:`SearchCache`.
 
     :return: a list of (profile, region) pairs
     """
     if len(query):
-        matcher = ProfileRegionPairFuzzyMatcher.from_items(pairs)
-        return matcher.match(query, threshold=0, limit=99)
+        if scorer is None:
+            scorer = get_default_scorer()
+        if account_directory is not None:
+            scores = get_profile_scores(
+                query,
+                [pair[0] for pair in pairs],
+                account_directory=account_directory,
+                scorer=scorer,
+            )
+            return [pairs[i] for i, _ in rank_scores(scores, limit=limit)]
+        if matcher is None:
+            matcher = ProfileRegionPairFuzzyMatcher.from_items(pairs)
+        return matcher.match(query, threshold=0, limit=limit, scorer=scorer)
     else:
         return pairs
 
 
+def sort_profile_table(
+    table: ProfileTable,
+    query: str,
+    limit: T.Optional[int] = None,
+    account_directory: T.Optional[AccountDirectory] = None,
+    scorer: T.Optional[BaseScorer] = None,
+    indexes: T.Optional[T.Sequence[int]] = None,
+) -> T.List[ProfileRow]:
+    """
+    Sort the rows of a :class:`~awscli_mate.table.ProfileTable` by the query
+    based on similarity. The names are taken from the table column, no
+    intermediate list of pairs is built.
+
+    :param table: the profile table
+    :param query: the query used for similarity comparison
+    :param limit: see :func:`sort_profile_region_pairs`.
+    :param account_directory: see :func:`sort_profile_region_pairs`.
+    :param scorer: see :func:`get_profile_score`.
+    :param indexes: only sort these rows, by default, all rows.
+
+    :return: a list of :class:`~awscli_mate.table.ProfileRow`
+    """
+    if len(query):
+        if indexes is None:
+            indexes = range(len(table))
+            names = list(table.iter_names())
+        else:
+            names = [table[i].name for i in indexes]
+        scores = get_profile_scores(
+            query,
+            names,
+            account_directory=account_directory,
+            scorer=scorer,
+        )
+        return [table[indexes[i]] for i, _ in rank_scores(scores, limit=limit)]
+    elif indexes is None:
+        return list(table)
+    else:
+        return [table[i] for i in indexes]
+
+
+@dataclasses.dataclass
+class SearchSessionStats:
+    """
+    :param full_scans: the number of searches that score all rows.
+    :param narrowed: the number of searches that only score the rows that
+        share a character with the query.
+    :param reuses: the number of searches that reuse the result of the same
+        query, e.g. after deleting characters.
+    :param scored: the total number of scored rows.
+    :param skipped: the total number of rows that are not scored because
+        their score must be 0.
+    """
+
+    full_scans: int = 0
+    narrowed: int = 0
+    reuses: int = 0
+    scored: int = 0
+    skipped: int = 0
+
+
+@dataclasses.dataclass
+class SearchSession:
+    """
+    A stateful search over the rows of a
+    :class:`~awscli_mate.table.ProfileTable`, for the search-as-you-type UI.
+    It returns exactly the same result as :func:`sort_profile_table` (and
+    :func:`sort_profile_region_pairs`), it just scores fewer rows.
+
+    With the built-in scorers (see :class:`~awscli_mate.scorer.ProcessedScorer`),
+    a row whose processed profile name, account alias and account id don't
+    share any character with the processed query must score 0. The session
+    keeps an inverted index of the characters, only the rows that share a
+    character with the query are scored and ranked, the other rows follow
+    in the table order, the same as the stable full ranking. Short queries
+    skip most rows.
+
+    The results of the typed prefixes are kept in a stack, if the user
+    deleted characters, the stack is popped to the new query, so going back
+    to a previous query doesn't score again.
+
+    Usage example::
+
+        session = SearchSession(table=awscli_config.get_profile_table())
+        session.search("p")
+        session.search("pr")
+        session.search("p")  # pop back to the result of "p"
+
+    :param table: the profile table to search.
+    :param account_directory: see :func:`get_profile_score`.
+    :param scorer: see :func:`get_profile_score`.
+    """
+
+    table: ProfileTable
+    account_directory: T.Optional[AccountDirectory] = None
+    scorer: T.Optional[BaseScorer] = None
+    stats: SearchSessionStats = dataclasses.field(default_factory=SearchSessionStats)
+    _stack: T.List[
+        T.Tuple[str, T.Optional[int], BaseScorer, T.List[T_PROFILE_REGION_PAIR]]
+    ] = dataclasses.field(default_factory=list)
+    # the character to row indexes mapping of each processing scorer type
+    _char_indexes: T.Dict[type, T.Dict[str, array.array]] = dataclasses.field(
+        default_factory=dict
+    )
+
+    def reset(self):
+        """
+        Forget the previous queries.
+        """
+        self._stack.clear()
+
+    def _get_char_index(self, scorer: ProcessedScorer) -> T.Dict[str, array.array]:
+        char_index = self._char_indexes.get(type(scorer))
+        if char_index is not None:
+            return char_index
+        char_index = dict()
+        directory = self.account_directory
+        for i, name in enumerate(self.table.iter_names()):
+            chars = set(scorer.process_name(name))
+            if directory is not None:
+                account = directory.get_account_by_profile(name)
+                if account is not None:
+                    for key in (account.alias, account.account_id):
+                        if key:
+                            chars.update(scorer.process_name(key))
+            for char in chars:
+                indexes = char_index.get(char)
+                if indexes is None:
+                    indexes = array.array("I")
+                    char_index[char] = indexes
+                indexes.append(i)
+        self._char_indexes[type(scorer)] = char_index
+        return char_index
+
+    def _search(
+        self,
+        query: str,
+        limit: T.Optional[int],
+        scorer: BaseScorer,
+    ) -> T.List[T_PROFILE_REGION_PAIR]:
+        table = self.table
+        if not isinstance(scorer, ProcessedScorer):
+            self.stats.full_scans += 1
+            self.stats.scored += len(table)
+            rows = sort_profile_table(
+                table,
+                query,
+                limit=limit,
+                account_directory=self.account_directory,
+                scorer=scorer,
+            )
+            return [(row.name, row.region) for row in rows]
+
+        self.stats.narrowed += 1
+        char_index = self._get_char_index(scorer)
+        candidates = set()
+        for char in set(scorer.process_query(query)):
+            candidates.update(char_index.get(char, ()))
+        candidates = sorted(candidates)
+        self.stats.scored += len(candidates)
+        self.stats.skipped += len(table) - len(candidates)
+        scores = get_profile_scores(
+            query,
+            [table[i].name for i in candidates],
+            account_directory=self.account_directory,
+            scorer=scorer,
+        )
+        # the rows with score 0 keep the table order, the same as the
+        # stable full ranking
+        indexes = [
+            candidates[j] for j, score in rank_scores(scores, limit=limit) if score
+        ]
+        if limit is None or len(indexes) < limit:
+            matched = set(indexes)
+            for i in range(len(table)):
+                if limit is not None and len(indexes) >= limit:
+                    break
+                if i not in matched:
+                    indexes.append(i)
+        return [(table[i].name, table[i].region) for i in indexes]
+
+    def search(
+        self,
+        query: str,
+        limit: T.Optional[int] = None,
+        scorer: T.Optional[BaseScorer] = None,
+    ) -> T.List[T_PROFILE_REGION_PAIR]:
+        """
+        Search the rows by the query, see the class doc.
+
+        :param limit: see :func:`sort_profile_region_pairs`.
+        :param scorer: by default, the scorer of the session.
+
+        :return: a list of (profile, region) pairs
+        """
+        if not len(query):
+            self.reset()
+            return list(self.table.iter_profile_and_region_pairs())
+        if scorer is None:
+            scorer = self.scorer
+        if scorer is None:
+            scorer = get_default_scorer()
+
+        stack = self._stack
+        while len(stack) and not query.startswith(stack[-1][0]):
+            stack.pop()
+        if len(stack):
+            last_query, last_limit, last_scorer, result = stack[-1]
+            if (
+                last_query == query
+                and last_scorer is scorer
+                and (last_limit is None or (limit is not None and limit <= last_limit))
+            ):
+                self.stats.reuses += 1
+                return result[:limit]
+            if last_query == query:
+                stack.pop()
+        result = self._search(query, limit, scorer)
+        stack.append((query, limit, scorer, result))
+        return list(result)
+
+
+def _get_signature(path) -> T.Optional[StatSignature]:
+    try:
+        return StatSignature.from_path(path)
+    except FileNotFoundError:
+        return None
+
+
+T_SEARCH_VERSION = T.Tuple[T.Optional[StatSignature], T.Optional[StatSignature]]
+T_QUERY_KEY = T.Tuple[str, str, T.Optional[int], T.Hashable]
+
+
+@dataclasses.dataclass
+class SearchCacheEntry:
+    """
+    The cached search state of a config file.
+
+    :param version: the stat signature of the config file and the account
+        directory file when the entry is built, None if the entry is built
+        on a given table, see :meth:`SearchCache.search`.
+    :param pairs: the profile-region pairs of the config file, it is read
+        on the first :meth:`SearchCache.get`.
+    :param matcher: the matcher of the pairs, it is built with the pairs.
+    :param session: the :class:`SearchSession` of the config file, it is
+        built on the first :meth:`SearchCache.search`.
+    :param results: the query results LRU, the key is
+        ``(method, query, limit, scorer.cache_key)``.
+    """
+
+    version: T.Optional[T_SEARCH_VERSION]
+    pairs: T.Optional[T.List[T_PROFILE_REGION_PAIR]] = None
+    matcher: T.Optional[ProfileRegionPairFuzzyMatcher] = None
+    session: T.Optional[SearchSession] = None
+    results: T.Dict[
+        T_QUERY_KEY, T.List[T_PROFILE_REGION_PAIR]
+    ] = dataclasses.field(default_factory=OrderedDict)
+
+
+@dataclasses.dataclass
+class SearchCache:
+    """
+    Cache the matcher, the search session and the recent query results per
+    config file, so retyping or backspacing a query is served from memory.
+    The interactive UI searches through :meth:`SearchCache.search`.
+
+    The entry of a config file is dropped when the stat signature of the
+    config file or the account directory file changed. The entry of a given
+    table (e.g. the table of :class:`~awscli_mate.watch.LiveProfileModel`) is
+    dropped when another table is given, no file is touched.
+
+    :param max_queries: the max number of cached query results per config
+        file, the least recently used result is evicted first.
+    :param stats: the hit / miss counters of the query results.
+    :param matcher_stats: the hit / miss counters of the entries that are
+        checked by the stat signature.
+    """
+
+    max_queries: int = DEFAULT_MAX_QUERIES
+    _entries: T.Dict[str, SearchCacheEntry] = dataclasses.field(default_factory=dict)
+    _table_entries: T.Dict[str, SearchCacheEntry] = dataclasses.field(
+        default_factory=dict
+    )
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    stats: CacheStats = dataclasses.field(default_factory=CacheStats)
+    matcher_stats: CacheStats = dataclasses.field(default_factory=CacheStats)
+
+    def get_entry(self, awscli_config: AWSCliConfig) -> SearchCacheEntry:
+        """
+        Get the entry of the config file, create an empty one if it is stale.
+        """
+        key = str(awscli_config.path_config)
+        version = (
+            _get_signature(awscli_config.path_config),
+            _get_signature(get_path_directory(awscli_config)),
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self.matcher_stats.hits += 1
+                return entry
+            self.matcher_stats.misses += 1
+            entry = SearchCacheEntry(version=version)
+            self._entries[key] = entry
+            return entry
+
+    def _get_table_entry(
+        self,
+        awscli_config: AWSCliConfig,
+        table: ProfileTable,
+        account_directory: T.Optional[AccountDirectory],
+    ) -> SearchCacheEntry:
+        key = str(awscli_config.path_config)
+        with self._lock:
+            entry = self._table_entries.get(key)
+            if (
+                entry is not None
+                and entry.session.table is table
+                and entry.session.account_directory is account_directory
+            ):
+                return entry
+            entry = SearchCacheEntry(
+                version=None,
+                session=SearchSession(
+                    table=table,
+                    account_directory=account_directory,
+                ),
+            )
+            self._table_entries[key] = entry
+            return entry
+
+    def get(
+        self,
+        query: str,
+        awscli_config: AWSCliConfig,
+        limit: T.Optional[int] = None,
+        scorer: T.Optional[BaseScorer] = None,
+    ) -> T.List[T_PROFILE_REGION_PAIR]:
+        """
+        See :func:`get_sorted_profile_region_pairs`.
+        """
+        entry = self.get_entry(awscli_config)
+        if scorer is None:
+            scorer = get_default_scorer()
+
+        def func():
+            if entry.matcher is None:
+                pairs = awscli_config.extract_profile_and_region_pairs()
+                entry.matcher = ProfileRegionPairFuzzyMatcher.from_items(pairs)
+                entry.pairs = pairs
+            return sort_profile_region_pairs(
+                entry.pairs,
+                query=query,
+                account_directory=load_account_directory(awscli_config),
+                limit=limit,
+                scorer=scorer,
+                matcher=entry.matcher,
+            )
+
+        return self._get_result(entry, ("get", query, limit, scorer.cache_key), func)
+
+    def search(
+        self,
+        query: str,
+        awscli_config: AWSCliConfig,
+        limit: T.Optional[int] = None,
+        scorer: T.Optional[BaseScorer] = None,
+        table: T.Optional[ProfileTable] = None,
+        account_directory: T.Optional[AccountDirectory] = None,
+    ) -> T.List[T_PROFILE_REGION_PAIR]:
+        """
+        The search-as-you-type version of :meth:`SearchCache.get`, the
+        results come from the :class:`SearchSession` of the config file.
+
+        :param table: the up-to-date profile table of the config file, for
+            example, the table of :class:`~awscli_mate.watch.LiveProfileModel`.
+            If it is given, the cache doesn't stat or read any file, the
+            cached results are dropped when another table is given. By
+            default, the table is read from the config file.
+        :param account_directory: the account directory of the given table,
+            for example, :attr:`~awscli_mate.watch.LiveProfileModel.account_directory`.
+            It is only used with the ``table``.
+        """
+        if scorer is None:
+            scorer = get_default_scorer()
+        if table is None:
+            entry = self.get_entry(awscli_config)
+            if entry.session is None:
+                entry.session = SearchSession(
+                    table=awscli_config.get_profile_table(),
+                    account_directory=load_account_directory(awscli_config),
+                )
+        else:
+            entry = self._get_table_entry(awscli_config, table, account_directory)
+        session = entry.session
+        return self._get_result(
+            entry,
+            ("search", query, limit, scorer.cache_key),
+            lambda: session.search(query, limit=limit, scorer=scorer),
+        )
+
+    def _get_result(
+        self,
+        entry: SearchCacheEntry,
+        query_key: T_QUERY_KEY,
+        func: T.Callable[[], T.List[T_PROFILE_REGION_PAIR]],
+    ) -> T.List[T_PROFILE_REGION_PAIR]:
+        with self._lock:
+            result = entry.results.get(query_key)
+            if result is not None:
+                entry.results.move_to_end(query_key)
+                self.stats.hits += 1
+                return list(result)
+            self.stats.misses += 1
+        result = func()
+        with self._lock:
+            entry.results[query_key] = result
+            while len(entry.results) > self.max_queries:
+                entry.results.popitem(last=False)
+        return list(result)
+
+    @property
+    def size(self) -> int:
+        """
+        The total number of cached query results.
+        """
+        with self._lock:
+            entries = list(self._entries.values()) + list(self._table_entries.values())
+            return sum(len(entry.results) for entry in entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._table_entries.clear()
+            self.stats = CacheStats()
+            self.matcher_stats = CacheStats()
+
+
+search_cache = SearchCache()
+
+
 def get_sorted_profile_region_pairs(
     query: str,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    limit: T.Optional[int] = None,
+    scorer: T.Optional[BaseScorer] = None,
 ) -> T.List[T_PROFILE_REGION_PAIR]:
     """
     Get profile-region pairs from ``~/.aws/config``, sorted by the query
     based on similarity
 
     :param query: the query used for similarity comparison
+    :param awscli_config: the :class:`~awscli_mate.awscli.AWSCliConfig` to
+        read profiles from, by default, it uses ``~/.aws/config`` with
+        the persistent catalog enabled.
+    :param limit: see :func:`sort_profile_region_pairs`.
+    :param scorer: see :func:`get_profile_score`.
+
+    If the account directory is built, the account alias and account id are
+    also matched, see :mod:`awscli_mate.directory`.
+
+    The matcher and the recent results are cached until the config file or
+    the account directory file changed, see :data:`search_cache`.
 
     :return: a list of (profile, region) pairs
     """
-    pairs = AWSCliConfig().extract_profile_and_region_pairs()
-    return sort_profile_region_pairs(pairs, query=query)
+    if awscli_config is None:
+        awscli_config = AWSCliConfig(use_catalog=True)
+    return search_cache.get(
+        query,
+        awscli_config=awscli_config,
+        limit=limit,
+        scorer=scorer,
+    )
+
+
+def iter_sorted_profile_region_pairs(
+    query: str,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    limit: T.Optional[int] = None,
+    scorer: T.Optional[BaseScorer] = None,
+) -> T.Iterator[T_PROFILE_REGION_PAIR]:
+    """
+    The streaming version of :func:`get_sorted_profile_region_pairs`, it
+    yields the same pairs in the same order, but the first pairs are yielded
+    before the config file is read to the end.
+
+    - if the query is empty, pairs are yielded in file order as soon as
+      each section is parsed.
+    - otherwise, the perfect matches (score 100) are always ranked first
+      in file order, so they are yielded as soon as they are scored. The rest
+      are yielded after all profiles are scored.
+
+    :param query: the query used for similarity comparison
+    :param awscli_config: see :func:`get_sorted_profile_region_pairs`.
+    :param limit: see :func:`sort_profile_region_pairs`.
+    :param scorer: see :func:`get_profile_score`.
+    """
+    if awscli_config is None:
+        awscli_config = AWSCliConfig(use_catalog=True)
+    pairs = awscli_config.iter_profiles()
+    if not len(query):
+        yield from pairs
+        return
+    if scorer is None:
+        scorer = get_default_scorer()
+    account_directory = load_account_directory(awscli_config)
+
+    n_yielded = 0
+    rest: T.List[T.Tuple[int, T_PROFILE_REGION_PAIR]] = list()
+    for pair in pairs:
+        score = get_profile_score(query, pair[0], account_directory, scorer)
+        if score == 100:
+            yield pair
+            n_yielded += 1
+            if limit is not None and n_yielded >= limit:
+                return
+        else:
+            rest.append((score, pair))
+    rest.sort(key=lambda x: x[0], reverse=True)
+    if limit is not None:
+        rest = rest[: limit - n_yielded]
+    for _, pair in rest:
+        yield pair
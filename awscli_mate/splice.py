@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""
+Write back only the changed sections of a config file.
+
+:meth:`configparser.ConfigParser.write` re-serializes the whole file, even
+if only one section is changed. This module builds a section offset index
+of the raw file content, then replaces only the byte span of the changed
+sections, everything else is copied byte for byte, including the whitespace
+and comments.
+
+The span of a section starts from the section header line, and ends at the
+end of the last key value line of the section. The comments and empty lines
+after the last key value line are not part of the span, so they are always
+preserved. The comments inside the span are carried over to the new
+section, see :func:`map_comments`.
+"""
+
+import typing as T
+import dataclasses
+from pathlib import Path
+
+from pathlib_mate import Path as PathlibMatePath
+
+from .scanner import _split_key_value
+
+
+@dataclasses.dataclass(frozen=True)
+class SectionSpan:
+    """
+    The byte span ``data[start:end]`` of a section in the raw file content.
+    """
+
+    name: str
+    start: int
+    end: int
+
+
+T_SECTION_INDEX = T.Dict[str, SectionSpan]
+T_SECTION_DATA = T.Optional[T.Mapping[str, str]]
+# the key is the key line above the comment lines, None is the section header
+T_COMMENT_MAP = T.Dict[T.Optional[str], T.List[str]]
+
+
+def build_section_index(data: bytes) -> T_SECTION_INDEX:
+    """
+    Scan the raw file content, build the section name to byte span mapping.
+    If a section appears multiple times, only the first one is indexed.
+    """
+    index: T_SECTION_INDEX = {}
+    name: T.Optional[str] = None
+    start = end = 0
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        line_start = offset
+        offset += len(line)
+        stripped = line.strip()
+        if not stripped:
+            continue
+        first_char = stripped[:1]
+        if first_char == b"#" or first_char == b";":
+            continue
+        if first_char == b"[" and b"]" in stripped:
+            if name is not None and name not in index:
+                index[name] = SectionSpan(name=name, start=start, end=end)
+            name = stripped[1 : stripped.rindex(b"]")].decode("utf-8")
+            start = line_start
+        end = offset
+    if name is not None and name not in index:
+        index[name] = SectionSpan(name=name, start=start, end=end)
+    return index
+
+
+def map_comments(content: bytes, keys: T.Container[str]) -> T_COMMENT_MAP:
+    """
+    Map the comment lines in the byte span of a section to the key line
+    above them. Same as :class:`~commentedconfigparser.CommentedConfigParser`,
+    the comments under a key that is not in ``keys`` are merged up to the
+    previous key in ``keys``, or the section header.
+    """
+    comments: T_COMMENT_MAP = {None: []}
+    anchor: T.Optional[str] = None
+    # the first line is the section header
+    for line in content.decode("utf-8").splitlines(keepends=True)[1:]:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped[0] == "#" or stripped[0] == ";":
+            if not line.endswith("\n"):
+                line = f"{line}\n"
+            comments[anchor].append(line)
+            continue
+        # continuation line of the previous value
+        if line[0].isspace():
+            continue
+        kv = _split_key_value(stripped)
+        if kv is not None and kv[0] in keys:
+            anchor = kv[0]
+            comments.setdefault(anchor, [])
+    return comments
+
+
+def render_section(
+    name: str,
+    data: T.Mapping[str, str],
+    comments: T.Optional[T_COMMENT_MAP] = None,
+) -> bytes:
+    """
+    Render a section the same way as :meth:`configparser.ConfigParser.write`.
+
+    :param comments: the comment lines to put under the section header and
+        the key lines, see :func:`map_comments`.
+    """
+    if comments is None:
+        comments = {}
+    lines = [f"[{name}]\n"]
+    lines.extend(comments.get(None, []))
+    for key, value in data.items():
+        value = str(value).replace("\n", "\n\t")
+        lines.append(f"{key} = {value}\n")
+        lines.extend(comments.get(key, []))
+    return "".join(lines).encode("utf-8")
+
+
+def splice_sections(
+    data: bytes,
+    index: T_SECTION_INDEX,
+    changes: T.Mapping[str, T_SECTION_DATA],
+) -> bytes:
+    """
+    Apply section changes to the raw file content.
+
+    :param data: the raw file content.
+    :param index: the section offset index of ``data``.
+    :param changes: the key is the section name, the value is the new
+        section data. ``None`` means remove the section. Sections not in the
+        index are appended to the end of the file. The comments in a
+        replaced section are kept, see :func:`map_comments`.
+
+    :return: the new file content.
+    """
+    replacements: T.List[T.Tuple[int, int, bytes]] = []
+    appends: T.List[bytes] = []
+    for name, section_data in changes.items():
+        span = index.get(name)
+        if section_data is None:
+            if span is not None:
+                replacements.append((span.start, span.end, b""))
+        elif span is None:
+            appends.append(render_section(name, section_data))
+        else:
+            comments = map_comments(data[span.start : span.end], section_data)
+            content = render_section(name, section_data, comments)
+            replacements.append((span.start, span.end, content))
+
+    chunks: T.List[bytes] = []
+    cursor = 0
+    for start, end, content in sorted(replacements, key=lambda x: x[0]):
+        chunks.append(data[cursor:start])
+        chunks.append(content)
+        cursor = end
+    chunks.append(data[cursor:])
+    new_data = b"".join(chunks)
+
+    if appends:
+        chunks = [new_data]
+        if new_data and not new_data.endswith(b"\n"):
+            chunks.append(b"\n")
+        need_separator = bool(new_data.strip())
+        for content in appends:
+            if need_separator:
+                chunks.append(b"\n")
+            chunks.append(content)
+            need_separator = True
+        new_data = b"".join(chunks)
+    return new_data
+
+
+def write_sections(
+    path: Path,
+    data: bytes,
+    index: T_SECTION_INDEX,
+    changes: T.Mapping[str, T_SECTION_DATA],
+) -> bytes:
+    """
+    Apply section changes to the raw file content and write the result to
+    ``path`` in one atomic replace.
+
+    :return: the new file content.
+    """
+    new_data = splice_sections(data, index, changes)
+    with PathlibMatePath(path).atomic_open("wb", overwrite=True) as f:
+        f.write(new_data)
+    return new_data
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compact, columnar profile table for very large config files.
+
+A list of ``(profile, region)`` tuples, or a ``ConfigParser`` with one dict per
+section, costs hundreds of bytes per profile. :class:`ProfileTable` stores
+every distinct string once in an interned string pool, and each column
+(one per :class:`~awscli_mate.constants.ConfigKeyEnum` key) is an
+``array("I")`` of pool indexes, which costs 4 bytes per cell.
+
+Usage example::
+
+    table = AWSCliConfig().get_profile_table()
+    # zero allocation iteration, the cursor is re-used for every row
+    for row in table.cursor():
+        print(row.name, row.region)
+"""
+
+import typing as T
+import sys
+import array
+import dataclasses
+
+from .constants import ConfigKeyEnum
+
+# the pool index 0 is reserved for None
+_NONE = 0
+_TYPECODE = "I"
+
+COLUMNS = tuple(key.value for key in ConfigKeyEnum)
+
+
+class ProfileRow:
+    """
+    A light-weight view of a row in :class:`ProfileTable`.
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "ProfileTable", index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def name(self) -> str:
+        table = self._table
+        return table._pool[table._names[self._index]]
+
+    @property
+    def region(self) -> str:
+        """
+        The region of the profile, ``"unknown-region"`` if not set.
+        """
+        table = self._table
+        value = table._pool[table._columns[ConfigKeyEnum.region.value][self._index]]
+        if value is None:
+            return "unknown-region"
+        return value
+
+    def get(self, key: str) -> T.Optional[str]:
+        """
+        Get the value of a :class:`~awscli_mate.constants.ConfigKeyEnum` key.
+        """
+        table = self._table
+        return table._pool[table._columns[key][self._index]]
+
+    def to_dict(self) -> T.Dict[str, T.Optional[str]]:
+        return {key: self.get(key) for key in COLUMNS}
+
+    def __repr__(self) -> str:
+        return f"ProfileRow(name={self.name!r}, region={self.region!r})"
+
+
+@dataclasses.dataclass
+class ProfileTable:
+    """
+    Columnar profile table. Don't use the constructor, use
+    :meth:`ProfileTable.from_sections` instead.
+
+    :param _pool: the interned string pool, ``_pool[0]`` is None.
+    :param _pool_index: the string to pool index mapping.
+    :param _names: the profile name column.
+    :param _columns: one column per :class:`~awscli_mate.constants.ConfigKeyEnum` key.
+    :param _row_index: the profile name to row index mapping.
+    """
+
+    _pool: T.List[T.Optional[str]] = dataclasses.field(default_factory=lambda: [None])
+    _pool_index: T.Dict[str, int] = dataclasses.field(default_factory=dict)
+    _names: array.array = dataclasses.field(
+        default_factory=lambda: array.array(_TYPECODE)
+    )
+    _columns: T.Dict[str, array.array] = dataclasses.field(
+        default_factory=lambda: {key: array.array(_TYPECODE) for key in COLUMNS}
+    )
+    _row_index: T.Dict[str, int] = dataclasses.field(default_factory=dict)
+
+    def _intern(self, value: T.Optional[str]) -> int:
+        if value is None:
+            return _NONE
+        try:
+            return self._pool_index[value]
+        except KeyError:
+            index = len(self._pool)
+            value = sys.intern(value)
+            self._pool.append(value)
+            self._pool_index[value] = index
+            return index
+
+    def append(self, name: str, data: T.Mapping[str, str]):
+        """
+        Append a profile, keys not in :class:`~awscli_mate.constants.ConfigKeyEnum`
+        are ignored. Duplicate profile is ignored.
+        """
+        if name in self._row_index:
+            return
+        self._row_index[name] = len(self._names)
+        self._names.append(self._intern(name))
+        for key, column in self._columns.items():
+            column.append(self._intern(data.get(key)))
+
+    @classmethod
+    def from_sections(
+        cls,
+        sections: T.Iterable[T.Tuple[str, T.Mapping[str, str]]],
+        resolve_region: T.Optional[T.Callable[[str], T.Optional[str]]] = None,
+    ) -> "ProfileTable":
+        """
+        Build the table from the ``(section_name, data)`` of the config file,
+        only the named profiles are included, except the default profile.
+
+        :param sections: for example, the output of
+            :func:`awscli_mate.scanner.iter_file_sections`.
+        :param resolve_region: optional function to resolve the region of
+            a profile that doesn't have the ``region`` key, for example,
+            :meth:`awscli_mate.graph.ProfileGraph.effective_region`.
+        """
+        table = cls()
+        region_key = ConfigKeyEnum.region.value
+        for section_name, data in sections:
+            if not section_name.startswith("profile "):
+                continue
+            name = section_name[8:]
+            if resolve_region is not None and region_key not in data:
+                region = resolve_region(name)
+                if region is not None:
+                    data = dict(data)
+                    data[region_key] = region
+            table.append(name, data)
+        return table
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, index: int) -> ProfileRow:
+        if not (0 <= index < len(self._names)):
+            raise IndexError(index)
+        return ProfileRow(self, index)
+
+    def __iter__(self) -> T.Iterator[ProfileRow]:
+        for index in range(len(self._names)):
+            yield ProfileRow(self, index)
+
+    def cursor(self) -> T.Iterator[ProfileRow]:
+        """
+        Iterate all rows without allocating a row view per row, the same
+        :class:`ProfileRow` object is moved to the next row on each step,
+        so don't keep the reference after the step.
+        """
+        row = ProfileRow(self, 0)
+        for index in range(len(self._names)):
+            row._index = index
+            yield row
+
+    def get_row(self, name: str) -> T.Optional[ProfileRow]:
+        """
+        Get the row of the given profile, return None if not exists.
+        """
+        index = self._row_index.get(name)
+        if index is None:
+            return None
+        return ProfileRow(self, index)
+
+    def iter_names(self) -> T.Iterable[str]:
+        pool = self._pool
+        for index in self._names:
+            yield pool[index]
+
+    def iter_column(self, key: str) -> T.Iterable[T.Optional[str]]:
+        pool = self._pool
+        for index in self._columns[key]:
+            yield pool[index]
+
+    def iter_profile_and_region_pairs(self) -> T.Iterable[T.Tuple[str, str]]:
+        for row in self.cursor():
+            yield row.name, row.region
+
+    def nbytes(self) -> int:
+        """
+        The estimated memory usage of the table in bytes.
+        """
+        total = sys.getsizeof(self._pool) + sys.getsizeof(self._pool_index)
+        total += sys.getsizeof(self._row_index)
+        total += sum(sys.getsizeof(value) for value in self._pool if value is not None)
+        total += self._names.buffer_info()[1] * self._names.itemsize
+        for column in self._columns.values():
+            total += column.buffer_info()[1] * column.itemsize
+        return total
+
+    def nbytes_per_profile(self) -> float:
+        if len(self) == 0:
+            return 0.0
+        return self.nbytes() / len(self)
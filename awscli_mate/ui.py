@@ -6,14 +6,66 @@ import dataclasses
 
 import fire
 import zelfred.api as zf
+from zelfred.constants import SHOW_ITEMS_LIMIT
 from .vendor.os_platform import IS_WINDOWS
 
-from .awscli import AWSCliConfig
-from .search import get_sorted_profile_region_pairs
+from .awscli import T_PROFILE_REGION_PAIR, AWSCliConfig
+from .search import (
+    SEARCH_RESULT_LIMIT,
+    search_cache,
+    iter_sorted_profile_region_pairs,
+)
 from .url import get_sign_in_url, get_switch_role_url
+from .pool import get_session
+from .identity import get_identity
+from .directory import get_profile_account
+from .watch import LiveProfileModel
+from . import exc
 
 
 class UI(zf.UI):
+    # the in-memory profile model kept up-to-date by a file watcher,
+    # if it is set, handlers don't read the AWS files on every keystroke
+    profile_model: T.Optional[LiveProfileModel] = None
+    # render the first screen of a long item list as soon as it is built,
+    # before the rest of the items, it is only enabled by ``run_ui`` because
+    # it paints the terminal
+    render_incrementally: bool = False
+
+    def iter_sorted_profile_region_pairs(
+        self,
+        query: str,
+        limit: T.Optional[int] = None,
+    ) -> T.Iterator[T_PROFILE_REGION_PAIR]:
+        """
+        Without the profile model, the profiles are streamed from the config
+        file, the first items can be rendered before all profiles are loaded.
+        Otherwise, search the table of the profile model incrementally, the
+        recent results are cached, see :meth:`~awscli_mate.search.SearchCache.search`.
+        """
+        if self.profile_model is None:
+            yield from iter_sorted_profile_region_pairs(query, limit=limit)
+            return
+        yield from search_cache.search(
+            query,
+            awscli_config=self.profile_model.awscli_config,
+            limit=limit,
+            table=self.profile_model.table,
+            account_directory=self.profile_model.account_directory,
+        )
+
+    def has_profile(self, profile: str) -> bool:
+        """
+        Check if the named profile exists, it stops reading the config file
+        as soon as the profile is found.
+        """
+        if self.profile_model is None:
+            return any(
+                name == profile
+                for name, _ in AWSCliConfig(use_catalog=True).iter_profiles()
+            )
+        return self.profile_model.table.get_row(profile) is not None
+
     def format_highlight(self, s: str) -> str:
         return f"{self.terminal.cyan}{s}{self.terminal.normal}"
 
@@ -32,27 +84,29 @@ class UI(zf.UI):
 def display_profile_info(profile: str):
     print(f"try to get detailed info about the profile: {profile!r} ...")
     try:
-        import boto3
         import botocore.exceptions
 
-        boto_ses = boto3.session.Session(profile_name=profile)
-
-        try:
-            res = boto_ses.client("sts").get_caller_identity()
-            aws_account_id = res["Account"]
-            print(f"AWS Account ID = {aws_account_id}")
-        except botocore.exceptions.ClientError:
-            pass
-
+        # the account id and alias are read from the account directory,
+        # or the identity cache on disk
         try:
-            res = boto_ses.client("iam").list_account_aliases()
-            aliases = res.get("AccountAliases", [])
-            if aliases:
-                print(f"AWS Account Alias = {aliases[0]}")
-        except botocore.exceptions.ClientError:
-            pass
+            account = get_profile_account(profile)
+            if account is None:
+                account = get_identity(profile)
+            print(f"AWS Account ID = {account.account_id}")
+            if account.alias:
+                print(f"AWS Account Alias = {account.alias}")
+        # an API error, a slow network, or a bad profile (e.g. no
+        # credentials) must not crash the UI
+        except (
+            botocore.exceptions.ClientError,
+            botocore.exceptions.BotoCoreError,
+            exc.IdentityLookupTimeoutError,
+        ) as e:
+            print(f"AWS Account ID = unknown ({e})")
 
         try:
+            # the session is pooled, the assumed role credentials are cached on disk
+            boto_ses = get_session(profile)
             print(f"AWS Region = {boto_ses.region_name}")
         except:
             pass
@@ -69,11 +123,21 @@ class ProfileItem(zf.Item):
 
     @classmethod
     def from_query(cls, ui: UI, query: str):
-        sorted_pairs = get_sorted_profile_region_pairs(query)
-        return [
-            cls.from_profile_region(ui, profile, region)
-            for profile, region in sorted_pairs
-        ]
+        # zelfred keeps every item of the result, not only the visible ones,
+        # so only the best matches are rendered for a non-empty query,
+        # building an item per profile on every keystroke is the input lag
+        # of the large configs. An empty query lists all profiles.
+        limit = SEARCH_RESULT_LIMIT if len(query) else None
+        sorted_pairs = ui.iter_sorted_profile_region_pairs(query, limit=limit)
+        items = list()
+        for profile, region in sorted_pairs:
+            items.append(cls.from_profile_region(ui, profile, region))
+            # zelfred only renders the items returned by the handler, so the
+            # first screen is painted explicitly, then the rest are built
+            if ui.render_incrementally and len(items) == SHOW_ITEMS_LIMIT + 1:
+                ui.run_handler(items=items[:SHOW_ITEMS_LIMIT])
+                ui.repaint()
+        return items
 
 
 @dataclasses.dataclass
@@ -156,7 +220,8 @@ class SignInProfileItem(ProfileItem):
 @dataclasses.dataclass
 class SwitchRoleProfileItem(ProfileItem):
     def enter_handler(self, ui: UI):
-        url = get_switch_role_url(profile=self.arg)
+        # build the url from the role_arn without network call if possible
+        url = get_switch_role_url(profile=self.arg, offline=True)
         zf.open_url(url)
         print(f"open {url} in default browser.")
 
@@ -209,14 +274,10 @@ def show_top_menu(query: str, ui: UI):
 
 def set_profile_as_default_handler(query: str, ui: UI):
     q = zf.Query.from_str(query)
-    sorted_pairs = get_sorted_profile_region_pairs(query=" ".join(q.trimmed_parts))
     # example:
     # - ""
     # - "    "
-    return [
-        SetProfileItem.from_profile_region(ui, profile, region)
-        for profile, region in sorted_pairs
-    ]
+    return SetProfileItem.from_query(ui=ui, query=" ".join(q.trimmed_parts))
 
 
 def _ask_for_mfa_token(
@@ -225,10 +286,19 @@ def _ask_for_mfa_token(
     """
     :param profile: the selected profile name.
     """
+    subtitle = "Hit 'Enter' to read the official doc"
+    awscli_config = AWSCliConfig()
+    new_profile = f"{profile}_mfa"
+    if awscli_config.is_session_valid(new_profile):
+        expiration = awscli_config.get_session_expiration(new_profile)
+        subtitle = (
+            f"{new_profile!r} is valid until {expiration.astimezone():%Y-%m-%d %H:%M}, "
+            "no new token is needed"
+        )
     return [
         MfaHintItem(
             title=f"🔐 MFA with {profile!r}, enter your six digit MFA token ...",
-            subtitle="Hit 'Enter' to read the official doc",
+            subtitle=subtitle,
             uid="uid",
         )
     ]
@@ -299,18 +369,14 @@ def mfa_auth_handler(
     # - "profile_name"
     # - "profile_substr"
     elif len(q.trimmed_parts) == 1:
-        items = MfaAuthItem.from_query(ui=ui, query="")
-        profiles = [item.arg for item in items]
-        if q.trimmed_parts[0] in profiles:
+        if ui.has_profile(q.trimmed_parts[0]):
             return _ask_for_mfa_token(profile=q.trimmed_parts[0])
         else:
             return MfaAuthItem.from_query(ui=ui, query=" ".join(q.trimmed_parts))
     elif len(q.trimmed_parts) == 2:
         profile, token = q.trimmed_parts
-        items = MfaAuthItem.from_query(ui=ui, query="")
-        profiles = [item.arg for item in items]
         # see below
-        if profile in profiles:
+        if ui.has_profile(profile):
             # see below
             if token.isdigit():
                 # - "profile 123"
@@ -334,10 +400,8 @@ def mfa_auth_handler(
     # - "profile sub str"
     # - "profile sub str 123456"
     elif len(q.trimmed_parts) >= 3:
-        items = MfaAuthItem.from_query(ui=ui, query="")
-        profiles = [item.arg for item in items]
         profile = q.trimmed_parts[0]
-        if profile in profiles:
+        if ui.has_profile(profile):
             return _entered_invalid_token(profile, token=" ".join(q.trimmed_parts[1:]))
         else:
             return MfaAuthItem.from_query(ui=ui, query=" ".join(q.trimmed_parts))
@@ -390,7 +454,10 @@ def run_ui():
     zf.debugger.reset()
     zf.debugger.enable()
     ui = UI(handler=handler, capture_error=False)
-    ui.run()
+    with LiveProfileModel(awscli_config=AWSCliConfig(use_catalog=True)) as model:
+        ui.profile_model = model
+        ui.render_incrementally = True
+        ui.run()
 
 
 def main():
@@ -2,14 +2,34 @@
 
 import typing as T
 
+from .constants import ConfigKeyEnum
+from .scanner import strip_comment
+from .awscli import AWSCliConfig, _get_section_data
+from .retry import is_throttling_error
+from .directory import get_profile_account
+from .identity import (
+    DEFAULT_TTL,
+    DEFAULT_TIMEOUT,
+    IdentityCache,
+    get_identity,
+    get_sign_in_account,
+)
+
 
 def get_account_alias(iam_client) -> T.Optional[str]:
+    """
+    Get the account alias, return None if the account doesn't have one or
+    the principal cannot list it. The throttling error is raised, so the
+    caller can retry, instead of caching a wrong "no alias".
+    """
     import botocore.exceptions
 
     try:
         response = iam_client.list_account_aliases()
         return response["AccountAliases"][0]
-    except botocore.exceptions.ClientError:
+    except botocore.exceptions.ClientError as e:
+        if is_throttling_error(e):
+            raise
         return None
     except IndexError:
         return None
@@ -17,26 +37,96 @@ def get_account_alias(iam_client) -> T.Optional[str]:
         raise
 
 
-def get_sign_in_url(profile: str):
+def get_role_arn(
+    profile: str,
+    awscli_config: AWSCliConfig,
+) -> T.Optional[str]:
+    """
+    Get the ``role_arn`` of the profile from the config file, return None if
+    the profile doesn't have one.
+    """
+    config, _ = awscli_config.read_config(readonly=True)
+    section_name = profile if profile == "default" else f"profile {profile}"
+    data = _get_section_data(config, section_name) or {}
+    role_arn = data.get(ConfigKeyEnum.role_arn.value)
+    if role_arn:
+        return strip_comment(role_arn).strip()
+    return None
+
+
+def parse_role_arn(role_arn: str) -> T.Tuple[str, str]:
+    """
+    Parse the account id and the role name (including the path) from the
+    role arn, for example,
+    ``arn:aws:iam::111122223333:role/team/admin-role`` returns
+    ``("111122223333", "team/admin-role")``.
+    """
+    try:
+        _, _, service, _, account_id, resource = role_arn.split(":", 5)
+    except ValueError:
+        raise ValueError(f"invalid role arn: {role_arn!r}")
+    if service != "iam" or not resource.startswith("role/"):
+        raise ValueError(f"invalid role arn: {role_arn!r}")
+    return account_id, resource[len("role/") :]
+
+
+def _build_switch_role_url(
+    role_name: str,
+    account_id: str,
+    display_name: str,
+    color: T.Optional[str] = None,
+) -> str:
+    url = f"https://signin.aws.amazon.com/switchrole?roleName={role_name}&account={account_id}&displayName={display_name}"
+    if color:
+        url = f"{url}&color={color.lstrip('#')}"
+    return url
+
+
+def get_sign_in_url(
+    profile: str,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    ttl: float = DEFAULT_TTL,
+    timeout: T.Optional[float] = DEFAULT_TIMEOUT,
+    race: bool = False,
+):
     """
     Get the url for signing in AWS console.
 
     See AWS official doc about sign in url at
     https://docs.aws.amazon.com/signin/latest/userguide/console-sign-in-tutorials.html
+
+    The account id and alias are cached on disk for ``ttl`` seconds, see
+    :mod:`awscli_mate.identity`. On cache miss, the STS and IAM calls run
+    concurrently and share the ``timeout``. If ``race`` is True, the url
+    uses whichever of the alias and the account id is available first.
+
+    If the profile is in the account directory, no network call is made,
+    see :mod:`awscli_mate.directory`.
     """
-    import boto3
-
-    boto_ses = boto3.session.Session(profile_name=profile)
-    iam = boto_ses.client("iam")
-    account = get_account_alias(iam)
-    if account is None:
-        sts = boto_ses.client("sts")
-        response = sts.get_caller_identity()
-        account = response["Account"]
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    directory_account = get_profile_account(profile, awscli_config)
+    if directory_account is not None:
+        account = directory_account.alias or directory_account.account_id
+    else:
+        account = get_sign_in_account(
+            profile,
+            awscli_config=awscli_config,
+            ttl=ttl,
+            timeout=timeout,
+            race=race,
+        )
     return f"https://{account}.signin.aws.amazon.com/console/"
 
 
-def get_switch_role_url(profile: str):
+def get_switch_role_url(
+    profile: str,
+    awscli_config: T.Optional[AWSCliConfig] = None,
+    ttl: float = DEFAULT_TTL,
+    timeout: T.Optional[float] = DEFAULT_TIMEOUT,
+    offline: bool = False,
+    color: T.Optional[str] = None,
+):
     """
     Get the url for switching role.
 
@@ -54,18 +144,49 @@ def get_switch_role_url(profile: str):
         region = us-east-1
         role_arn = arn:aws:iam::111122223333:role/admin-role
         source_profile = my_acc_1_profile
+
+    The account id and alias are cached on disk for ``ttl`` seconds, see
+    :mod:`awscli_mate.identity`. On cache miss, the STS and IAM calls run
+    concurrently and share the ``timeout``.
+
+    :param offline: if True and the profile has a ``role_arn``, build the url
+        from the ``role_arn`` without any network call, the account alias
+        is used in the display name only if it is in the account directory
+        or the identity cache. Profiles without ``role_arn`` still use the
+        network. If the profile is in the account directory, the url is
+        always built offline, see :mod:`awscli_mate.directory`.
+    :param color: the hex color of the role in the console, e.g. ``"F2B0A9"``.
     """
-    import boto3
-
-    boto_ses = boto3.session.Session(profile_name=profile)
-    iam = boto_ses.client("iam")
-    sts = boto_ses.client("sts")
-    account = get_account_alias(iam)
-    response = sts.get_caller_identity()
-    if account is None:
-        account = response["Account"]
-    arn = response["Arn"]
-    role_name = arn.split("/")[1]
-    display_name = f"{role_name}@{account}"
-    account = response["Account"]
-    return f"https://signin.aws.amazon.com/switchrole?roleName={role_name}&account={account}&displayName={display_name}"
+    if awscli_config is None:
+        awscli_config = AWSCliConfig()
+    account = get_profile_account(profile, awscli_config)
+    if offline or account is not None:
+        role_arn = get_role_arn(profile, awscli_config)
+        if role_arn is not None:
+            account_id, role_name = parse_role_arn(role_arn)
+            if account is not None and account.account_id == account_id:
+                alias = account.alias
+            else:
+                cache = IdentityCache.from_awscli_config(awscli_config, ttl=ttl)
+                identity = cache.get(role_arn)
+                alias = None if identity is None else identity.alias
+            return _build_switch_role_url(
+                role_name=role_name,
+                account_id=account_id,
+                display_name=f"{role_name.split('/')[-1]}@{alias or account_id}",
+                color=color,
+            )
+
+    identity = get_identity(
+        profile,
+        awscli_config=awscli_config,
+        ttl=ttl,
+        timeout=timeout,
+    )
+    role_name = identity.principal_name
+    return _build_switch_role_url(
+        role_name=role_name,
+        account_id=identity.account_id,
+        display_name=f"{role_name}@{identity.alias or identity.account_id}",
+        color=color,
+    )
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+
+"""
+Watch the ``~/.aws/config`` and ``~/.aws/credentials`` file, keep an
+in-memory profile model up-to-date for long-running process like the UI.
+
+The watcher uses inotify on Linux, and falls back to stat polling on other
+platforms. Because the files are usually replaced atomically, we watch the
+parent directory and filter the events by file name. An event only counts
+as a change when the stat signature of the file actually changed.
+
+A burst of events (e.g. an editor truncates the file then writes it) is
+debounced, the change is reported once the files stop changing, so a
+transient empty or partial file is not loaded.
+
+Usage example::
+
+    model = LiveProfileModel(awscli_config=AWSCliConfig())
+    model.subscribe(lambda model: print("profiles changed!"))
+    with model:
+        # zero file I/O, always up-to-date
+        table = model.table
+"""
+
+import typing as T
+import os
+import sys
+import time
+import select
+import logging
+import struct
+import threading
+import dataclasses
+from pathlib import Path
+
+from .cache import StatSignature
+from .awscli import T_PROFILE_REGION_PAIR, AWSCliConfig
+from .table import ProfileTable
+from .directory import AccountDirectory, get_path_directory, load_account_directory
+
+logger = logging.getLogger(__name__)
+
+T_SIGNATURES = T.Tuple[T.Optional[StatSignature], ...]
+
+
+def get_signatures(paths: T.Iterable[Path]) -> T_SIGNATURES:
+    signatures = list()
+    for path in paths:
+        try:
+            signatures.append(StatSignature.from_path(path))
+        except FileNotFoundError:
+            signatures.append(None)
+    return tuple(signatures)
+
+
+class BackendEnum:
+    auto = "auto"
+    inotify = "inotify"
+    polling = "polling"
+
+
+# see "man 7 inotify"
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc():
+    """
+    Load libc with inotify support, return None if not available.
+    """
+    if not sys.platform.startswith("linux"):  # pragma: no cover
+        return None
+    import ctypes
+    import ctypes.util
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        _ = libc.inotify_init1
+        _ = libc.inotify_add_watch
+    except (OSError, AttributeError):  # pragma: no cover
+        return None
+    return libc
+
+
+def is_inotify_available() -> bool:
+    return _load_libc() is not None
+
+
+@dataclasses.dataclass
+class FileWatcher:
+    """
+    Call the ``callback`` in a background thread when any of the watched
+    file is changed.
+
+    :param paths: the files to watch.
+    :param callback: a function that takes no argument.
+    :param backend: one of :class:`BackendEnum`.
+    :param interval: the polling interval in seconds, also the max delay to
+        notice :meth:`FileWatcher.stop` for the inotify backend.
+    :param debounce: the files must stay unchanged for this many seconds
+        before the change is reported.
+    :param max_debounce: report the change anyway if the files keep changing
+        for this many seconds.
+    """
+
+    paths: T.List[Path]
+    callback: T.Callable[[], T.Any]
+    backend: str = BackendEnum.auto
+    interval: float = 0.5
+    debounce: float = 0.05
+    max_debounce: float = 2.0
+    _signatures: T_SIGNATURES = dataclasses.field(init=False, default=())
+    _thread: T.Optional[threading.Thread] = dataclasses.field(init=False, default=None)
+    _stop: threading.Event = dataclasses.field(
+        init=False, default_factory=threading.Event
+    )
+
+    def __post_init__(self):
+        self.paths = [Path(path) for path in self.paths]
+        if self.backend == BackendEnum.auto:
+            if is_inotify_available():
+                self.backend = BackendEnum.inotify
+            else:  # pragma: no cover
+                self.backend = BackendEnum.polling
+        self._signatures = get_signatures(self.paths)
+
+    def check(self) -> bool:
+        """
+        Compare the stat signatures with the last check, call the callback if
+        any file changed. Return a boolean flag to indicate that whether
+        there is any change.
+        """
+        signatures = get_signatures(self.paths)
+        if signatures == self._signatures:
+            return False
+        self._signatures = signatures
+        self.callback()
+        return True
+
+    def settle(self):
+        """
+        Wait until the stat signatures stay unchanged for
+        :attr:`FileWatcher.debounce` seconds.
+        """
+        deadline = time.monotonic() + self.max_debounce
+        signatures = get_signatures(self.paths)
+        while not self._stop.wait(self.debounce):
+            new_signatures = get_signatures(self.paths)
+            if new_signatures == signatures or time.monotonic() >= deadline:
+                return
+            signatures = new_signatures
+
+    def _run_polling(self):
+        while not self._stop.wait(self.interval):
+            if get_signatures(self.paths) != self._signatures:
+                self.settle()
+                self.check()
+
+    def _run_inotify(self):
+        libc = _load_libc()
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:  # pragma: no cover
+            return self._run_polling()
+        try:
+            names = {path.name for path in self.paths}
+            for dir_path in {str(path.parent) for path in self.paths}:
+                libc.inotify_add_watch(fd, dir_path.encode("utf-8"), IN_MASK)
+            # the file may change between __post_init__ and the watch is added
+            self.check()
+            while not self._stop.is_set():
+                readable, _, _ = select.select([fd], [], [], self.interval)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:  # pragma: no cover
+                    continue
+                matched, overflow = self._parse_events(data, names)
+                if overflow:
+                    # some events are lost, reload unconditionally
+                    self.settle()
+                    self._signatures = get_signatures(self.paths)
+                    self.callback()
+                elif matched:
+                    self.settle()
+                    self.check()
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _parse_events(data: bytes, names: T.Set[str]) -> T.Tuple[bool, bool]:
+        """
+        Parse the raw inotify events, return two flags, whether any watched
+        file is touched, and whether the event queue overflowed.
+        """
+        offset = 0
+        matched = False
+        overflow = False
+        while offset < len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif name.decode("utf-8", errors="ignore") in names:
+                matched = True
+        return matched, overflow
+
+    def start(self):
+        """
+        Start watching in a daemon thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        if self.backend == BackendEnum.inotify:
+            target = self._run_inotify
+        else:
+            target = self._run_polling
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop watching, wait for the background thread to exit.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+
+T_SUBSCRIBER = T.Callable[["LiveProfileModel"], T.Any]
+
+
+@dataclasses.dataclass
+class LiveProfileModel:
+    """
+    The in-memory profile model, it is only reloaded when the config,
+    credentials or account directory file actually changed.
+
+    :param awscli_config: where to load the profiles.
+    :param backend: the watcher backend, one of :class:`BackendEnum`.
+    :param interval: see :class:`FileWatcher`.
+    :param debounce: see :class:`FileWatcher`.
+    :param error: the error of the last reload, None if it succeeded.
+
+    The :attr:`LiveProfileModel.table` and
+    :attr:`LiveProfileModel.account_directory` are replaced on every reload,
+    so their identity is the version of the model.
+    """
+
+    awscli_config: AWSCliConfig = dataclasses.field(default_factory=AWSCliConfig)
+    backend: str = BackendEnum.auto
+    interval: float = 0.5
+    debounce: float = 0.05
+    table: ProfileTable = dataclasses.field(init=False, default_factory=ProfileTable)
+    account_directory: T.Optional[AccountDirectory] = dataclasses.field(
+        init=False, default=None
+    )
+    version: int = dataclasses.field(init=False, default=0)
+    error: T.Optional[Exception] = dataclasses.field(init=False, default=None)
+    _subscribers: T.List[T_SUBSCRIBER] = dataclasses.field(
+        init=False, default_factory=list
+    )
+    _watcher: FileWatcher = dataclasses.field(init=False)
+
+    def __post_init__(self):
+        self._watcher = FileWatcher(
+            paths=[
+                self.awscli_config.path_config,
+                self.awscli_config.path_credentials,
+                get_path_directory(self.awscli_config),
+            ],
+            callback=self.refresh,
+            backend=self.backend,
+            interval=self.interval,
+            debounce=self.debounce,
+        )
+        self.refresh()
+
+    @property
+    def pairs(self) -> T.List[T_PROFILE_REGION_PAIR]:
+        return list(self.table.iter_profile_and_region_pairs())
+
+    def subscribe(self, callback: T_SUBSCRIBER):
+        """
+        Register a callback, it is called with the model after the model
+        is reloaded.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: T_SUBSCRIBER):
+        self._subscribers.remove(callback)
+
+    def refresh(self):
+        """
+        Reload the profiles from disk and notify the subscribers. If it
+        failed for any reason (e.g. the file is missing, malformed in the
+        middle of editing, or the lock timed out), keep the current model and
+        record the error in :attr:`LiveProfileModel.error`, the watcher keeps
+        running.
+        """
+        try:
+            table = self.awscli_config.get_profile_table()
+            account_directory = load_account_directory(self.awscli_config)
+        except Exception as e:
+            logger.warning("failed to reload the profiles: %r", e)
+            self.error = e
+            return
+        self.error = None
+        # replace the reference, readers in other threads either see the old
+        # table or the new table, never a half-built one
+        self.table = table
+        self.account_directory = account_directory
+        self.version += 1
+        for callback in list(self._subscribers):
+            try:
+                callback(self)
+            except Exception:
+                logger.exception("profile model subscriber %r failed", callback)
+
+    def start(self):
+        self._watcher.start()
+
+    def stop(self):
+        self._watcher.stop()
+
+    def __enter__(self) -> "LiveProfileModel":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
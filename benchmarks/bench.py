@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+"""
+Scale benchmark for awscli_mate.
+
+Usage::
+
+    # run the benchmark, dump the result to benchmarks/result.json
+    python benchmarks/bench.py run
+
+    # run on selected sizes, compare with a stored baseline
+    python benchmarks/bench.py run --sizes 10,1000 --baseline benchmarks/baseline.json
+
+    # save the result as the new baseline
+    python benchmarks/bench.py run --output benchmarks/baseline.json
+
+Each size runs in a fresh sub process with ``HOME`` pointing to a synthetic
+home directory, because ``awscli_mate.paths`` binds the ``~/.aws`` location
+at import time.
+"""
+
+import typing as T
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+from generate import SIZES, generate_aws_home, get_user_profile
+
+dir_here = Path(__file__).absolute().parent
+dir_project_root = dir_here.parent
+path_default_output = dir_here / "result.json"
+
+
+def timeit(
+    func: T.Callable,
+    setup: T.Optional[T.Callable] = None,
+    min_time: float = 0.5,
+    max_repeat: int = 50,
+) -> T.Dict[str, T.Any]:
+    """
+    Call ``func`` repeatedly until ``min_time`` seconds elapsed or
+    ``max_repeat`` reached. ``func`` is always called at least once.
+    """
+    elapsed_list = []
+    total = 0.0
+    while total < min_time and len(elapsed_list) < max_repeat:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        elapsed_list.append(elapsed)
+        total += elapsed
+    return {
+        "repeat": len(elapsed_list),
+        "min": min(elapsed_list),
+        "median": statistics.median(elapsed_list),
+        "mean": statistics.mean(elapsed_list),
+    }
+
+
+def measure(n_profiles: int, min_time: float = 0.5):
+    """
+    Measure all operations against the ``~/.aws`` in current ``HOME``,
+    print the result as JSON to stdout. Called by :func:`run` in a sub process.
+    """
+    from awscli_mate.awscli import AWSCliConfig
+    from awscli_mate.cache import parsed_config_cache
+    from awscli_mate.search import sort_profile_region_pairs
+    from awscli_mate.watch import LiveProfileModel
+    import awscli_mate.ui as ui_module
+
+    awscli_config = AWSCliConfig()
+    # the streaming path, without the live profile model
+    ui = ui_module.UI(handler=ui_module.handler, capture_error=False)
+    # the same setup as ``run_ui``, the UI is backed by a live profile model
+    live_ui = ui_module.UI(handler=ui_module.handler, capture_error=False)
+    live_model = LiveProfileModel(awscli_config=AWSCliConfig(use_catalog=True))
+    live_ui.profile_model = live_model
+    profiles = [get_user_profile(0), get_user_profile(1)]
+    query = get_user_profile(min(n_profiles // 2, 99))
+    pairs = awscli_config.extract_profile_and_region_pairs()
+    counter = [0]
+
+    def set_profile_as_default():
+        counter[0] += 1
+        awscli_config.set_profile_as_default(profiles[counter[0] % 2])
+
+    operations = {
+        "read_config_cold": (awscli_config.read_config, parsed_config_cache.clear),
+        "read_config_warm": (awscli_config.read_config, None),
+        "extract_profile_and_region_pairs": (
+            awscli_config.extract_profile_and_region_pairs,
+            None,
+        ),
+        "set_profile_as_default": (set_profile_as_default, None),
+        "sort_profile_region_pairs": (
+            lambda: sort_profile_region_pairs(pairs, query),
+            None,
+        ),
+        "ui_handler": (
+            lambda: ui_module.handler(f"set_profile_as_default {query}", ui),
+            None,
+        ),
+        "ui_handler_live": (
+            lambda: ui_module.handler(f"set_profile_as_default {query}", live_ui),
+            None,
+        ),
+    }
+    result = {}
+    with live_model:
+        for name, (func, setup) in operations.items():
+            result[name] = timeit(func, setup=setup, min_time=min_time)
+    print(json.dumps(result))
+
+
+def compare(
+    result: T.Dict[str, T.Any],
+    baseline: T.Dict[str, T.Any],
+    tolerance: float,
+) -> bool:
+    """
+    Compare the median time with the baseline, print the report.
+
+    :return: True if no operation is slower than ``baseline * tolerance``.
+    """
+    ok = True
+    print(f"{'size':>8} {'operation':<36} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for size, operations in result["sizes"].items():
+        for name, stats in operations.items():
+            try:
+                base = baseline["sizes"][size][name]["median"]
+            except KeyError:
+                continue
+            ratio = stats["median"] / base if base else float("inf")
+            flag = ""
+            if ratio > tolerance:
+                ok = False
+                flag = " !!!"
+            print(
+                f"{size:>8} {name:<36} {base:>10.6f} {stats['median']:>10.6f} "
+                f"{ratio:>7.2f}{flag}"
+            )
+    return ok
+
+
+def run(
+    sizes: T.Union[str, int, T.Sequence[int]] = tuple(SIZES),
+    output: str = str(path_default_output),
+    baseline: T.Optional[str] = None,
+    tolerance: float = 1.2,
+    min_time: float = 0.5,
+):
+    """
+    Run the benchmark on synthetic ``~/.aws`` of the given sizes.
+
+    :param sizes: number of profiles, e.g. ``10,1000``.
+    :param output: dump the result JSON to this file.
+    :param baseline: the baseline result JSON file to compare with.
+    :param tolerance: exit with error if any operation is slower than
+        ``baseline * tolerance``.
+    :param min_time: min seconds to spend on each operation.
+    """
+    if isinstance(sizes, str):
+        sizes = [int(size) for size in sizes.split(",")]
+    elif isinstance(sizes, int):
+        sizes = [sizes]
+
+    result = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": {},
+    }
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as dir_home:
+            generate_aws_home(Path(dir_home) / ".aws", n_profiles=size)
+            env = dict(os.environ)
+            env["HOME"] = dir_home
+            env["PYTHONPATH"] = os.pathsep.join(
+                [str(dir_project_root), env.get("PYTHONPATH", "")]
+            )
+            print(f"benchmark {size} profiles ...", file=sys.stderr)
+            res = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "measure",
+                    f"--n_profiles={size}",
+                    f"--min_time={min_time}",
+                ],
+                env=env,
+                capture_output=True,
+                check=True,
+                text=True,
+            )
+            result["sizes"][str(size)] = json.loads(res.stdout.strip().splitlines()[-1])
+
+    Path(output).write_text(json.dumps(result, indent=4))
+    print(f"result is saved at {output}", file=sys.stderr)
+
+    if baseline is not None:
+        if not compare(result, json.loads(Path(baseline).read_text()), tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    import fire
+
+    fire.Fire({"run": run, "measure": measure})
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""
+Generate synthetic ``~/.aws/config`` and ``~/.aws/credentials`` files for
+benchmark.
+
+The generated files look like a big organization's AWS CLI setup:
+
+- 70% of the profiles are IAM user profiles, they have credentials.
+- 20% of the profiles are switch role profiles, they use ``role_arn`` and
+  ``source_profile``, some of them are chained to another role profile.
+- 10% of the profiles are SSO profiles, they reference a ``sso-session``.
+- every section has comments, some values have inline comments.
+"""
+
+import typing as T
+import random
+from pathlib import Path
+
+SIZES = [10, 1000, 10000, 100000]
+REGIONS = [
+    "us-east-1",
+    "us-east-2",
+    "us-west-1",
+    "us-west-2",
+    "eu-west-1",
+    "eu-central-1",
+    "ap-northeast-1",
+    "ap-southeast-1",
+]
+
+
+def get_user_profile(i: int) -> str:
+    return f"user_{i:06d}"
+
+
+def get_role_profile(i: int) -> str:
+    return f"role_{i:06d}"
+
+
+def get_sso_profile(i: int) -> str:
+    return f"sso_{i:06d}"
+
+
+def get_account_id(i: int) -> str:
+    return f"{100000000000 + i:012d}"
+
+
+def generate_aws_home(
+    dir_aws: Path,
+    n_profiles: int,
+    seed: int = 1,
+) -> T.List[str]:
+    """
+    Generate the ``config`` and ``credentials`` file in ``dir_aws``.
+
+    :return: the list of profiles that exist in both files, they can be used
+        with ``set_profile_as_default``.
+    """
+    rnd = random.Random(seed)
+    dir_aws = Path(dir_aws)
+    dir_aws.mkdir(parents=True, exist_ok=True)
+
+    n_user = max(1, n_profiles * 7 // 10)
+    n_role = n_profiles * 2 // 10
+    n_sso = n_profiles - n_user - n_role
+
+    config_lines = [
+        "# synthetic aws cli config file for benchmark",
+        "[default]",
+        "region = us-east-1",
+        "output = json",
+        "",
+    ]
+    credentials_lines = [
+        "# synthetic aws cli credentials file for benchmark",
+        "[default]",
+        "aws_access_key_id = AKIADEFAULT",
+        "aws_secret_access_key = DEFAULT",
+        "",
+    ]
+
+    user_profiles = []
+    for i in range(n_user):
+        profile = get_user_profile(i)
+        user_profiles.append(profile)
+        config_lines.extend(
+            [
+                f"# --- {profile} ---",
+                f"[profile {profile}]",
+                f"# owner: team-{i % 50}",
+                f"region = {rnd.choice(REGIONS)}",
+                "output = json # inline comment" if i % 3 == 0 else "output = json",
+                "",
+            ]
+        )
+        credentials_lines.extend(
+            [
+                f"[{profile}]",
+                f"aws_access_key_id = AKIA{i:016d}",
+                f"aws_secret_access_key = {rnd.getrandbits(128):032x}",
+                "",
+            ]
+        )
+
+    for i in range(n_role):
+        profile = get_role_profile(i)
+        # every 4th role profile is chained to the previous role profile
+        if i % 4 == 3:
+            source_profile = get_role_profile(i - 1)
+        else:
+            source_profile = rnd.choice(user_profiles)
+        lines = [
+            f"# --- {profile} ---",
+            f"[profile {profile}]",
+            f"role_arn = arn:aws:iam::{get_account_id(i)}:role/admin-role",
+            f"source_profile = {source_profile}",
+        ]
+        # half of the role profiles inherit region from the source profile
+        if i % 2 == 0:
+            lines.append(f"region = {rnd.choice(REGIONS)}")
+        lines.append("")
+        config_lines.extend(lines)
+
+    n_sso_session = max(1, n_sso // 100)
+    for i in range(n_sso_session):
+        config_lines.extend(
+            [
+                f"# --- sso session {i} ---",
+                f"[sso-session sso_{i}]",
+                f"sso_start_url = https://d-{i:010d}.awsapps.com/start",
+                "sso_region = us-east-1",
+                "sso_registration_scopes = sso:account:access",
+                "",
+            ]
+        )
+    for i in range(n_sso):
+        profile = get_sso_profile(i)
+        config_lines.extend(
+            [
+                f"# --- {profile} ---",
+                f"[profile {profile}]",
+                f"sso_session = sso_{i % n_sso_session}",
+                f"sso_account_id = {get_account_id(n_role + i)}",
+                "sso_role_name = AdministratorAccess",
+                f"region = {rnd.choice(REGIONS)}",
+                "",
+            ]
+        )
+
+    dir_aws.joinpath("config").write_text("\n".join(config_lines))
+    dir_aws.joinpath("credentials").write_text("\n".join(credentials_lines))
+    return user_profiles
+
+
+if __name__ == "__main__":
+    import fire
+
+    fire.Fire(generate_aws_home)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+import awscli_mate.aio as aio
+import awscli_mate.awscli as awscli
+import awscli_mate.identity as identity_module
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.identity import Identity
+from awscli_mate.url import get_sign_in_url, get_switch_role_url
+
+
+class FakeIAMClient:
+    def list_account_aliases(self):
+        return {"AccountAliases": ["my-alias"]}
+
+
+def get_identity(profile: str) -> Identity:
+    return Identity(
+        account_id="111122223333",
+        arn="arn:aws:sts::111122223333:assumed-role/fake-role-name/s",
+        alias="my-alias" if profile == "p2" else None,
+    )
+
+
+def test_url(awscli_config: AWSCliConfig, monkeypatch):
+    # the three identity calls must be in flight at the same time to pass
+    # the barrier, and they are blocked until the event loop has ticked,
+    # so the test fails (instead of hangs) if the calls run one by one or
+    # block the event loop
+    barrier = threading.Barrier(3, timeout=5)
+    ticked = threading.Event()
+
+    def fetch_identity(profile, awscli_config, timeout):
+        barrier.wait()
+        assert ticked.wait(5)
+        return get_identity(profile)
+
+    monkeypatch.setattr(identity_module, "fetch_identity", fetch_identity)
+
+    async def main():
+        ticks = []
+
+        async def tick():
+            while len(ticks) < 5:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+            ticked.set()
+
+        return await asyncio.gather(
+            aio.get_sign_in_url("p1", awscli_config=awscli_config),
+            aio.get_sign_in_url("p3", awscli_config=awscli_config),
+            aio.get_switch_role_url("p2", awscli_config=awscli_config),
+            aio.get_account_alias(FakeIAMClient()),
+            tick(),
+        )
+
+    try:
+        sign_in_p1, sign_in_p3, switch_role_p2, alias, _ = asyncio.run(main())
+    finally:
+        aio.shutdown_executor()
+
+    # the same values as the sync version
+    monkeypatch.setattr(
+        identity_module,
+        "fetch_identity",
+        lambda profile, awscli_config, timeout: get_identity(profile),
+    )
+    assert sign_in_p1 == get_sign_in_url("p1", awscli_config=awscli_config)
+    assert sign_in_p3 == get_sign_in_url("p3", awscli_config=awscli_config)
+    assert switch_role_p2 == get_switch_role_url("p2", awscli_config=awscli_config)
+    assert alias == "my-alias"
+
+
+def test_mfa_auth(awscli_config: AWSCliConfig, monkeypatch):
+    def get_mfa_session_token(profile, mfa_code, hours, mfa_arn, awscli_config):
+        return {
+            "AccessKeyId": "AAA",
+            "SecretAccessKey": "BBB",
+            "SessionToken": "CCC",
+            "Expiration": datetime.now(timezone.utc) + timedelta(hours=hours),
+        }
+
+    monkeypatch.setattr(awscli, "get_mfa_session_token", get_mfa_session_token)
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            token = await aio.get_mfa_session_token(
+                "p1", "123456", awscli_config=awscli_config, executor=executor
+            )
+            assert token["AccessKeyId"] == "AAA"
+            return await aio.mfa_auth(
+                "p1", "123456", awscli_config=awscli_config, executor=executor
+            )
+
+    aio.set_max_workers(2)
+    try:
+        config, credentials = asyncio.run(main())
+    finally:
+        aio.set_max_workers(aio.DEFAULT_MAX_WORKERS)
+        aio.shutdown_executor()
+    assert credentials["p1_mfa"]["aws_access_key_id"] == "AAA"
+    assert awscli_config.is_session_valid("p1_mfa") is True
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.aio", preview=False)
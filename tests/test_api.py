@@ -12,17 +12,43 @@ def test():
     _ = api.CredentialKeyEnum
     _ = api.T_PROFILE_REGION_PAIR
     _ = api.AWSCliConfig
+    _ = api.ProfileGraph
+    _ = api.FleetReport
+    _ = api.fleet_set_profile_as_default
+    _ = api.fleet_upsert_profile
+    _ = api.assume_roles_from_mfa_session
+    _ = api.new_boto_session
+    _ = api.warm_role_cache
+    _ = api.SessionPool
+    _ = api.session_pool
+    _ = api.get_client
+    _ = api.Identity
+    _ = api.get_identity
+    _ = api.get_sign_in_account
+    _ = api.invalidate_identity
+    _ = api.AccountDirectory
+    _ = api.load_account_directory
+    _ = api.build_account_directory
+    _ = api.set_default_scorer
+    _ = api.SearchSession
+    _ = api.SearchCache
+    _ = api.search_cache
     _ = api.ProfileRegionPairFuzzyMatcher
     _ = api.sort_profile_region_pairs
     _ = api.get_sorted_profile_region_pairs
     _ = api.get_account_alias
     _ = api.get_sign_in_url
     _ = api.get_switch_role_url
+    _ = api.ExportFormatEnum
+    _ = api.iter_url_records
+    _ = api.export_urls
 
     awscli_config = api.AWSCliConfig()
 
     _ = awscli_config.set_profile_as_default
     _ = awscli_config.mfa_auth
+    _ = awscli_config.transaction
+    _ = awscli_config.get_profile_graph
 
     _ = awscli_config.read_config
     _ = awscli_config.ensure_profile_exists
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 
 import pytest
+from datetime import datetime, timezone, timedelta
 
 from awscli_mate.exc import ProfileNotFoundError
-from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.awscli import AWSCliConfig, parse_expiration
+from awscli_mate import awscli
 
 
 class TestCliConfig:
@@ -74,6 +76,60 @@ class TestCliConfig:
         awscli_config.set_profile_as_default("default")
 
 
+def test_parse_expiration():
+    expected = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    assert parse_expiration("2023-01-01T00:00:00Z") == expected
+    assert parse_expiration("2023-01-01T00:00:00+00:00") == expected
+    assert parse_expiration("2023-01-01T00:00:00") == expected
+    assert parse_expiration("not a date") is None
+
+
+def test_mfa_auth(awscli_config: AWSCliConfig, monkeypatch):
+    calls = []
+
+    def get_mfa_session_token(profile, mfa_code, hours, mfa_arn, awscli_config):
+        calls.append(profile)
+        return {
+            "AccessKeyId": f"AAA{len(calls)}",
+            "SecretAccessKey": "BBB",
+            "SessionToken": "CCC",
+            "Expiration": datetime.now(timezone.utc) + timedelta(hours=hours),
+        }
+
+    monkeypatch.setattr(awscli, "get_mfa_session_token", get_mfa_session_token)
+
+    assert awscli_config.is_session_valid("p1_mfa") is False
+    assert awscli_config.is_session_valid("p1") is False
+
+    awscli_config.mfa_auth("p1", "123456", hours=1)
+    assert len(calls) == 1
+    assert awscli_config.is_session_valid("p1_mfa") is True
+    assert awscli_config.is_session_valid("p1_mfa", margin=7200) is False
+
+    # the existing session is re-used, no STS call
+    config, credentials = awscli_config.mfa_auth("p1", "123456")
+    assert len(calls) == 1
+    assert credentials["p1_mfa"]["aws_access_key_id"] == "AAA1"
+
+    # the existing session is re-used, only the default profile is updated
+    config, credentials = awscli_config.mfa_auth(
+        "p1", "123456", overwrite_default=True
+    )
+    assert len(calls) == 1
+    assert credentials["default"]["aws_access_key_id"] == "AAA1"
+    assert awscli_config.is_session_valid("default") is True
+
+    # not enough margin left, get a new token
+    awscli_config.mfa_auth("p1", "123456", margin=7200)
+    assert len(calls) == 2
+    _, credentials = awscli_config.read_config()
+    assert credentials["p1_mfa"]["aws_access_key_id"] == "AAA2"
+
+    # force a new token
+    awscli_config.mfa_auth("p1", "123456", margin=None)
+    assert len(calls) == 3
+
+
 if __name__ == "__main__":
     from awscli_mate.tests import run_cov_test
 
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.cache import StatSignature, parsed_config_cache
+
+
+def test_read_config_cache(awscli_config: AWSCliConfig):
+    parsed_config_cache.clear()
+
+    # first read is a miss, the second read is a hit
+    awscli_config.read_config()
+    assert parsed_config_cache.stats.misses == 2
+    assert parsed_config_cache.stats.hits == 0
+    awscli_config.read_config(readonly=True)
+    assert parsed_config_cache.stats.misses == 2
+    assert parsed_config_cache.stats.hits == 2
+
+    # mutate the private copy won't corrupt the cached object
+    config, credentials = awscli_config.read_config()
+    assert config.is_shared and credentials.is_shared
+    assert config["profile p1"]["region"] == "us-east-1"
+    assert config.is_shared
+    config["profile p1"]["region"] = "eu-west-1"
+    credentials.remove_section("p1")
+    assert not config.is_shared and not credentials.is_shared
+    config.write(io.StringIO())
+    config, credentials = awscli_config.read_config(readonly=True)
+    assert config["profile p1"]["region"] == "us-east-1"
+    assert "p1" in credentials
+    shared_config = config
+
+    # every kind of mutation copies the data first
+    for mutate in [
+        lambda parser: parser.add_section("new"),
+        lambda parser: parser.remove_option("profile p1", "region"),
+        lambda parser: parser.__setitem__("profile p1", {"k": "v"}),
+        lambda parser: parser.__delitem__("profile p1"),
+        lambda parser: parser.read_string("[profile p1]\nregion = v\n"),
+        lambda parser: parser.defaults().update({"k": "v"}),
+    ]:
+        config, _ = awscli_config.read_config()
+        mutate(config)
+        assert not config.is_shared
+        assert shared_config["profile p1"]["region"] == "us-east-1"
+        assert "new" not in shared_config
+        assert not shared_config.defaults()
+
+    # file changed, re-parse the changed file only
+    before = StatSignature.from_path(awscli_config.path_config)
+    awscli_config.set_profile_as_default("p1")
+    assert StatSignature.from_path(awscli_config.path_config) != before
+    stats = parsed_config_cache.stats
+    misses = stats.misses
+    config, credentials = awscli_config.read_config()
+    assert stats.misses == misses + 2
+    assert config["default"]["region"] == "us-east-1"
+    assert 0 < stats.hit_ratio < 1
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.cache", preview=False)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import dataclasses
+import configparser
+
+import pytest
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.catalog import ProfileCatalog, iter_entries
+from awscli_mate.search import get_sorted_profile_region_pairs
+
+
+def test_catalog(awscli_config: AWSCliConfig):
+    awscli_config = dataclasses.replace(awscli_config, use_catalog=True)
+    path_catalog = awscli_config.path_catalog
+    assert path_catalog.exists() is False
+    assert ProfileCatalog.load(path_catalog) is None
+
+    # the first call builds the catalog
+    pairs = awscli_config.extract_profile_and_region_pairs()
+    assert pairs == [
+        ("p1", "us-east-1"),
+        ("p2", "us-east-2"),
+        ("p3", "us-east-3"),
+    ]
+    assert path_catalog.exists() is True
+    catalog = ProfileCatalog.load(path_catalog)
+    assert catalog.is_fresh(awscli_config.path_config, awscli_config.path_credentials)
+    assert [entry.name for entry in catalog.entries] == ["default", "p1", "p2", "p3"]
+    entry = catalog.entries[2]
+    assert entry.section_type == "profile"
+    assert entry.role_arn == "arn:aws:iam::111122223333:role/fake-role-name"
+    assert entry.source_profile == "p1 # comment for p2"
+
+    # the second call loads from the catalog
+    mtime = path_catalog.stat().st_mtime_ns
+    assert awscli_config.extract_profile_and_region_pairs() == pairs
+    assert get_sorted_profile_region_pairs("p3", awscli_config)[0][0] == "p3"
+    assert path_catalog.stat().st_mtime_ns == mtime
+
+    # config changed, catalog is rebuilt
+    hash_p1 = catalog.entries[1].hash
+    with awscli_config.transaction() as tx:
+        tx.upsert_section(tx.config, "profile p1", {"region": "eu-west-1"})
+        tx.upsert_section(tx.config, "sso-session my_sso", {"sso_region": "us-east-1"})
+    assert catalog.is_fresh(awscli_config.path_config, awscli_config.path_credentials) is False
+    assert awscli_config.extract_profile_and_region_pairs()[0] == ("p1", "eu-west-1")
+    catalog = awscli_config.get_catalog()
+    assert catalog.entries[1].hash != hash_p1
+    assert catalog.entries[-1].section_type == "sso-session"
+    assert catalog.entries[-1].name == "my_sso"
+
+    # broken catalog file is ignored
+    path_catalog.write_text("not a json")
+    assert awscli_config.extract_profile_and_region_pairs()[0] == ("p1", "eu-west-1")
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        # DEFAULT at the end
+        "[profile p1]\nregion = r1\n[profile p2]\n[profile p3]\nregion = r3\n"
+        "[DEFAULT]\nregion = r0\n",
+        # DEFAULT in the middle
+        "[profile p1]\n[DEFAULT]\nregion = r0\n[profile p2]\n",
+        # the region is in the second DEFAULT block
+        "[DEFAULT]\noutput = json\n[profile p1]\n[DEFAULT]\nregion = r0\n"
+        "[profile p2]\nregion = r2\n",
+        # no DEFAULT
+        "[profile p1]\n[profile p2]\nregion = r2\n",
+    ],
+)
+def test_iter_entries_default_region(tmp_path, content: str):
+    path = tmp_path / "config"
+    path.write_text(content)
+    parser = configparser.ConfigParser()
+    parser.read_string(content)
+    expected = [
+        (section[8:], parser[section].get("region")) for section in parser.sections()
+    ]
+    assert [(entry.name, entry.region) for entry in iter_entries(path)] == expected
+
+
+def test_iter_entries_streaming(tmp_path):
+    path = tmp_path / "config"
+    path.write_text(
+        "[profile p1]\nregion = r1\n[profile p2]\n[profile p3]\nregion = r3\n"
+        "[DEFAULT]\nregion = r0\n"
+    )
+    # the section before the first one without a region is not held back
+    entries = iter_entries(path)
+    assert next(entries).name == "p1"
+    assert [(entry.name, entry.region) for entry in entries] == [
+        ("p2", "r0"),
+        ("p3", "r3"),
+    ]
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.catalog", preview=False)
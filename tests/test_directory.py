@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import awscli_mate.identity as identity_module
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.identity import Identity, invalidate_identity
+from awscli_mate.directory import (
+    get_path_directory,
+    load_account_directory,
+    get_profile_account,
+    build_account_directory,
+)
+from awscli_mate.search import (
+    sort_profile_region_pairs,
+    get_sorted_profile_region_pairs,
+    iter_sorted_profile_region_pairs,
+)
+from awscli_mate.url import get_sign_in_url, get_switch_role_url
+
+
+def test_account_directory(awscli_config: AWSCliConfig, monkeypatch):
+    calls = []
+
+    def fetch_identity(profile, awscli_config, timeout):
+        calls.append(profile)
+        if profile == "p3":
+            raise ValueError("no credentials")
+        if profile == "p1":
+            return Identity(
+                account_id="444455556666",
+                arn="arn:aws:iam::444455556666:user/alice",
+            )
+        return Identity(
+            account_id="111122223333",
+            arn="arn:aws:sts::111122223333:assumed-role/fake-role-name/s",
+            alias="my-alias",
+        )
+
+    monkeypatch.setattr(identity_module, "fetch_identity", fetch_identity)
+
+    assert load_account_directory(awscli_config) is None
+    assert get_profile_account("p1", awscli_config) is None
+
+    dumps = []
+    dump = identity_module.IdentityCache._dump
+    monkeypatch.setattr(
+        identity_module.IdentityCache,
+        "_dump",
+        lambda self, entries: dumps.append(dump(self, entries)),
+    )
+
+    report = build_account_directory(awscli_config, max_workers=3)
+    assert sorted(calls) == ["p1", "p2", "p3"]
+    # the new identities are written to the cache file at once
+    assert len(dumps) == 1
+    assert list(report.errors) == ["p3"]
+    assert report.to_dict()["accounts"] == 2
+    assert report.to_dict()["profiles"] == 2
+
+    data = json.loads(get_path_directory(awscli_config).read_text())
+    assert data["accounts"]["111122223333"] == {
+        "alias": "my-alias",
+        "profiles": ["p2"],
+        "regions": ["us-east-2"],
+    }
+
+    directory = load_account_directory(awscli_config)
+    assert load_account_directory(awscli_config) is directory
+    assert directory.get_account("444455556666").profiles == ["p1"]
+    assert get_profile_account("p2", awscli_config).alias == "my-alias"
+    assert get_profile_account("p3", awscli_config) is None
+
+    # the urls are built from the directory, even if the identity cache is empty
+    invalidate_identity(awscli_config=awscli_config)
+    calls.clear()
+    assert (
+        get_sign_in_url("p1", awscli_config=awscli_config)
+        == "https://444455556666.signin.aws.amazon.com/console/"
+    )
+    url = get_switch_role_url("p2", awscli_config=awscli_config)
+    assert "displayName=fake-role-name@my-alias" in url
+    assert calls == []
+
+    # search by account alias and account id
+    pairs = awscli_config.extract_profile_and_region_pairs()
+    for query in ["my-alias", "111122223333"]:
+        assert sort_profile_region_pairs(pairs, query, directory)[0][0] == "p2"
+        assert get_sorted_profile_region_pairs(query, awscli_config)[0][0] == "p2"
+        assert next(iter_sorted_profile_region_pairs(query, awscli_config))[0] == "p2"
+    assert get_sorted_profile_region_pairs("4444", awscli_config)[0][0] == "p1"
+    # the profile name still matches
+    assert get_sorted_profile_region_pairs("p3", awscli_config)[0][0] == "p3"
+
+    # the entry is ignored once the profile is pointed to another role
+    assert data["sources"]["p2"] == "arn:aws:iam::111122223333:role/fake-role-name"
+    with awscli_config.transaction() as tx:
+        section = dict(tx.config["profile p2"])
+        section["role_arn"] = "arn:aws:iam::777788889999:role/other"
+        tx.upsert_section(tx.config, "profile p2", section)
+    assert get_profile_account("p2", awscli_config) is None
+    assert get_profile_account("p1", awscli_config).account_id == "444455556666"
+    url = get_switch_role_url("p2", awscli_config=awscli_config, offline=True)
+    assert "account=777788889999" in url
+
+    # the old directory file is ignored
+    data["version"] = 1
+    get_path_directory(awscli_config).write_text(json.dumps(data))
+    assert load_account_directory(awscli_config) is None
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.directory", preview=False)
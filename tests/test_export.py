@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+import io
+import csv
+import json
+
+import pytest
+import botocore.exceptions
+
+import awscli_mate.identity as identity_module
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.identity import Identity
+from awscli_mate.export import (
+    ExportFormatEnum,
+    call_with_backoff,
+    select_profiles,
+    iter_url_records,
+    export_urls,
+)
+
+
+def throttling_error() -> botocore.exceptions.ClientError:
+    return botocore.exceptions.ClientError(
+        {"Error": {"Code": "Throttling", "Message": "Rate exceeded"}},
+        "GetCallerIdentity",
+    )
+
+
+def test_call_with_backoff():
+    delays = []
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) < 3:
+            raise throttling_error()
+        return "ok"
+
+    assert call_with_backoff(func, base_delay=1, sleep=delays.append) == "ok"
+    assert len(calls) == 3
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= 1
+    assert 0 <= delays[1] <= 2
+
+    # give up after max attempts
+    calls.clear()
+    with pytest.raises(botocore.exceptions.ClientError):
+        call_with_backoff(func, max_attempts=2, sleep=delays.append)
+    assert len(calls) == 2
+
+    # other errors are not retried
+    def bad():
+        calls.append(1)
+        raise ValueError("bad")
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        call_with_backoff(bad, sleep=delays.append)
+    assert len(calls) == 1
+
+
+def test_select_profiles(awscli_config: AWSCliConfig):
+    assert [profile for profile, _ in select_profiles(awscli_config)] == [
+        "p1",
+        "p2",
+        "p3",
+    ]
+    assert select_profiles(awscli_config, ["p3", "x*"]) == [("p3", "us-east-3")]
+    assert len(select_profiles(awscli_config, ["p*"])) == 3
+
+
+def test_export_urls(awscli_config: AWSCliConfig, monkeypatch):
+    calls = []
+
+    def fetch_identity(profile, awscli_config, timeout):
+        calls.append(profile)
+        if profile == "p1" and calls.count("p1") == 1:
+            raise throttling_error()
+        if profile == "p3":
+            raise ValueError("no credentials")
+        return Identity(
+            account_id="444455556666",
+            arn="arn:aws:iam::444455556666:user/alice",
+            alias="my-alias" if profile == "p2" else None,
+        )
+
+    monkeypatch.setattr(identity_module, "fetch_identity", fetch_identity)
+
+    records = list(
+        iter_url_records(awscli_config=awscli_config, max_workers=3, base_delay=0.01)
+    )
+    assert [record.profile for record in records] == ["p1", "p2", "p3"]
+    p1, p2, p3 = records
+    # throttled, then retried
+    assert p1.ok
+    assert calls.count("p1") == 2
+    assert p1.sign_in_url == "https://444455556666.signin.aws.amazon.com/console/"
+    assert p1.switch_role_url is None
+    # the switch role url is built from the role_arn
+    assert p2.sign_in_url == "https://my-alias.signin.aws.amazon.com/console/"
+    assert "account=111122223333" in p2.switch_role_url
+    assert p3.ok is False
+    assert "no credentials" in p3.error
+
+    # the identities are cached now, no more calls except the failed one
+    calls.clear()
+    f = io.StringIO()
+    assert export_urls(f, awscli_config=awscli_config) == 3
+    lines = [json.loads(line) for line in f.getvalue().splitlines()]
+    assert [line["profile"] for line in lines] == ["p1", "p2", "p3"]
+    assert calls == ["p3"]
+
+    f = io.StringIO()
+    assert export_urls(f, fmt=ExportFormatEnum.csv, awscli_config=awscli_config) == 3
+    rows = list(csv.DictReader(io.StringIO(f.getvalue())))
+    assert rows[1]["sign_in_url"] == p2.sign_in_url
+
+    f = io.StringIO()
+    n = export_urls(
+        f,
+        fmt=ExportFormatEnum.html,
+        profiles=["p2", "p3"],
+        awscli_config=awscli_config,
+    )
+    assert n == 1
+    content = f.getvalue()
+    assert content.startswith("<!DOCTYPE NETSCAPE-Bookmark-file-1>")
+    assert "p2 | us-east-2 | switch role" in content
+    assert "&amp;account=111122223333" in content
+    assert "p3" not in content
+
+    with pytest.raises(ValueError):
+        export_urls(f, fmt="xml", awscli_config=awscli_config)
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.export", preview=False)
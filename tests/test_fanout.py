@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.fanout import find_role_targets, assume_roles_from_mfa_session
+from awscli_mate import exc
+
+
+class FakeSTSClient:
+    def __init__(self, credentials: dict, calls: list, lock: threading.Lock):
+        self.credentials = credentials
+        self.calls = calls
+        self.lock = lock
+
+    def assume_role(self, RoleArn: str, RoleSessionName: str, **kwargs):
+        with self.lock:
+            self.calls.append((self.credentials["aws_access_key_id"], RoleArn))
+        if "denied" in RoleArn:
+            raise PermissionError("AccessDenied")
+        return {
+            "Credentials": {
+                "AccessKeyId": f"KEY-{RoleArn.split('/')[-1]}",
+                "SecretAccessKey": "secret",
+                "SessionToken": "token",
+                "Expiration": datetime.now(timezone.utc) + timedelta(hours=1),
+            }
+        }
+
+
+def setup_roles(awscli_config: AWSCliConfig):
+    def role(name: str, source_profile: str) -> dict:
+        return {
+            "role_arn": f"arn:aws:iam::111122223333:role/{name}",
+            "source_profile": source_profile,
+        }
+
+    with awscli_config.transaction() as tx:
+        tx.upsert_section(tx.config, "profile p4", role("p4", "p1"))
+        tx.upsert_section(tx.config, "profile p5", role("p5", "p4"))
+        tx.upsert_section(tx.config, "profile p6", role("denied", "p1"))
+        tx.upsert_section(tx.config, "profile p7", role("p7", "p6"))
+        tx.upsert_section(tx.config, "profile p8", role("p8", "p1_mfa"))
+        tx.upsert_section(tx.config, "profile p9", role("p9", "p3"))
+        tx.upsert_credentials(
+            "p1_mfa",
+            "MFA",
+            "MFA",
+            "MFA",
+            expiration=datetime.now(timezone.utc) + timedelta(hours=1),
+        )
+        # the hand written keys of an existing section are kept
+        tx.upsert_section(tx.config, "profile p4_mfa", {"output": "text"})
+
+
+def test_find_role_targets(awscli_config: AWSCliConfig):
+    setup_roles(awscli_config)
+    targets = find_role_targets(awscli_config, profile="p1")
+    depth = {target.new_profile: target.depth for target in targets}
+    assert depth == {
+        "p2_mfa": 1,
+        "p4_mfa": 1,
+        "p6_mfa": 1,
+        "p8_mfa": 1,
+        "p5_mfa": 2,
+        "p7_mfa": 2,
+    }
+
+    # the parent role is included automatically
+    targets = find_role_targets(
+        awscli_config,
+        profile="p1",
+        profiles=["p5"],
+        role_arns={"other": "arn:aws:iam::444455556666:role/other"},
+    )
+    assert [target.new_profile for target in targets] == ["p4_mfa", "other", "p5_mfa"]
+    assert targets[2].source == "p4_mfa"
+
+    with pytest.raises(exc.ProfileNotFoundError):
+        find_role_targets(awscli_config, profile="p1", profiles=["p9"])
+
+
+def test_assume_roles_from_mfa_session(awscli_config: AWSCliConfig):
+    with pytest.raises(exc.ProfileNotFoundError):
+        assume_roles_from_mfa_session("p1", awscli_config=awscli_config)
+
+    setup_roles(awscli_config)
+    calls = []
+    lock = threading.Lock()
+    results = assume_roles_from_mfa_session(
+        "p1",
+        max_workers=4,
+        awscli_config=awscli_config,
+        get_sts_client=lambda credentials: FakeSTSClient(credentials, calls, lock),
+    )
+    status = {result.target.new_profile: result.ok for result in results}
+    assert status == {
+        "p2_mfa": True,
+        "p4_mfa": True,
+        "p6_mfa": False,
+        "p8_mfa": True,
+        "p5_mfa": True,
+        "p7_mfa": False,
+    }
+    # the chained role is assumed with the credentials of its source role
+    assert ("KEY-p4", "arn:aws:iam::111122223333:role/p5") in calls
+    assert len(calls) == 5
+
+    config, credentials = awscli_config.read_config()
+    assert credentials["p5_mfa"]["aws_access_key_id"] == "KEY-p5"
+    assert awscli_config.is_session_valid("p5_mfa")
+    assert config["profile p2_mfa"]["region"] == "us-east-2"
+    assert config["profile p4_mfa"]["region"] == "us-east-1"
+    assert config["profile p4_mfa"]["output"] == "text"
+    assert "p6_mfa" not in credentials
+
+    # the existing region is not overwritten
+    with awscli_config.transaction() as tx:
+        tx.upsert_section(tx.config, "profile p2_mfa", {"region": "eu-west-1"})
+    assume_roles_from_mfa_session(
+        "p1",
+        awscli_config=awscli_config,
+        get_sts_client=lambda credentials: FakeSTSClient(credentials, calls, lock),
+    )
+    config, _ = awscli_config.read_config()
+    assert config["profile p2_mfa"]["region"] == "eu-west-1"
+
+    # the expired MFA session is rejected before any AssumeRole call
+    with awscli_config.transaction() as tx:
+        tx.upsert_credentials(
+            "p1_mfa",
+            "MFA",
+            "MFA",
+            "MFA",
+            expiration=datetime.now(timezone.utc) - timedelta(minutes=1),
+        )
+    n_calls = len(calls)
+    with pytest.raises(exc.SessionExpiredError):
+        assume_roles_from_mfa_session(
+            "p1",
+            awscli_config=awscli_config,
+            get_sts_client=lambda credentials: FakeSTSClient(credentials, calls, lock),
+        )
+    assert len(calls) == n_calls
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.fanout", preview=False)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+from pathlib import Path
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.fleet import (
+    resolve_homes,
+    fleet_set_profile_as_default,
+    fleet_upsert_profile,
+)
+
+dir_here = Path(__file__).absolute().parent
+
+
+def make_homes(tmp_path: Path, n: int) -> Path:
+    dir_root = tmp_path / "runners"
+    for i in range(1, 1 + n):
+        shutil.copytree(dir_here / "home" / ".aws", dir_root / f"runner-{i}" / ".aws")
+    # a runner without the credentials file
+    shutil.copytree(
+        dir_here / "home" / ".aws_no_credentials", dir_root / "runner-bad" / ".aws"
+    )
+    return dir_root
+
+
+def test_resolve_homes(tmp_path):
+    dir_root = make_homes(tmp_path, 2)
+    assert len(resolve_homes(str(dir_root / "runner-*"))) == 3
+    assert resolve_homes([dir_root / "runner-1", dir_root / "runner-1"]) == [
+        dir_root / "runner-1"
+    ]
+    assert resolve_homes(dir_root / "not-exists") == []
+
+
+def test_fleet_set_profile_as_default(tmp_path):
+    dir_root = make_homes(tmp_path, 3)
+    report = fleet_set_profile_as_default(
+        homes=str(dir_root / "runner-*"),
+        profile="p1",
+        max_workers=2,
+    )
+    assert len(report.results) == 4
+    assert len(report.succeeded) == 3
+    assert len(report.failed) == 1
+    assert report.failed[0].dir_home.endswith("runner-bad")
+    assert "AWSCredentialsFileNotExistError" in report.failed[0].error
+    assert report.to_dict()["failed"] == 1
+    for result in report.succeeded:
+        assert result.changed is True
+        assert result.elapsed > 0
+        config, credentials = AWSCliConfig.from_home(result.dir_home).read_config()
+        assert dict(config["default"]) == dict(config["profile p1"])
+
+    # run again, nothing changed
+    report = fleet_set_profile_as_default(
+        homes=[dir_root / "runner-1", dir_root / "runner-2"],
+        profile="p1",
+        max_workers=1,
+    )
+    assert [result.changed for result in report.results] == [False, False]
+
+
+def test_fleet_upsert_profile(tmp_path):
+    dir_root = make_homes(tmp_path, 2)
+    report = fleet_upsert_profile(
+        homes=[dir_root / "runner-1", dir_root / "runner-2"],
+        profile="p9",
+        config={"region": "eu-west-1"},
+        credentials={"aws_access_key_id": "AAA", "aws_secret_access_key": "BBB"},
+    )
+    assert len(report.succeeded) == 2
+    for result in report.results:
+        config, credentials = AWSCliConfig.from_home(result.dir_home).read_config()
+        assert config["profile p9"]["region"] == "eu-west-1"
+        assert credentials["p9"]["aws_access_key_id"] == "AAA"
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.fleet", preview=False)
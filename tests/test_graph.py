@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from awscli_mate import exc
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.catalog import CatalogEntry
+from awscli_mate.graph import (
+    ProfileGraph,
+    profile_graph_cache,
+    stream_profile_and_region_pairs,
+)
+
+
+def make_graph(sections: dict) -> ProfileGraph:
+    return ProfileGraph.from_entries(
+        [CatalogEntry.from_section(section, data) for section, data in sections.items()]
+    )
+
+
+def test_profile_graph():
+    graph = make_graph(
+        {
+            "default": {"region": "us-east-1"},
+            "profile base": {"region": "us-west-2"},
+            "profile role_1": {"role_arn": "arn", "source_profile": "base"},
+            "profile role_2": {
+                "role_arn": "arn",
+                "source_profile": "role_1 # comment",
+                "region": "eu-west-1",
+            },
+            "profile role_3": {"role_arn": "arn", "source_profile": "role_2"},
+            "profile from_default": {"role_arn": "arn", "source_profile": "default"},
+            "profile ec2": {"role_arn": "arn", "credential_source": "Ec2InstanceMetadata"},
+            "profile self": {"role_arn": "arn", "source_profile": "self"},
+            "profile cycle_1": {"role_arn": "arn", "source_profile": "cycle_2"},
+            "profile cycle_2": {"role_arn": "arn", "source_profile": "cycle_1"},
+            "profile to_cycle": {"role_arn": "arn", "source_profile": "cycle_1"},
+            "profile broken": {"role_arn": "arn", "source_profile": "not_exists"},
+            "profile to_broken": {"role_arn": "arn", "source_profile": "broken"},
+            "sso-session my_sso": {"sso_region": "us-east-1"},
+            "profile sso": {"sso_session": "my_sso", "region": "us-east-2"},
+            "profile bad_sso": {"sso_session": "not_exists"},
+        }
+    )
+
+    assert graph.effective_region("role_1") == "us-west-2"
+    assert graph.effective_region("role_3") == "eu-west-1"
+    assert graph.effective_region("from_default") == "us-east-1"
+    assert graph.effective_region("ec2") is None
+
+    assert graph.root_profile("base") == "base"
+    assert graph.root_profile("role_3") == "base"
+    assert graph.root_profile("from_default") == "default"
+    assert graph.root_profile("ec2") == "ec2"
+    assert graph.root_profile("self") == "self"
+
+    assert graph.chain_depth("base") == 0
+    assert graph.chain_depth("role_1") == 1
+    assert graph.chain_depth("role_3") == 3
+    assert graph.chain_depth("ec2") == 1
+    assert graph.chain_depth("self") == 1
+
+    for profile in ["cycle_1", "cycle_2", "to_cycle"]:
+        assert graph.is_cyclic(profile) is True
+        with pytest.raises(exc.ProfileChainCycleError):
+            graph.root_profile(profile)
+        with pytest.raises(exc.ProfileChainCycleError):
+            graph.chain_depth(profile)
+    assert graph.is_cyclic("role_3") is False
+
+    for profile in ["broken", "to_broken"]:
+        assert graph.is_broken(profile) is True
+        assert graph.root_profile(profile) is None
+        assert graph.chain_depth(profile) is None
+    assert graph.is_broken("role_3") is False
+
+    assert graph.source_profile("role_2") == "role_1"
+    assert graph.source_profile("self") is None
+    assert graph.source_profile("base") is None
+
+    assert graph.sso_session("sso") == "my_sso"
+    assert graph.sso_session("bad_sso") is None
+    assert graph.sso_session("base") is None
+
+    with pytest.raises(exc.ProfileNotFoundError):
+        graph.effective_region("my_sso")
+
+    pairs = list(graph.iter_profile_and_region_pairs())
+    assert pairs[0] == ("base", "us-west-2")
+    assert ("ec2", "unknown-region") in pairs
+
+
+def test_long_chain():
+    n = 10000
+    sections = {"profile p0": {"region": "us-east-1"}}
+    for i in range(1, n):
+        sections[f"profile p{i}"] = {"role_arn": "arn", "source_profile": f"p{i - 1}"}
+    graph = make_graph(sections)
+    assert graph.chain_depth(f"p{n - 1}") == n - 1
+    assert graph.root_profile(f"p{n - 1}") == "p0"
+    assert graph.effective_region(f"p{n - 1}") == "us-east-1"
+
+
+def test_stream_profile_and_region_pairs():
+    sections = {
+        "profile forward": {"role_arn": "arn", "source_profile": "base"},
+        "default": {"region": "us-east-1"},
+        "profile from_default": {"role_arn": "arn", "source_profile": "default"},
+        "profile base": {"region": "us-west-2"},
+        "profile role_1": {"role_arn": "arn", "source_profile": "base"},
+        "profile role_2": {"role_arn": "arn", "source_profile": "role_1"},
+        "profile cycle_1": {"source_profile": "cycle_2"},
+        "profile cycle_2": {"source_profile": "cycle_1", "region": "eu-west-1"},
+        "profile to_cycle": {"source_profile": "cycle_2"},
+        "profile broken": {"source_profile": "not_exists"},
+        "profile ec2": {"role_arn": "arn", "credential_source": "Ec2InstanceMetadata"},
+    }
+    entries = [
+        CatalogEntry.from_section(section, data) for section, data in sections.items()
+    ]
+    graph = ProfileGraph.from_entries(entries)
+    assert list(stream_profile_and_region_pairs(entries)) == list(
+        graph.iter_profile_and_region_pairs()
+    )
+    assert ("forward", "us-west-2") in graph.iter_profile_and_region_pairs()
+
+    # the pairs are yielded before the rest of the file is parsed
+    consumed = []
+
+    def iter_entries():
+        for entry in entries[1:]:
+            consumed.append(entry.name)
+            yield entry
+
+    stream = stream_profile_and_region_pairs(iter_entries())
+    assert next(stream) == ("from_default", "us-east-1")
+    assert consumed == ["default", "from_default"]
+
+
+def test_get_profile_graph(awscli_config: AWSCliConfig):
+    profile_graph_cache.clear()
+    graph = awscli_config.get_profile_graph()
+    assert awscli_config.get_profile_graph() is graph
+    assert profile_graph_cache.stats.hits == 1
+    assert graph.root_profile("p2") == "p1"
+
+    # role profile without region inherits the region of the source profile
+    with awscli_config.transaction() as tx:
+        tx.upsert_section(
+            tx.config,
+            "profile p4",
+            {"role_arn": "arn:aws:iam::111122223333:role/r", "source_profile": "p3"},
+        )
+    assert awscli_config.get_profile_graph() is not graph
+    assert awscli_config.extract_profile_and_region_pairs()[-1] == ("p4", "us-east-3")
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.graph", preview=False)
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+
+import typing as T
+import time
+import threading
+from concurrent.futures import wait
+
+import pytest
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.identity import (
+    Identity,
+    IdentityCache,
+    IdentityFetch,
+    get_identity_cache_key,
+    fetch_identity,
+    get_identity,
+    get_sign_in_account,
+    invalidate_identity,
+)
+from awscli_mate import exc
+from awscli_mate.url import get_sign_in_url, get_switch_role_url
+from awscli_mate import identity as identity_module
+
+
+def test_get_identity_cache_key(awscli_config: AWSCliConfig):
+    assert get_identity_cache_key("p1", awscli_config) == "AAA"
+    assert (
+        get_identity_cache_key("p2", awscli_config)
+        == "arn:aws:iam::111122223333:role/fake-role-name"
+    )
+    assert get_identity_cache_key("p3", awscli_config) == "CCC"
+    assert get_identity_cache_key("default", awscli_config) == "ZZZ"
+    assert get_identity_cache_key("not_exists", awscli_config) is None
+
+
+def test_identity_cache(tmp_path):
+    cache = IdentityCache(path=tmp_path / "identity", ttl=60)
+    assert cache.get("AAA") is None
+    assert cache.invalidate() is False
+
+    identity = Identity(
+        account_id="111122223333",
+        arn="arn:aws:iam::111122223333:user/alice",
+    )
+    cache.set("AAA", identity)
+    assert cache.get("AAA") == identity
+    assert cache.get("AAA").principal_name == "alice"
+
+    # expired entries are ignored and dropped on write
+    cache.set("BBB", Identity("1", "arn", created_at=time.time() - 120))
+    assert cache.get("BBB") is None
+    cache.set("CCC", identity)
+    assert "BBB" not in cache._load()
+
+    assert cache.invalidate("AAA") is True
+    assert cache.invalidate("AAA") is False
+    assert cache.get("CCC") == identity
+    assert cache.invalidate() is True
+    assert cache.get("CCC") is None
+
+    (tmp_path / "identity").write_text("not a json")
+    assert cache.get("CCC") is None
+
+
+def test_identity_cache_batch(tmp_path, monkeypatch):
+    cache = IdentityCache(path=tmp_path / "identity", ttl=60)
+    dumps = []
+    dump = cache._dump
+    monkeypatch.setattr(cache, "_dump", lambda entries: dumps.append(dump(entries)))
+
+    identity = Identity(account_id="1", arn="arn")
+    cache.set_many({})
+    assert dumps == []
+    cache.set_many({"AAA": identity, "BBB": identity})
+    assert len(dumps) == 1
+    assert cache.get("AAA") == identity and cache.get("BBB") == identity
+
+    # the writes in the batch are visible at once, and written once on exit
+    with cache.batch():
+        for key in ["CCC", "DDD", "EEE"]:
+            cache.set(key, identity)
+        assert cache.get("CCC") == identity
+        assert len(dumps) == 1
+        assert "CCC" not in cache._load()
+    assert len(dumps) == 2
+    assert sorted(cache._load()) == ["AAA", "BBB", "CCC", "DDD", "EEE"]
+
+    # nothing to write
+    with cache.batch():
+        assert cache.get("AAA") == identity
+    assert len(dumps) == 2
+
+
+def test_get_identity(awscli_config: AWSCliConfig, monkeypatch):
+    calls = []
+
+    def fetch_identity(
+        profile: str,
+        awscli_config: AWSCliConfig,
+        timeout: float,
+    ) -> Identity:
+        calls.append(profile)
+        if profile == "p2":
+            return Identity(
+                account_id="111122223333",
+                arn="arn:aws:sts::111122223333:assumed-role/fake-role-name/session",
+                alias="my-alias",
+            )
+        return Identity(
+            account_id="444455556666",
+            arn="arn:aws:iam::444455556666:user/alice",
+        )
+
+    monkeypatch.setattr(identity_module, "fetch_identity", fetch_identity)
+
+    assert get_identity("p1", awscli_config).account_id == "444455556666"
+    assert get_identity("p1", awscli_config).account_id == "444455556666"
+    assert calls == ["p1"]
+
+    # all callers share the same cache
+    assert (
+        get_sign_in_url("p1", awscli_config=awscli_config)
+        == "https://444455556666.signin.aws.amazon.com/console/"
+    )
+    assert (
+        get_sign_in_url("p2", awscli_config=awscli_config)
+        == "https://my-alias.signin.aws.amazon.com/console/"
+    )
+    url = get_switch_role_url("p2", awscli_config=awscli_config)
+    assert "roleName=fake-role-name" in url
+    assert "account=111122223333" in url
+    assert "displayName=fake-role-name@my-alias" in url
+    assert calls == ["p1", "p2"]
+
+    # ttl
+    get_identity("p1", awscli_config, ttl=0)
+    assert calls == ["p1", "p2", "p1"]
+
+    # invalidate
+    assert invalidate_identity("p1", awscli_config) is True
+    assert invalidate_identity("not_exists", awscli_config) is False
+    get_identity("p1", awscli_config)
+    assert calls == ["p1", "p2", "p1", "p1"]
+    assert invalidate_identity(awscli_config=awscli_config) is True
+    get_identity("p2", awscli_config)
+    assert calls == ["p1", "p2", "p1", "p1", "p2"]
+
+
+class FakeClient:
+    """
+    :param gate: if given, the call blocks until the gate is passed, it is
+        a ``threading.Event`` or a ``threading.Barrier``.
+    """
+
+    def __init__(self, gate, response: dict, calls: list):
+        self.gate = gate
+        self.response = response
+        self.calls = calls
+
+    def _call(self, name: str) -> dict:
+        self.calls.append((name, threading.current_thread().name))
+        if isinstance(self.gate, threading.Barrier):
+            self.gate.wait()
+        elif self.gate is not None:
+            assert self.gate.wait(5)
+        return self.response
+
+    def get_caller_identity(self):
+        return self._call("get_caller_identity")
+
+    def list_account_aliases(self):
+        return self._call("list_account_aliases")
+
+
+class FakeSession:
+    def __init__(self, sts_gate, iam_gate, alias: str, calls: list):
+        self.clients = {
+            "sts": FakeClient(
+                sts_gate,
+                {"Account": "111122223333", "Arn": "arn:aws:iam::111122223333:user/a"},
+                calls,
+            ),
+            "iam": FakeClient(
+                iam_gate,
+                {"AccountAliases": [alias] if alias else []},
+                calls,
+            ),
+        }
+
+    def client(self, service_name: str):
+        return self.clients[service_name]
+
+
+def patch_session(monkeypatch, sts_gate=None, iam_gate=None, alias="my-alias") -> list:
+    calls = []
+    session = FakeSession(sts_gate, iam_gate, alias, calls)
+    monkeypatch.setattr(
+        identity_module,
+        "get_client",
+        lambda service_name, profile, awscli_config: session.client(service_name),
+    )
+    return calls
+
+
+def track_fetches(monkeypatch, wait_done: bool = False) -> T.List[IdentityFetch]:
+    """
+    Record the started :class:`IdentityFetch`, so the test can join them.
+
+    :param wait_done: if True, both calls are done when the fetch is returned.
+    """
+    fetches = []
+    start = IdentityFetch.start.__func__
+
+    def tracked_start(cls, profile, awscli_config):
+        fetch = start(cls, profile, awscli_config)
+        fetches.append(fetch)
+        if wait_done:
+            wait(fetch.futures)
+        return fetch
+
+    monkeypatch.setattr(IdentityFetch, "start", classmethod(tracked_start))
+    return fetches
+
+
+def test_principal_name():
+    cases = [
+        ("arn:aws:iam::111122223333:user/alice", "alice"),
+        ("arn:aws:iam::111122223333:user/team/alice", "alice"),
+        ("arn:aws:iam::111122223333:role/path/to/admin-role", "admin-role"),
+        ("arn:aws:sts::111122223333:assumed-role/admin-role/session", "admin-role"),
+        ("arn:aws:iam::111122223333:root", "root"),
+    ]
+    for arn, name in cases:
+        assert Identity(account_id="111122223333", arn=arn).principal_name == name
+
+
+def test_get_sign_in_account_race_cache_once(
+    awscli_config: AWSCliConfig,
+    monkeypatch,
+):
+    # both calls finish before the callbacks are registered, so both
+    # callbacks see both calls done
+    fetches = track_fetches(monkeypatch, wait_done=True)
+    patch_session(monkeypatch)
+    writes = []
+    original_set = identity_module.IdentityCache.set
+
+    def set(self, key, identity):
+        writes.append(key)
+        original_set(self, key, identity)
+
+    monkeypatch.setattr(identity_module.IdentityCache, "set", set)
+    for _ in range(10):
+        invalidate_identity(awscli_config=awscli_config)
+        writes.clear()
+        account = get_sign_in_account("p1", awscli_config, race=True)
+        assert account in ("my-alias", "111122223333")
+        # wait for the background cache write
+        fetches[-1].join()
+        assert len(writes) == 1
+    invalidate_identity(awscli_config=awscli_config)
+
+
+def test_fetch_identity_concurrently(awscli_config: AWSCliConfig, monkeypatch):
+    fetches = track_fetches(monkeypatch)
+    # both calls must be in flight at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    calls = patch_session(monkeypatch, sts_gate=barrier, iam_gate=barrier)
+    identity = fetch_identity("p1", awscli_config)
+    assert identity.account_id == "111122223333"
+    assert identity.alias == "my-alias"
+    assert len({thread_name for _, thread_name in calls}) == 2
+
+    # the two calls share the timeout
+    gate = threading.Event()
+    patch_session(monkeypatch, sts_gate=gate, iam_gate=gate)
+    with pytest.raises(exc.IdentityLookupTimeoutError):
+        fetch_identity("p1", awscli_config, timeout=0.05)
+    # let the abandoned calls finish
+    gate.set()
+    fetches[-1].join()
+
+
+def test_get_sign_in_account_race(awscli_config: AWSCliConfig, monkeypatch):
+    fetches = track_fetches(monkeypatch)
+
+    # the account id wins the race, the alias call is blocked until then
+    gate = threading.Event()
+    patch_session(monkeypatch, iam_gate=gate)
+    assert get_sign_in_account("p1", awscli_config, race=True) == "111122223333"
+    # the identity is cached in background when both calls finish
+    gate.set()
+    fetches[-1].join()
+    calls = patch_session(monkeypatch)
+    assert get_sign_in_account("p1", awscli_config, race=True) == "my-alias"
+    assert calls == []
+
+    # the alias wins the race
+    gate = threading.Event()
+    patch_session(monkeypatch, sts_gate=gate)
+    assert get_sign_in_account("p3", awscli_config, race=True) == "my-alias"
+    gate.set()
+    fetches[-1].join()
+
+    # no alias, wait for the account id
+    gate = threading.Event()
+    patch_session(monkeypatch, sts_gate=gate, alias=None)
+    threading.Timer(0.01, gate.set).start()
+    assert get_sign_in_account("default", awscli_config, race=True) == "111122223333"
+    fetches[-1].join()
+
+    # timeout
+    gate = threading.Event()
+    patch_session(monkeypatch, sts_gate=gate, iam_gate=gate)
+    invalidate_identity(awscli_config=awscli_config)
+    with pytest.raises(exc.IdentityLookupTimeoutError):
+        get_sign_in_account("p1", awscli_config, timeout=0.05, race=True)
+    # let the abandoned calls finish, they still cache the identity
+    gate.set()
+    fetches[-1].join()
+    calls = patch_session(monkeypatch)
+    assert get_sign_in_account("p1", awscli_config, race=True) == "my-alias"
+    assert calls == []
+    invalidate_identity(awscli_config=awscli_config)
+
+    # no race
+    patch_session(monkeypatch)
+    assert get_sign_in_account("p1", awscli_config) == "my-alias"
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.identity", preview=False)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from awscli_mate import exc
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.lock import fcntl, file_lock, lock_stats
+
+requires_fcntl = pytest.mark.skipif(
+    fcntl is None, reason="file_lock is a no-op without fcntl (Windows)"
+)
+
+
+@requires_fcntl
+def test_file_lock(tmp_path):
+    path = tmp_path / "config"
+    lock_stats.reset()
+
+    # shared locks don't block each other, re-enter is allowed
+    with file_lock(path):
+        with file_lock(path, timeout=0):
+            pass
+        with pytest.raises(RuntimeError):
+            with file_lock(path, exclusive=True):
+                pass
+
+    # exclusive lock held by another thread blocks us
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with file_lock(path, exclusive=True):
+            acquired.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    acquired.wait()
+    with pytest.raises(exc.LockTimeoutError):
+        with file_lock(path, timeout=0.05):
+            pass
+    threading.Timer(0.05, release.set).start()
+    with file_lock(path, timeout=5) as wait:
+        assert wait > 0
+    thread.join()
+
+    assert lock_stats.timeouts == 1
+    assert lock_stats.acquired == 3
+    assert lock_stats.max_wait >= wait
+    assert lock_stats.avg_wait > 0
+
+
+def _add_profile(args):
+    awscli_config, i = args
+    with awscli_config.transaction() as tx:
+        tx.copy_section_data(
+            tx.config,
+            from_section_name="profile p1",
+            to_section_name=f"profile p1_{i}",
+            create_if_not_exist=True,
+        )
+        tx.upsert_credentials(f"p1_{i}", "AAA", "AAA")
+
+
+@requires_fcntl
+def test_no_lost_update(awscli_config: AWSCliConfig):
+    n = 8
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_add_profile, [(awscli_config, i) for i in range(n)]))
+    config, credentials = awscli_config.read_config()
+    for i in range(n):
+        assert f"profile p1_{i}" in config
+        assert f"p1_{i}" in credentials
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.lock", preview=False)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.pool import SessionPool
+
+
+def test_session_pool(awscli_config: AWSCliConfig):
+    pool = SessionPool(max_sessions=2, max_clients=3)
+
+    # the session and the clients are re-used
+    session = pool.get_session("p1", awscli_config)
+    assert session.region_name == "us-east-1"
+    assert pool.get_session("p1", awscli_config) is session
+    sts = pool.get_client("sts", "p1", awscli_config=awscli_config)
+    assert pool.get_client("sts", "p1", awscli_config=awscli_config) is sts
+    assert pool.stats.hits == 1
+    assert pool.stats.misses == 1
+    assert sts.meta.region_name == "us-east-1"
+
+    # the region is part of the key
+    sts_eu = pool.get_client("sts", "p1", "eu-west-1", awscli_config)
+    assert sts_eu is not sts
+    assert sts_eu.meta.region_name == "eu-west-1"
+
+    # the clients are created concurrently, without breaking the pool
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        clients = list(
+            executor.map(
+                lambda _: pool.get_client("iam", "p1", awscli_config=awscli_config),
+                range(8),
+            )
+        )
+    clients = {id(client) for client in clients}
+    assert 1 <= len(clients) <= 4
+    assert pool.get_client("iam", "p1", awscli_config=awscli_config) is not None
+
+    # LRU eviction
+    assert len(pool._clients) == 3
+    pool.get_session("p2", awscli_config)
+    pool.get_session("p3", awscli_config)
+    assert len(pool._sessions) == 2
+    assert pool.get_session("p1", awscli_config) is not session
+
+    # the config version changed, the session and the clients are dropped
+    session = pool.get_session("p1", awscli_config)
+    sts = pool.get_client("sts", "p1", awscli_config=awscli_config)
+    awscli_config.set_profile_as_default("p2")
+    assert pool.get_session("p1", awscli_config) is not session
+    assert pool.get_client("sts", "p1", awscli_config=awscli_config) is not sts
+
+    pool.clear()
+    assert len(pool._sessions) == 0
+    assert len(pool._clients) == 0
+    assert pool.stats.total == 0
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.pool", preview=False)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+import json
+from datetime import datetime, timezone, timedelta
+
+import boto3
+from botocore.stub import Stubber
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.role_cache import (
+    get_assume_role_kwargs,
+    get_cache_key,
+    get_seconds_remaining,
+    new_boto_session,
+    WarmStatusEnum,
+    warm_role_cache,
+)
+
+
+def test_get_cache_key():
+    kwargs = get_assume_role_kwargs(
+        {
+            "role_arn": "arn:aws:iam::111122223333:role/my-role",
+            "duration_seconds": "3600",
+            "external_id": "abc",
+        }
+    )
+    assert kwargs == {
+        "RoleArn": "arn:aws:iam::111122223333:role/my-role",
+        "DurationSeconds": 3600,
+        "ExternalId": "abc",
+    }
+    key = get_cache_key(kwargs)
+    assert len(key) == 40
+    assert key == get_cache_key(dict(reversed(list(kwargs.items()))))
+
+
+def make_response(access_key: str, hours: float) -> dict:
+    return {
+        "Credentials": {
+            "AccessKeyId": access_key,
+            "SecretAccessKey": "secret",
+            "SessionToken": "token",
+            "Expiration": datetime.now(timezone.utc) + timedelta(hours=hours),
+        },
+        "AssumedRoleUser": {
+            "AssumedRoleId": "AROAEXAMPLE:awscli-mate-p4",
+            "Arn": "arn:aws:sts::444455556666:assumed-role/my-role/awscli-mate-p4",
+        },
+    }
+
+
+def test_warm_role_cache(awscli_config: AWSCliConfig):
+    with awscli_config.transaction() as tx:
+        tx.upsert_section(
+            tx.config,
+            "profile p4",
+            {
+                "region": "us-east-1",
+                "role_arn": "arn:aws:iam::444455556666:role/my-role",
+                "source_profile": "p1",
+            },
+        )
+        tx.upsert_section(
+            tx.config,
+            "profile p5",
+            {
+                "role_arn": "arn:aws:iam::444455556666:role/my-role",
+                "source_profile": "p1",
+                "mfa_serial": "arn:aws:iam::111122223333:mfa/me",
+            },
+        )
+
+    sts = boto3.client(
+        "sts",
+        region_name="us-east-1",
+        aws_access_key_id="AAA",
+        aws_secret_access_key="AAA",
+    )
+    stubber = Stubber(sts)
+    calls = []
+
+    def get_sts_client(source_profile: str):
+        calls.append(source_profile)
+        return sts
+
+    with stubber:
+        stubber.add_response(
+            "assume_role",
+            make_response("ASIAP2EXAMPLEKEY", hours=1),
+            {
+                "RoleArn": "arn:aws:iam::111122223333:role/fake-role-name",
+                "RoleSessionName": "awscli-mate-p2",
+            },
+        )
+        stubber.add_response(
+            "assume_role",
+            make_response("ASIAP4EXAMPLEKEY", hours=1),
+            {
+                "RoleArn": "arn:aws:iam::444455556666:role/my-role",
+                "RoleSessionName": "awscli-mate-p4",
+            },
+        )
+        results = warm_role_cache(awscli_config, get_sts_client=get_sts_client)
+        stubber.assert_no_pending_responses()
+
+    status = {result.profile: result.status for result in results}
+    assert status == {
+        "p2": WarmStatusEnum.refreshed,
+        "p4": WarmStatusEnum.refreshed,
+        "p5": WarmStatusEnum.skipped,
+    }
+    # the inline comment of source_profile is ignored
+    assert calls == ["p1", "p1"]
+
+    p4 = [result for result in results if result.profile == "p4"][0]
+    path = awscli_config.dir_cli_cache / f"{p4.cache_key}.json"
+    response = json.loads(path.read_text())
+    assert response["Credentials"]["AccountId"] == "444455556666"
+    assert 3000 < get_seconds_remaining(response) <= 3600
+
+    # botocore reads the warmed cache, no AssumeRole call
+    boto_ses = new_boto_session("p4", awscli_config)
+    credentials = boto_ses.get_credentials().get_frozen_credentials()
+    assert credentials.access_key == "ASIAP4EXAMPLEKEY"
+
+    # fresh entries are not refreshed
+    results = warm_role_cache(
+        awscli_config,
+        profiles=["p4"],
+        refresh_margin=1800,
+        get_sts_client=get_sts_client,
+    )
+    assert results[0].status == WarmStatusEnum.fresh
+    assert len(calls) == 2
+
+    # entries close to expiration are refreshed, errors are reported
+    with stubber:
+        stubber.add_client_error("assume_role", service_error_code="AccessDenied")
+        results = warm_role_cache(
+            awscli_config,
+            profiles=["p4", "p1", "not_exists"],
+            refresh_margin=7200,
+            get_sts_client=get_sts_client,
+        )
+    status = {result.profile: result.status for result in results}
+    assert status == {
+        "p4": WarmStatusEnum.failed,
+        "p1": WarmStatusEnum.skipped,
+        "not_exists": WarmStatusEnum.skipped,
+    }
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.role_cache", preview=False)
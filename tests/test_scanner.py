@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.scanner import iter_sections, iter_file_sections
+
+
+def test_iter_sections():
+    lines = [
+        "# header comment",
+        "[DEFAULT]",
+        "region = us-west-2",
+        "[profile p1] ; comment",
+        "; comment",
+        "Region: us-east-1",
+        "role_arn = arn:aws:iam::111122223333:role/a=b",
+        "",
+        "[profile p2]",
+        "s3 =",
+        "    max_concurrent_requests = 20",
+        "    max_queue_size = 10000",
+        "output = json # inline comment is part of the value",
+        "this is not a valid line",
+    ]
+    assert list(iter_sections(lines)) == [
+        ("DEFAULT", {"region": "us-west-2"}),
+        (
+            "profile p1",
+            {
+                "region": "us-east-1",
+                "role_arn": "arn:aws:iam::111122223333:role/a=b",
+            },
+        ),
+        (
+            "profile p2",
+            {
+                "s3": "\nmax_concurrent_requests = 20\nmax_queue_size = 10000",
+                "output": "json # inline comment is part of the value",
+            },
+        ),
+    ]
+
+
+def test_same_as_config_parser(awscli_config: AWSCliConfig):
+    config, _ = awscli_config.read_config(readonly=True)
+    assert dict(iter_file_sections(awscli_config.path_config)) == {
+        name: dict(section) for name, section in config.items() if name != "DEFAULT"
+    }
+
+    pairs = awscli_config.extract_profile_and_region_pairs()
+    assert pairs == [
+        ("p1", "us-east-1"),
+        ("p2", "us-east-2"),
+        ("p3", "us-east-3"),
+    ]
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.scanner", preview=False)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+import pytest
+
+from awscli_mate.vendor.better_fuzzywuzzy import process
+from awscli_mate.scorer import (
+    FuzzywuzzyScorer,
+    RapidfuzzScorer,
+    is_rapidfuzz_installed,
+    is_numpy_installed,
+    new_scorer,
+    get_default_scorer,
+    set_default_scorer,
+    rank,
+    rank_scores,
+)
+from awscli_mate.search import ProfileRegionPairFuzzyMatcher, sort_profile_region_pairs
+
+WORDS = ["prod", "dev", "test", "us", "east", "west", "1", "2", "admin", "role", "Ops"]
+SEPARATORS = ["_", "-", ".", " ", "→"]
+
+
+def make_names(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        words = rnd.sample(WORDS, rnd.randint(1, 4))
+        names.add(rnd.choice(SEPARATORS).join(words))
+    names = sorted(names)
+    rnd.shuffle(names)
+    # edge cases
+    return names + ["", "---", "prod", "café_prod", "中文_dev"]
+
+
+QUERIES = ["prod", "PROD us", "dev-east-1", "p", "admin role", "→", "", "-", "café"]
+
+
+def test_fuzzywuzzy_scorer_equivalence():
+    names = make_names(200)
+    scorer = FuzzywuzzyScorer()
+    for query in QUERIES:
+        expected = [score for _, score in process.extractWithoutOrder(query, names)]
+        assert scorer.score_batch(query, names) == expected
+        # the memoized names give the same result
+        assert scorer.score_batch(query, names) == expected
+        assert [scorer.score(query, name) for name in names[:20]] == expected[:20]
+
+        for limit in [1, 5, 99, None]:
+            expected = process.extractBests(query, names, limit=limit)
+            ranked = rank(query, names, limit=limit, scorer=scorer)
+            assert [(names[i], score) for i, score in ranked] == expected
+
+
+def test_fuzzy_matcher_equivalence():
+    names = make_names(100, seed=2)
+    pairs = [(name, "us-east-1") for name in names]
+    matcher = ProfileRegionPairFuzzyMatcher.from_items(pairs)
+    scorer = FuzzywuzzyScorer(max_cache_size=10)
+    for query in QUERIES:
+        for limit in [5, None]:
+            assert matcher.match(
+                query, threshold=0, limit=limit, scorer=scorer
+            ) == matcher.match(query, threshold=0, limit=limit)
+
+    # no hard cap
+    many = [(f"profile_{i}", "us-east-1") for i in range(150)]
+    assert len(sort_profile_region_pairs(many, "profile")) == 150
+    assert len(sort_profile_region_pairs(many, "profile", limit=99)) == 99
+
+
+def test_default_scorer():
+    set_default_scorer(None)
+    scorer = get_default_scorer()
+    assert get_default_scorer() is scorer
+    # rapidfuzz is never picked automatically
+    assert isinstance(scorer, FuzzywuzzyScorer)
+    assert isinstance(new_scorer(), FuzzywuzzyScorer)
+    set_default_scorer("fuzzywuzzy")
+    assert isinstance(get_default_scorer(), FuzzywuzzyScorer)
+    custom = FuzzywuzzyScorer()
+    set_default_scorer(custom)
+    assert get_default_scorer() is custom
+    set_default_scorer(None)
+    # the options don't change the scores, so the cache key is the same
+    assert FuzzywuzzyScorer(max_cache_size=1).cache_key == custom.cache_key
+    with pytest.raises(ValueError):
+        new_scorer("unknown")
+
+
+@pytest.mark.skipif(not is_rapidfuzz_installed(), reason="rapidfuzz not installed")
+def test_rapidfuzz_scorer_equivalence():
+    names = make_names(500)
+    fw_scorer = FuzzywuzzyScorer()
+    rf_scorer = new_scorer("rapidfuzz")
+    queries = QUERIES + ["dev ml", "ops_web", "prod-us-east-1", "admin_role_2"]
+    for query in queries:
+        fw_scores = fw_scorer.score_batch(query, names)
+        rf_scores = rf_scorer.score_batch(query, names)
+        assert [rf_scorer.score(query, name) for name in names] == rf_scores
+        # the same perfect matches in the same order, and the same best match
+        fw_ranked = rank_scores(fw_scores)
+        rf_ranked = rank_scores(rf_scores)
+        assert [i for i, score in rf_ranked if score == 100] == [
+            i for i, score in fw_ranked if score == 100
+        ]
+        assert rf_ranked[0] == fw_ranked[0]
+    assert rf_scorer.score_batch("prod", []) == []
+
+
+@pytest.mark.skipif(not is_rapidfuzz_installed(), reason="rapidfuzz not installed")
+def test_rapidfuzz_scorer_without_cdist():
+    names = make_names(200)
+    scorer = RapidfuzzScorer(use_cdist=False)
+    for query in QUERIES:
+        expected = [scorer.score(query, name) for name in names]
+        assert scorer.score_batch(query, names) == expected
+        if is_numpy_installed():
+            assert RapidfuzzScorer(use_cdist=True).score_batch(query, names) == expected
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.scorer", preview=False)
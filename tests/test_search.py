@@ -1,7 +1,20 @@
 # -*- coding: utf-8 -*-
 
+import types
+import random
+
 from awscli_mate.awscli import AWSCliConfig
-from awscli_mate.search import sort_profile_region_pairs
+import awscli_mate.search as search_module
+from awscli_mate.graph import profile_graph_cache
+from awscli_mate.table import ProfileTable
+from awscli_mate.scorer import BaseScorer, FuzzywuzzyScorer
+from awscli_mate.directory import AccountDirectory, get_path_directory
+from awscli_mate.search import (
+    SearchCache,
+    sort_profile_region_pairs,
+    iter_sorted_profile_region_pairs,
+    SearchSession,
+)
 
 
 def test_sort_profile_region_pairs(awscli_config: AWSCliConfig):
@@ -12,6 +25,204 @@ def test_sort_profile_region_pairs(awscli_config: AWSCliConfig):
     assert sorted_pairs[0][0] == "p1"
 
 
+def test_iter_sorted_profile_region_pairs(awscli_config: AWSCliConfig):
+    profile_graph_cache.clear()
+    stream = awscli_config.iter_profiles()
+    assert isinstance(stream, types.GeneratorType)
+    assert next(stream)[0] == "p1"
+
+    pairs = awscli_config.extract_profile_and_region_pairs()
+    for query in ["", "p3", "p", "xyz"]:
+        profile_graph_cache.clear()
+        # the cold path and the graph path give the same pairs
+        streamed = list(iter_sorted_profile_region_pairs(query, awscli_config))
+        assert streamed == sort_profile_region_pairs(pairs, query)
+        awscli_config.get_profile_graph()
+        streamed = list(iter_sorted_profile_region_pairs(query, awscli_config))
+        assert streamed == sort_profile_region_pairs(pairs, query)
+
+
+class ReversedScorer(BaseScorer):
+    def score_batch(self, query, names):
+        return list(range(len(names)))
+
+
+def test_search_session():
+    pairs = [
+        (f"{env}_{team}_{i}", "us-east-1")
+        for env in ["prod", "dev", "staging"]
+        for team in ["data", "web", "ml"]
+        for i in range(5)
+    ] + [("prod", "us-east-1"), ("my_production_admin", "us-west-2"), ("中文", "x")]
+    directory = AccountDirectory()
+    directory.add_profile("dev_ml_3", "111122223333", alias="sandbox")
+    table = ProfileTable()
+    for profile, region in pairs:
+        table.append(profile, {"region": region})
+    session = SearchSession(table=table, account_directory=directory)
+
+    # type, delete, type again, transposed characters, typos, then clear
+    queries = [
+        "p",
+        "pr",
+        "prod",
+        "prod w",
+        "prod web",
+        "prod w",
+        "prod",
+        "prdo",
+        "d",
+        "da",
+        "dat",
+        "datax",
+        "sand",
+        "1111",
+        "zzz",
+        "-",
+        "中",
+        "",
+        "ml",
+    ]
+    for query in queries:
+        expected = sort_profile_region_pairs(pairs, query, account_directory=directory)
+        assert session.search(query) == expected, query
+        # an empty query lists all profiles regardless of the limit
+        for limit in [1, 5] if query else []:
+            assert session.search(query, limit=limit) == expected[:limit], query
+    # the transposed query still finds the exact profile
+    assert ("prod", "us-east-1") in session.search("prdo")[:3]
+
+    stats = session.stats
+    # deleting characters reuses the result, a smaller limit is sliced
+    assert stats.reuses == 2 * (len(queries) - 1) + 2
+    assert stats.full_scans == 0
+    # "zzz" and "中" don't share any character with the names
+    assert stats.skipped >= 2 * len(pairs)
+
+    # random names, transposed and typo queries
+    rnd = random.Random(1)
+    words = ["prod", "dev", "admin", "role", "us", "east", "1", "Ops", "café"]
+    names = {
+        rnd.choice("_-. ").join(rnd.sample(words, rnd.randint(1, 4)))
+        for _ in range(300)
+    }
+    pairs = [(name, "us-east-1") for name in sorted(names)]
+    table = ProfileTable()
+    for profile, region in pairs:
+        table.append(profile, {"region": region})
+    session = SearchSession(table=table)
+    for query in ["prdo", "amdin", "us esat", "opps", "cafe", "xq", "dve ops 1"]:
+        assert session.search(query) == sort_profile_region_pairs(pairs, query)
+
+    # the other scorers score all rows
+    scorer = ReversedScorer()
+    assert session.search("prod", scorer=scorer) == sort_profile_region_pairs(
+        pairs, "prod", scorer=scorer
+    )
+    assert session.stats.full_scans == 1
+    session.reset()
+    reuses = session.stats.reuses
+    session.search("prod")
+    assert session.stats.reuses == reuses
+
+
+def test_search_cache(awscli_config: AWSCliConfig):
+    cache = SearchCache(max_queries=2)
+    pairs = awscli_config.extract_profile_and_region_pairs()
+    for query in ["p3", "p", "p3"]:
+        assert cache.get(query, awscli_config) == sort_profile_region_pairs(
+            pairs, query
+        )
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+    assert (cache.matcher_stats.hits, cache.matcher_stats.misses) == (2, 1)
+
+    # the result is a copy
+    cache.get("p3", awscli_config).clear()
+    assert cache.get("p3", awscli_config)[0][0] == "p3"
+
+    # the least recently used result is evicted
+    cache.get("xyz", awscli_config)
+    assert cache.size == 2
+    misses = cache.stats.misses
+    cache.get("p", awscli_config)
+    assert cache.stats.misses == misses + 1
+
+    # the entry is dropped when the config file changed
+    path = awscli_config.path_config
+    path.write_text(path.read_text() + "\n[profile p99]\nregion = us-west-2\n")
+    assert ("p99", "us-west-2") in cache.get("p99", awscli_config)
+    assert cache.matcher_stats.misses == 2
+    assert cache.size == 1
+
+    # the entry is dropped when the account directory changed
+    directory = AccountDirectory()
+    directory.add_profile("p1", "111122223333", alias="sandbox")
+    directory.dump(get_path_directory(awscli_config))
+    assert cache.get("sandbox", awscli_config)[0][0] == "p1"
+    assert cache.matcher_stats.misses == 3
+
+    cache.clear()
+    assert cache.size == 0
+    assert cache.stats.total == 0
+
+
+def test_search_cache_search(awscli_config: AWSCliConfig, monkeypatch):
+    cache = SearchCache()
+    table = awscli_config.get_profile_table()
+    directory = AccountDirectory()
+    directory.add_profile("p1", "111122223333", alias="sandbox")
+    session = SearchSession(table=table, account_directory=directory)
+
+    # with a given table, the keystroke path doesn't touch any file
+    def no_io(*args, **kwargs):
+        raise AssertionError("file I/O on the keystroke path")
+
+    with monkeypatch.context() as m:
+        m.setattr(search_module, "_get_signature", no_io)
+        m.setattr(AWSCliConfig, "extract_profile_and_region_pairs", no_io)
+        m.setattr(AWSCliConfig, "get_profile_table", no_io)
+        m.setattr(search_module, "load_account_directory", no_io)
+
+        def search(query, **kwargs):
+            return cache.search(
+                query,
+                awscli_config,
+                table=table,
+                account_directory=directory,
+                **kwargs,
+            )
+
+        for query in ["p", "p3", "p", "sandbox", ""]:
+            assert search(query) == session.search(query)
+        assert (cache.stats.hits, cache.stats.misses) == (1, 4)
+
+        # the built-in scorers of the same kind share the results
+        search("p", scorer=FuzzywuzzyScorer())
+        assert cache.stats.misses == 4
+        # the other scorers are keyed by the object
+        scorer1, scorer2 = ReversedScorer(), ReversedScorer()
+        assert search("p", scorer=scorer1) == session.search("p", scorer=scorer1)
+        search("p", scorer=scorer2)
+        assert cache.stats.misses == 6
+
+        # a new table of the model drops the results of the old table
+        size = cache.size
+        cache.search("p", awscli_config, table=ProfileTable())
+        assert cache.size == 1 < size
+    assert cache.matcher_stats.total == 0
+
+    # without a table, the table is read from the config file, the pairs
+    # and the matcher are only built for the full ranking
+    cache.clear()
+    assert cache.search("p3", awscli_config)[0][0] == "p3"
+    entry = cache.get_entry(awscli_config)
+    assert entry.matcher is None
+    cache.get("p3", awscli_config)
+    assert entry.matcher is not None
+    # the full ranking and the incremental search are cached separately
+    assert cache.size == 2
+
+
 if __name__ == "__main__":
     from awscli_mate.tests import run_cov_test
 
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.splice import build_section_index, map_comments, splice_sections
+
+data = b"""# header
+[default]
+region = us-west-1
+
+# comment for p1
+[p1]
+# inner comment
+key = value
+#--- end of p1 ---
+
+[p2]
+key = value"""
+
+
+def test_build_section_index():
+    index = build_section_index(data)
+    assert list(index) == ["default", "p1", "p2"]
+    assert data[index["default"].start : index["default"].end] == (
+        b"[default]\nregion = us-west-1\n"
+    )
+    assert data[index["p1"].start : index["p1"].end] == (
+        b"[p1]\n# inner comment\nkey = value\n"
+    )
+    assert data[index["p2"].start : index["p2"].end] == b"[p2]\nkey = value"
+
+
+def test_splice_sections():
+    index = build_section_index(data)
+    new_data = splice_sections(
+        data,
+        index,
+        {
+            "p1": {"a": "1", "b": "line1\nline2"},
+            "p2": None,
+            "p3": {"c": "3"},
+        },
+    )
+    assert new_data == b"""# header
+[default]
+region = us-west-1
+
+# comment for p1
+[p1]
+# inner comment
+a = 1
+b = line1
+\tline2
+#--- end of p1 ---
+
+
+[p3]
+c = 3
+"""
+    assert splice_sections(b"", {}, {"p1": {}, "p2": {}}) == b"[p1]\n\n[p2]\n"
+
+
+def test_splice_sections_keep_comments():
+    data = (
+        b"[p1]\n"
+        b"# header comment\n"
+        b"a = 1\n"
+        b"; comment for a\n"
+        b"b = line1\n"
+        b"  line2\n"
+        b"# comment for b\n"
+        b"c = 3\n"
+        b"# comment for c\n"
+        b"d = 4\r\n"
+        b"# comment for d"
+    )
+    assert map_comments(data, {"a", "c", "d"}) == {
+        None: ["# header comment\n"],
+        "a": ["; comment for a\n", "# comment for b\n"],
+        "c": ["# comment for c\n"],
+        "d": ["# comment for d\n"],
+    }
+    new_data = splice_sections(
+        data,
+        build_section_index(data),
+        # b is removed, a is changed, e is new
+        {"p1": {"a": "10", "c": "3", "d": "4", "e": "5"}},
+    )
+    assert new_data == (
+        b"[p1]\n"
+        b"# header comment\n"
+        b"a = 10\n"
+        b"; comment for a\n"
+        b"# comment for b\n"
+        b"c = 3\n"
+        b"# comment for c\n"
+        b"d = 4\n"
+        b"e = 5\n"
+        # the comments after the last key are not in the span, kept as it is
+        b"# comment for d"
+    )
+
+
+def test_set_profile_as_default(awscli_config: AWSCliConfig):
+    before = awscli_config.path_config.read_bytes()
+    awscli_config.set_profile_as_default("p1")
+    after = awscli_config.path_config.read_bytes()
+    # only the default section is changed
+    index = build_section_index(before)
+    assert after == (
+        b"[default]\nregion = us-east-1\noutput = json\n"
+        + before[index["default"].end :]
+    )
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.splice", preview=False)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.table import ProfileTable
+from awscli_mate.search import sort_profile_table
+
+
+def test_profile_table(awscli_config: AWSCliConfig):
+    with awscli_config.transaction() as tx:
+        tx.upsert_section(
+            tx.config,
+            "profile p4",
+            {"role_arn": "arn:aws:iam::111122223333:role/r", "source_profile": "p3"},
+        )
+    table = awscli_config.get_profile_table()
+    assert len(table) == 4
+    assert list(table.iter_names()) == ["p1", "p2", "p3", "p4"]
+    assert list(table.iter_profile_and_region_pairs()) == [
+        ("p1", "us-east-1"),
+        ("p2", "us-east-2"),
+        ("p3", "us-east-3"),
+        ("p4", "us-east-3"),
+    ]
+    assert awscli_config.extract_profile_and_region_pairs() == list(
+        table.iter_profile_and_region_pairs()
+    )
+
+    row = table.get_row("p2")
+    assert row.index == 1
+    assert row.get("source_profile") == "p1 # comment for p2"
+    assert row.to_dict()["output"] == "json"
+    assert row.get("sso_session") is None
+    assert repr(row) == "ProfileRow(name='p2', region='us-east-2')"
+    assert table.get_row("not_exists") is None
+    assert table[3].name == "p4"
+    with pytest.raises(IndexError):
+        _ = table[4]
+
+    # cursor re-uses the same row view
+    rows = list(table.cursor())
+    assert len({id(row) for row in rows}) == 1
+    assert [row.name for row in table] == ["p1", "p2", "p3", "p4"]
+
+    # strings are interned once
+    assert table._pool.count("json") == 1
+    assert list(table.iter_column("output")) == ["json"] * 3 + [None]
+
+    assert [row.name for row in sort_profile_table(table, "p3")][:1] == ["p3"]
+    assert [row.name for row in sort_profile_table(table, "")] == [
+        "p1",
+        "p2",
+        "p3",
+        "p4",
+    ]
+    # only the given rows are sorted
+    rows = sort_profile_table(table, "p3", indexes=[0, 3])
+    assert sorted(row.name for row in rows) == ["p1", "p4"]
+    assert [row.name for row in sort_profile_table(table, "", indexes=[3])] == ["p4"]
+
+
+def test_memory_usage():
+    assert ProfileTable().nbytes_per_profile() == 0
+    table = ProfileTable.from_sections(
+        (
+            f"profile p{i}",
+            {"region": "us-east-1", "output": "json", "unknown_key": "value"},
+        )
+        for i in range(10000)
+    )
+    table.append("p0", {})
+    assert table[0].region == "us-east-1"
+    assert table.get_row("p9999").region == "us-east-1"
+    # 10 columns * 4 bytes + name string + dict entries
+    assert table.nbytes_per_profile() < 300
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.table", preview=False)
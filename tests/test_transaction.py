@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.cache import StatSignature
+
+
+def test_transaction(awscli_config: AWSCliConfig):
+    # nothing changed, nothing written
+    before = StatSignature.from_path(awscli_config.path_credentials)
+    with awscli_config.transaction() as tx:
+        assert tx.set_profile_as_default("default") is False
+    assert tx.is_changed is False
+    assert StatSignature.from_path(awscli_config.path_credentials) == before
+
+    # error in the with block, nothing written
+    with pytest.raises(ValueError):
+        with awscli_config.transaction() as tx:
+            tx.set_profile_as_default("p1")
+            raise ValueError
+    config, credentials = awscli_config.read_config()
+    assert config["default"]["region"] == "us-west-1"
+
+    # batch many changes
+    with awscli_config.transaction() as tx:
+        for i in range(1, 4):
+            tx.copy_section_data(
+                tx.config,
+                from_section_name="profile p1",
+                to_section_name=f"profile p1_{i}",
+                create_if_not_exist=True,
+            )
+            tx.upsert_credentials(f"p1_{i}", "AAA", "AAA", aws_session_token="AAA")
+        tx.upsert_credentials("p2", "BBB", "BBB")
+        tx.replace_section_data(
+            tx.credentials,
+            from_section_name="p2",
+            to_section_name="p3",
+        )
+        tx.remove_section(tx.config, "profile p3")
+        tx.upsert_section(tx.config, "profile p4", {"region": "us-west-2"})
+        tx.set_profile_as_default("p1_3")
+
+    config, credentials = awscli_config.read_config()
+    for i in range(1, 4):
+        assert dict(config[f"profile p1_{i}"]) == dict(config["profile p1"])
+        assert credentials[f"p1_{i}"]["aws_session_token"] == "AAA"
+    assert dict(credentials["p2"]) == {
+        "aws_access_key_id": "BBB",
+        "aws_secret_access_key": "BBB",
+    }
+    assert dict(credentials["p3"]) == dict(credentials["p2"])
+    assert "profile p3" not in config
+    assert dict(config["profile p4"]) == {"region": "us-west-2"}
+    assert credentials["default"]["aws_access_key_id"] == "AAA"
+    # new sections are appended in the order they are created
+    text = awscli_config.path_config.read_text()
+    assert text.index("[profile p1_1]") < text.index("[profile p1_3]")
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.awscli", preview=False)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import awscli_mate.identity as identity_module
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.identity import Identity, IdentityCache
+from awscli_mate.url import parse_role_arn, get_role_arn, get_switch_role_url
+
+
+def test_parse_role_arn():
+    assert parse_role_arn("arn:aws:iam::111122223333:role/admin-role") == (
+        "111122223333",
+        "admin-role",
+    )
+    assert parse_role_arn("arn:aws:iam::111122223333:role/team/admin-role") == (
+        "111122223333",
+        "team/admin-role",
+    )
+    for role_arn in [
+        "admin-role",
+        "arn:aws:iam::111122223333:user/alice",
+        "arn:aws:s3:::my-bucket",
+    ]:
+        with pytest.raises(ValueError):
+            parse_role_arn(role_arn)
+
+
+def test_get_switch_role_url_offline(awscli_config: AWSCliConfig, monkeypatch):
+    calls = []
+
+    def fetch_identity(profile, awscli_config, timeout):
+        calls.append(profile)
+        return Identity(
+            account_id="444455556666",
+            arn="arn:aws:iam::444455556666:user/alice",
+        )
+
+    monkeypatch.setattr(identity_module, "fetch_identity", fetch_identity)
+
+    assert get_role_arn("p1", awscli_config) is None
+    assert (
+        get_role_arn("p2", awscli_config)
+        == "arn:aws:iam::111122223333:role/fake-role-name"
+    )
+
+    # no network call, and no alias in the cache
+    url = get_switch_role_url("p2", awscli_config=awscli_config, offline=True)
+    assert url == (
+        "https://signin.aws.amazon.com/switchrole"
+        "?roleName=fake-role-name&account=111122223333"
+        "&displayName=fake-role-name@111122223333"
+    )
+    assert calls == []
+
+    # the alias in the identity cache is used
+    IdentityCache.from_awscli_config(awscli_config).set(
+        "arn:aws:iam::111122223333:role/fake-role-name",
+        Identity(
+            account_id="111122223333",
+            arn="arn:aws:sts::111122223333:assumed-role/fake-role-name/session",
+            alias="my-alias",
+        ),
+    )
+    url = get_switch_role_url(
+        "p2", awscli_config=awscli_config, offline=True, color="#F2B0A9"
+    )
+    assert "displayName=fake-role-name@my-alias" in url
+    assert url.endswith("&color=F2B0A9")
+    assert calls == []
+
+    # no role_arn, fall back to the network
+    url = get_switch_role_url("p1", awscli_config=awscli_config, offline=True)
+    assert "roleName=alice&account=444455556666" in url
+    assert calls == ["p1"]
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.url", preview=False)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import struct
+import threading
+
+import pytest
+
+from awscli_mate.awscli import AWSCliConfig
+from awscli_mate.directory import AccountDirectory, get_path_directory
+from awscli_mate.watch import (
+    IN_MODIFY,
+    IN_Q_OVERFLOW,
+    BackendEnum,
+    FileWatcher,
+    LiveProfileModel,
+    is_inotify_available,
+)
+
+backends = [BackendEnum.polling]
+if is_inotify_available():
+    backends.append(BackendEnum.inotify)
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_live_profile_model(awscli_config: AWSCliConfig, backend: str):
+    model = LiveProfileModel(
+        awscli_config=awscli_config,
+        backend=backend,
+        interval=0.01,
+    )
+    assert [profile for profile, _ in model.pairs] == ["p1", "p2", "p3"]
+    assert model.version == 1
+
+    changed = threading.Event()
+    versions = []
+
+    def on_change(model: LiveProfileModel):
+        versions.append(model.version)
+        changed.set()
+
+    model.subscribe(on_change)
+    with model:
+        # unrelated file in the same directory is ignored
+        awscli_config.path_config.parent.joinpath("unrelated").write_text("hello")
+        assert changed.wait(0.2) is False
+
+        with awscli_config.transaction() as tx:
+            tx.upsert_section(tx.config, "profile p4", {"region": "us-west-2"})
+        assert changed.wait(5) is True
+        assert model.pairs[-1] == ("p4", "us-west-2")
+        assert versions == [2]
+
+        # in-place write is also detected, the truncate and the write are
+        # debounced into one change, the empty file is never loaded
+        changed.clear()
+        awscli_config.path_config.write_text("[profile p5]\nregion = us-west-2")
+        assert changed.wait(5) is True
+        assert model.pairs == [("p5", "us-west-2")]
+        assert versions == [2, 3]
+
+        # building the account directory also reloads the model
+        assert model.account_directory is None
+        changed.clear()
+        directory = AccountDirectory()
+        directory.add_profile("p5", "111122223333", alias="sandbox")
+        directory.dump(get_path_directory(awscli_config))
+        assert changed.wait(5) is True
+        assert model.account_directory.get_account_by_profile("p5").alias == "sandbox"
+    model.unsubscribe(on_change)
+
+
+def test_live_profile_model_error(awscli_config: AWSCliConfig):
+    model = LiveProfileModel(awscli_config=awscli_config, backend=BackendEnum.polling)
+    pairs = model.pairs
+
+    def get_profile_table():
+        raise RuntimeError("lock timeout")
+
+    # any error keeps the current model
+    awscli_config.get_profile_table = get_profile_table
+    model.refresh()
+    assert model.pairs == pairs
+    assert model.version == 1
+    assert isinstance(model.error, RuntimeError)
+
+    # a failed subscriber doesn't stop the others
+    del awscli_config.get_profile_table
+    calls = []
+
+    def bad_subscriber(model: LiveProfileModel):
+        raise ValueError
+
+    model.subscribe(bad_subscriber)
+    model.subscribe(lambda model: calls.append(model.version))
+    model.refresh()
+    assert model.error is None
+    assert calls == [2]
+
+
+def test_file_watcher_check(tmp_path):
+    path = tmp_path / "config"
+    calls = []
+    watcher = FileWatcher(
+        paths=[path],
+        callback=lambda: calls.append(1),
+        backend=BackendEnum.polling,
+    )
+    assert watcher.check() is False
+    path.write_text("[default]")
+    assert watcher.check() is True
+    assert watcher.check() is False
+    path.unlink()
+    assert watcher.check() is True
+    assert len(calls) == 2
+    watcher.stop()
+
+
+def test_file_watcher_parse_events():
+    def event(mask: int, name: bytes) -> bytes:
+        return struct.pack("iIII", 1, mask, 0, len(name)) + name
+
+    names = {"config"}
+    parse = FileWatcher._parse_events
+    assert parse(event(IN_MODIFY, b"config\0\0"), names) == (True, False)
+    assert parse(event(IN_MODIFY, b"other\0\0\0"), names) == (False, False)
+    data = event(IN_MODIFY, b"other\0\0\0") + event(IN_Q_OVERFLOW, b"")
+    assert parse(data, names) == (False, True)
+
+
+if __name__ == "__main__":
+    from awscli_mate.tests import run_cov_test
+
+    run_cov_test(__file__, "awscli_mate.watch", preview=False)